@@ -0,0 +1,100 @@
+"""
+Import-time benchmark and guard for the models and data packages.
+
+Each case runs in a fresh interpreter, so it measures a cold start, and is
+repeated with the fastest run kept. Besides the time, every case lists
+heavy modules that must not be loaded on that code path (for example scipy
+and pandas for a process that only calls predict_match on stored
+parameters). The run fails if a forbidden module is loaded or if
+``import models`` takes longer than --max-ms.
+
+Usage (from the repo root):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 10 --max-ms 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for a bare "import models"; it only loads the package's lazy exports
+DEFAULT_MAX_IMPORT_MS = 50
+
+HEAVY_MODULES = ('scipy', 'pandas', 'sklearn', 'selenium', 'pyarrow', 'numpy')
+
+# (name, code to time, modules that must not be loaded afterwards)
+CASES = [
+    ('import models', "import models", HEAVY_MODULES),
+    ('predict_match worker',
+     "from models import StandardTeamModel\n"
+     "model = StandardTeamModel()\n"
+     "model.team_attack, model.team_defense = {'A': 1.1, 'B': 0.9}, {'A': 0.9, 'B': 1.1}\n"
+     "model.home_advantage = 1.2\n"
+     "model.predict_match('A', 'B')",
+     ('scipy', 'pandas', 'sklearn', 'selenium', 'pyarrow')),
+    ('import models.evaluation', "import models.evaluation", ('scipy', 'pandas', 'sklearn')),
+    ('import data.scrape_matches', "import data.scrape_matches", ('selenium', 'scipy', 'sklearn')),
+    ('import data.fetch_match_data', "import data.fetch_match_data", ('scipy', 'sklearn', 'selenium')),
+]
+
+_RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, '<case>', 'exec'))
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': 1000 * elapsed, 'loaded': sorted({{m.split('.')[0] for m in sys.modules}})}}))
+"""
+
+
+def time_case(code, repeat=5):
+    """
+    Time code in fresh interpreters.
+
+    Returns:
+        tuple: (fastest time in ms, top-level modules loaded after the code ran)
+    """
+    best, loaded = float('inf'), []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _RUNNER.format(code=code)], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = min(best, result['ms'])
+        loaded = result['loaded']
+    return best, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure and guard cold-start import times")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per case; the fastest is kept")
+    parser.add_argument('--max-ms', type=float, default=DEFAULT_MAX_IMPORT_MS,
+                        help=f"Budget for 'import models' in ms (default: {DEFAULT_MAX_IMPORT_MS})")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print("{:<30} {:>10}  {}".format('Case', 'ms', 'Heavy modules loaded'))
+    print("-" * 80)
+    for name, code, forbidden in CASES:
+        ms, loaded = time_case(code, args.repeat)
+        heavy = [m for m in HEAVY_MODULES if m in loaded]
+        print(f"{name:<30} {ms:>10.1f}  {', '.join(heavy) or '-'}")
+        unexpected = [m for m in forbidden if m in loaded]
+        if unexpected:
+            failures.append(f"{name} loads {', '.join(unexpected)}")
+        if name == 'import models' and ms > args.max_ms:
+            failures.append(f"import models took {ms:.1f} ms (budget {args.max_ms:.0f} ms)")
+
+    if failures:
+        print("\nFailed:")
+        for failure in failures:
+            print(f"- {failure}")
+        return 1
+    print("\nAll import checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+The match report parser from before parse_match_page's readers, kept as the
+reference for benchmarks.parse_pages.
+
+It is not used by the scraper; parse_pages times it alongside the current
+readers and checks that they all give the same rows.
+"""
+import html
+import re
+from datetime import datetime
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from data.scrape_matches import DEFAULT_PARSER
+
+
+def parse_match_page_baseline(page_html, url, cutoff_date=None, season=None):
+    """
+    Parse a fbref match report into prem_data rows (shots and red cards).
+    
+    The whole page is built into a BeautifulSoup tree and walked element by
+    element, as data.scrape_matches did before the lxml and soup readers.
+    
+    Args:
+        page_html (str): Match report HTML
+        url (str): Match report URL, stored as match_url
+        cutoff_date (datetime): Skip matches played before this date
+        season (str): Season such as "2024-2025", used when the page has no date
+    
+    Returns:
+        DataFrame: One row per event, or None if the match is skipped or can't be parsed
+    """
+    try:
+        soup = BeautifulSoup(page_html, DEFAULT_PARSER)
+
+        # Extract match date
+        venue_time = soup.find('span', class_='venuetime')
+        match_date = venue_time['data-venue-date'] if venue_time else None
+        
+        # Skip if match is older than cutoff date
+        if match_date and cutoff_date is not None:
+            match_datetime = datetime.strptime(match_date, '%Y-%m-%d')
+            if match_datetime < cutoff_date:
+                print(f"Skipping match from {match_date} (older than {cutoff_date.strftime('%Y-%m-%d')})")
+                return None
+        
+        # Extract teams
+        team_stats = soup.find('div', id='team_stats_extra')
+        if team_stats:
+            teams = team_stats.find_all('div', class_='th')
+            teams = [t.text.strip() for t in teams if t.text.strip() != '']
+            teams = list(dict.fromkeys(teams))  # Remove duplicates while preserving order
+            home_team = teams[0] if len(teams) > 0 else None
+            away_team = teams[1] if len(teams) > 1 else None
+        else:
+            home_team, away_team = None, None
+            
+        # Extract division
+        division_link = soup.find('a', href=lambda x: x and '/comps/' in x and '-Stats' in x)
+        division = division_link.text.strip() if division_link else None
+        
+        # Get shots data
+        shots_table = soup.find('table', id='shots_all')
+        if not shots_table:
+            print(f"No shots table found for {url}")
+            return None
+        
+        # First, get all header rows
+        header_rows = shots_table.find_all('tr')[:2]  # Get both header rows
+        if len(header_rows) < 2:
+            print(f"Invalid shots table structure for {url}")
+            return None
+            
+        # Extract headers from the second row (contains actual column names)
+        headers = []
+        for th in header_rows[1].find_all(['th', 'td']):
+            header_text = th.get_text(strip=True)
+            # If header is empty, use a placeholder
+            headers.append(header_text if header_text else f"Column_{len(headers)}")
+        
+        # Make headers unique
+        unique_headers = []
+        header_counts = {}
+        for header in headers:
+            if header in header_counts:
+                header_counts[header] += 1
+                unique_headers.append(f"{header}_{header_counts[header]}")
+            else:
+                header_counts[header] = 1
+                unique_headers.append(header)
+        
+        # Extract shot data rows
+        rows_data = []
+        for tr in shots_table.find_all('tbody')[0].find_all('tr'):
+            cols = tr.find_all(['th', 'td'])
+            row_data = []
+            for col in cols:
+                value = col.get_text(strip=True)
+                if value == '':
+                    value = "0"
+                row_data.append(value)
+            if len(row_data) == len(unique_headers):  # Only add rows that match header count
+                rows_data.append(row_data)
+        
+        # Create shots DataFrame with unique headers
+        shots_df = pd.DataFrame(rows_data, columns=unique_headers)
+        
+        # Check for penalties in player names and set event type accordingly
+        player_col = [col for col in shots_df.columns if 'Player' in col][0]
+        shots_df["Event Type"] = shots_df.apply(
+            lambda row: "Penalty" if "(pen)" in str(row[player_col]).lower() else "Shot", 
+            axis=1
+        )
+        
+        # Get red cards data
+        events = soup.find_all('div', class_=re.compile(r'^event\s'))
+        
+        times, scores, players, event_types, teams = [], [], [], [], []
+        
+        for event in events:
+            # Time and score
+            time_score_div = event.find('div')
+            if time_score_div:
+                time_score_text = html.unescape(time_score_div.get_text(strip=True))
+                time = time_score_text.split("'")[0] + "'" if "'" in time_score_text else time_score_text
+                score = time_score_text.split("'")[1] if "'" in time_score_text else ''
+                times.append(time)
+                scores.append(score)
+                
+            # Player name
+            player = event.find('a').get_text(strip=True) if event.find('a') else ''
+            players.append(player)
+            
+            # Event type
+            event_type = 'Unknown'
+            for div in event.find_all('div'):
+                if '—' in div.get_text():
+                    event_type = div.get_text(strip=True).split('—')[-1].strip()
+                    break
+            event_types.append(event_type)
+            
+            # Team
+            team_logo = event.find('img', class_='teamlogo')
+            if team_logo:
+                team_name = team_logo.get('alt').replace(' Club Crest', '')
+                teams.append(team_name)
+            else:
+                teams.append('Unknown')
+        
+        # Create events DataFrame
+        events_df = pd.DataFrame({
+            'Time': times,
+            'Score': scores,
+            'Player': players,
+            'Event Type': event_types,
+            'Team': teams
+        })
+        
+        # Filter for red cards
+        red_cards_df = events_df[events_df['Event Type'].isin(['Red Card', 'Second Yellow Card'])]
+        red_cards_df = red_cards_df.reset_index(drop=True)
+        
+        # Process minute information
+        red_cards_df["Minute"] = red_cards_df["Time"].str.extract(r'(\d+)').fillna('0')
+        red_cards_df["Outcome"] = "Red Card"
+        
+        # Process shots DataFrame
+        minute_col = [col for col in shots_df.columns if 'Minute' in col][0]
+        squad_col = [col for col in shots_df.columns if 'Squad' in col][0]
+        outcome_col = [col for col in shots_df.columns if 'Outcome' in col][0]
+        xg_col = [col for col in shots_df.columns if 'xG' in col][0]
+        psxg_col = [col for col in shots_df.columns if 'PSxG' in col][0]
+        
+        shots_df["Minute"] = shots_df[minute_col].str.extract(r'(\d+)').fillna('0')
+        shots_df["Team"] = shots_df[squad_col]
+        shots_df["Outcome"] = shots_df[outcome_col]
+        shots_df["xG"] = shots_df[xg_col]
+        shots_df["PSxG"] = shots_df[psxg_col]
+        
+        shots_df = shots_df[["Minute", "Team", "Player", "Event Type", "Outcome", "xG", "PSxG"]]
+        
+        # Clean up data
+        shots_df.drop(shots_df[shots_df['Minute'] == ''].index, inplace=True)
+        
+        # Prepare red cards DataFrame for merging
+        red_cards_df = red_cards_df[["Minute", "Team", "Player", "Event Type", "Outcome"]]
+        red_cards_df["xG"] = 0
+        red_cards_df["PSxG"] = 0
+        
+        # Combine DataFrames
+        df = pd.concat([shots_df, red_cards_df], ignore_index=True)
+        
+        # Clean and convert data types
+        df["Minute"] = pd.to_numeric(df["Minute"], errors='coerce')
+        df["xG"] = pd.to_numeric(df["xG"], errors='coerce')
+        df["PSxG"] = pd.to_numeric(df["PSxG"], errors='coerce')
+        df.fillna(0.00, inplace=True)
+        df.sort_values(by=["Minute"], inplace=True)
+        
+        # Add match metadata
+        df["match_url"] = url
+        df["match_date"] = match_date
+        df["home_team"] = home_team
+        df["away_team"] = away_team
+        df["division"] = division
+        
+        # Add season column (format: 2023 for 2023-24 season, 2024 for 2024-25 season)
+        if match_date:
+            match_datetime = datetime.strptime(match_date, '%Y-%m-%d')
+            # If match date is after August 1st, use the year of the match
+            # Otherwise use previous year (for matches Jan-Jul which are part of previous season)
+            if match_datetime.month >= 8:
+                df["season"] = match_datetime.year
+            else:
+                df["season"] = match_datetime.year - 1
+        else:
+            # If no date available, extract from season string (e.g. "2023-2024" -> 2023)
+            try:
+                df["season"] = int(season.split("-")[0])
+            except:
+                df["season"] = None
+                
+        df = df.reset_index(drop=True)
+        
+        return df
+        
+    except Exception as e:
+        print(f"Error processing match data for {url}: {str(e)}")
+        return None
@@ -0,0 +1,113 @@
+"""
+Benchmark match report parsing over saved pages.
+
+Every page is parsed with the pre-change parser (benchmarks.parse_baseline,
+a full BeautifulSoup walk) and with each reader parse_match_page supports
+(lxml XPath and BeautifulSoup). The rows are checked to be identical to the
+baseline's, and the per-page parse time of each reader and its speedup over
+the baseline are reported. Pages are read from a directory of
+.html files or gzipped .html.gz files, searched recursively, so the scraper's
+HTTP cache (data/http_cache) can be used directly.
+
+Usage (from the repo root):
+
+    python -m benchmarks.parse_pages
+    python -m benchmarks.parse_pages path/to/saved/pages --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from functools import partial
+
+from benchmarks.parse_baseline import parse_match_page_baseline
+from data.replay import find_saved_pages, read_saved_page
+from data.scrape_matches import DEFAULT_CACHE_DIR, MATCH_PAGE_READERS, MatchPageError, parse_match_page
+
+
+# Parsers by name; the baseline comes first and is the reference for the others
+PARSERS = {'baseline': parse_match_page_baseline,
+           **{reader: partial(parse_match_page, reader=reader) for reader in MATCH_PAGE_READERS}}
+
+
+def load_pages(pages_dir):
+    """Read every saved page below pages_dir, as (name, text) pairs."""
+    return [(os.path.relpath(path, pages_dir), read_saved_page(path)) for path, _ in find_saved_pages(pages_dir)]
+
+
+def time_reader(pages, reader, repeat=1):
+    """
+    Parse every page with one parser from PARSERS.
+
+    Pages a reader rejects with MatchPageError count as parsed to None, as
+    the baseline returns for them.
+
+    Returns:
+        tuple: (per-page fastest parse time in seconds, parsed frames by page name)
+    """
+    times, frames = {}, {}
+    for name, page_html in pages:
+        best = float('inf')
+        for _ in range(repeat):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                try:
+                    frames[name] = PARSERS[reader](page_html, name)
+                except MatchPageError:
+                    frames[name] = None
+                best = min(best, time.perf_counter() - start)
+        times[name] = best
+    return times, frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark match report parsing over saved pages")
+    parser.add_argument('pages_dir', nargs='?', default=DEFAULT_CACHE_DIR,
+                        help="Directory of saved match reports (default: the scraper's HTTP cache)")
+    parser.add_argument('--readers', nargs='+', default=list(PARSERS), choices=list(PARSERS),
+                        help="Parsers to time; the first is the reference for the others (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Parse each page this many times and keep the fastest")
+    parser.add_argument('--output', help="Write per-reader timings to this JSON file")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages_dir)
+    if not pages:
+        print(f"No saved pages (.html or .html.gz) found in {args.pages_dir}")
+        return 1
+    size_mb = sum(len(page_html) for _, page_html in pages) / 1024 ** 2
+    print(f"Parsing {len(pages)} pages ({size_mb:.1f} MB) from {args.pages_dir}\n")
+
+    results, reference = {}, None
+    for reader in args.readers:
+        times, frames = time_reader(pages, reader, args.repeat)
+        total = sum(times.values())
+        results[reader] = {'pages': len(pages), 'total_time': total, 'ms_per_page': 1000 * total / len(pages),
+                           'pages_per_sec': len(pages) / total if total > 0 else None}
+        speedup = ''
+        if reader != args.readers[0]:
+            results[reader]['speedup'] = results[args.readers[0]]['ms_per_page'] / results[reader]['ms_per_page']
+            speedup = f"  {results[reader]['speedup']:>5.1f}x {args.readers[0]}"
+        print(f"{reader:<8} {results[reader]['ms_per_page']:>8.2f} ms/page  "
+              f"{results[reader]['pages_per_sec']:>8.1f} pages/s{speedup}")
+
+        if reference is None:
+            reference = frames
+            continue
+        mismatched = [name for name, frame in frames.items()
+                      if (frame is None) != (reference[name] is None)
+                      or (frame is not None and not frame.equals(reference[name]))]
+        if mismatched:
+            print(f"  {len(mismatched)} page(s) parsed differently from {args.readers[0]}, e.g. {mismatched[0]}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+Benchmark suite for fitting, resimulation, data loading, preprocessing, prediction
+and the all-pairs prediction tables.
+
+Every case runs against a synthetic league so results are reproducible and do
+not need the real database. The sweep covers number of teams, number of
+seasons and simulations per match, and records wall time, the number of
+likelihood evaluations made by the optimiser and peak memory.
+
+Usage (from the repo root, as a module so the data and models packages import):
+
+    python -m benchmarks.run_benchmarks --quick
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+
+Timings depend on the machine, so no baseline is committed. Record one with
+--save-baseline on the machine that runs the comparison (on the commit to
+compare against, with the same --teams/--seasons/--simulations/--cases
+selection), then run --compare after the change; only cases present in both
+runs are compared.
+
+Large cases (200 teams, many simulations) can take a very long time with the
+current per-match likelihood; use --teams/--seasons/--simulations/--cases to
+select a subset of the sweep.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.db import close_connections
+from data.fetch_match_data import load_data
+from data.synthetic import generate_league, write_to_db
+from models.standard_dc import StandardTeamModel
+from models.psxg_shots_resimmed_dc import PSxGShotsTeamModel
+from models.psxg_totals_resimmed_dc import PSxGTotalTeamModel
+from models.xg_shots_resimmed_dc import xGShotsTeamModel
+from models.xg_totals_resimmed_dc import xGTotalTeamModel
+from models.instrumentation import FitInstrumentation, ListSink
+from models.preprocessing import PreparedDataset, preprocess_matches
+from models.tables import PairingTables
+
+
+DEFAULT_TEAMS = (20, 44, 200)
+DEFAULT_SEASONS = (1, 3, 5)
+DEFAULT_SIMULATIONS = (5, 25, 200)
+DEFAULT_CASES = ('load_data', 'preprocess', 'resimulate', 'fit', 'predict_match', 'tables')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+MODEL_CLASSES = {
+    'standard': StandardTeamModel,
+    'psxg_shots': PSxGShotsTeamModel,
+    'psxg_total': PSxGTotalTeamModel,
+    'xg_shots': xGShotsTeamModel,
+    'xg_total': xGTotalTeamModel,
+}
+SHOT_MODELS = ('psxg_shots', 'xg_shots')
+RESIM_MODELS = ('psxg_shots', 'psxg_total', 'xg_shots', 'xg_total')
+
+# Division count used for each team count, so 44 teams looks like Prem + Championship
+DIVISIONS_FOR_TEAMS = {20: 1, 44: 2, 200: 5}
+
+
+def run_case(func, measure_memory=True, repeat=1):
+    """
+    Time a benchmark case, then optionally re-run it under tracemalloc for peak memory.
+
+    Timing and memory are measured in separate runs because tracemalloc slows
+    down pure-Python code considerably. With repeat > 1 the fastest run is kept.
+    """
+    wall_time = float('inf')
+    for _ in range(repeat):
+        np.random.seed(0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            extra = func() or {}
+            wall_time = min(wall_time, time.perf_counter() - start)
+
+    peak_memory_mb = None
+    if measure_memory:
+        np.random.seed(0)
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+
+    result = {'wall_time': wall_time, 'peak_memory_mb': peak_memory_mb}
+    result.update(extra)
+    return result
+
+
+def build_cases(teams, seasons, simulations, cases, models, multi_division=False):
+    """Yield (case_id, params, callable) for every point in the sweep."""
+    for n_teams in teams:
+        for n_seasons in seasons:
+            n_divisions = DIVISIONS_FOR_TEAMS.get(n_teams, max(1, round(n_teams / 22)))
+            shot_data, match_summaries, _ = generate_league(n_teams, n_divisions, n_seasons)
+            matches = match_summaries.to_dict('records')
+            # Fit every generated season: the window ends on the latest synthetic match, not today
+            as_of = match_summaries['match_date'].max()
+            days_ago = 365 * n_seasons
+            base = {'teams': n_teams, 'seasons': n_seasons, 'n_matches': len(matches), 'n_shots': len(shot_data)}
+
+            if 'load_data' in cases:
+                def load_case(shot_data=shot_data, n_seasons=n_seasons):
+                    with tempfile.TemporaryDirectory() as tmp:
+                        db_path = os.path.join(tmp, 'bench.db')
+                        try:
+                            write_to_db(shot_data, db_path)
+                            start = time.perf_counter()
+                            loaded, _ = load_data(days_ago=365 * n_seasons, db_path=db_path, cache=False)
+                            load_time = time.perf_counter() - start
+                            compact, _, matches = load_data(days_ago=365 * n_seasons, db_path=db_path,
+                                                            cache=False, compact=True)
+                            return {'load_time': load_time,
+                                    'shot_data_mb': loaded.memory_usage(deep=True).sum() / 1024 ** 2,
+                                    'compact_shot_data_mb': (compact.memory_usage(deep=True).sum()
+                                                             + matches.memory_usage(deep=True).sum()) / 1024 ** 2}
+                        finally:
+                            close_connections(db_path)
+                yield f"load_data/teams={n_teams}/seasons={n_seasons}", dict(base), load_case
+
+            if 'preprocess' in cases:
+                def preprocess_case(match_summaries=match_summaries, as_of=as_of, days_ago=days_ago):
+                    # One backtest week: the window ends on the latest match
+                    prepared = preprocess_matches(match_summaries, as_of=as_of, days_ago=days_ago,
+                                                  division_weights={"EFL Championship": 0.65})
+                    return {'prepared_matches': len(prepared['matches'])}
+                yield f"preprocess/teams={n_teams}/seasons={n_seasons}", dict(base), preprocess_case
+
+            if 'predict_match' in cases:
+                def predict_case(team_list=sorted(match_summaries['home_team'].unique())):
+                    model = StandardTeamModel()
+                    for team in team_list:
+                        model.team_attack[team] = 1.0
+                        model.team_defense[team] = 1.0
+                    model.home_advantage = 1.3
+                    n_calls = 0
+                    for home_team in team_list:
+                        for away_team in team_list:
+                            if home_team != away_team:
+                                model.predict_match(home_team, away_team)
+                                n_calls += 1
+                    return {'calls': n_calls}
+                yield f"predict_match/teams={n_teams}/seasons={n_seasons}", dict(base), predict_case
+
+            if 'tables' in cases:
+                def tables_case(team_list=sorted(match_summaries['home_team'].unique())):
+                    # Same all-pairs query as predict_match, through the precomputed tables
+                    model = StandardTeamModel()
+                    for team in team_list:
+                        model.team_attack[team] = 1.0
+                        model.team_defense[team] = 1.0
+                    model.home_advantage = 1.3
+                    start = time.perf_counter()
+                    tables = PairingTables.from_model(model)
+                    build_time = time.perf_counter() - start
+                    n_calls = 0
+                    for home_team in team_list:
+                        for away_team in team_list:
+                            if home_team != away_team:
+                                tables.lambdas(home_team, away_team)
+                                tables.outcome(home_team, away_team)
+                                n_calls += 1
+                    return {'calls': n_calls, 'build_time': build_time}
+                yield f"tables/teams={n_teams}/seasons={n_seasons}", dict(base), tables_case
+
+            for name in models:
+                model_cls = MODEL_CLASSES[name]
+                sim_counts = simulations if name in RESIM_MODELS else (None,)
+                for n_sims in sim_counts:
+                    params = dict(base, model=name, simulations=n_sims)
+                    suffix = f"teams={n_teams}/seasons={n_seasons}" + (f"/sims={n_sims}" if n_sims else '')
+
+                    if 'resimulate' in cases and name in RESIM_MODELS:
+                        def resim_case(model_cls=model_cls, name=name, n_sims=n_sims,
+                                       matches=matches, shot_data=shot_data, as_of=as_of, days_ago=days_ago):
+                            model = model_cls(n_simulations=n_sims)
+                            prepared = model._preprocess_matches(matches, days_ago=days_ago, as_of=as_of)
+                            filtered = prepared['filtered_matches']
+                            if name in SHOT_MODELS:
+                                expanded = model._resimulate_matches_with_xg(filtered, shot_data)
+                            else:
+                                expanded = model._resimulate_matches_with_xg(filtered)
+                            return {'expanded_matches': len(expanded)}
+                        yield f"resimulate/{name}/{suffix}", dict(params), resim_case
+
+                    if 'fit' in cases:
+                        def fit_case(model_cls=model_cls, name=name, n_sims=n_sims, match_summaries=match_summaries,
+                                     shot_data=shot_data, as_of=as_of, days_ago=days_ago):
+                            sink = ListSink()
+                            instrumentation = FitInstrumentation(sink)
+                            dataset = PreparedDataset(match_summaries, shot_data if name in SHOT_MODELS else None,
+                                                      as_of=as_of, days_ago=days_ago)
+                            model = model_cls() if name == 'standard' else model_cls(n_simulations=n_sims)
+                            model.fit_models(dataset, instrumentation=instrumentation, multi_division=multi_division)
+                            preprocess = [r for r in sink.records if r.get('stage') == 'preprocess'][-1]
+                            optimise = [r for r in sink.records if r.get('stage') == 'optimise'][-1]
+                            return {'likelihood_evaluations': optimise['evaluations'],
+                                    'fitted_matches': preprocess['n_matches'],
+                                    'optimised_matches': optimise['n_matches']}
+                        prefix = 'fit_multi_division' if multi_division else 'fit'
+                        yield f"{prefix}/{name}/{suffix}", dict(params), fit_case
+
+
+def compare_to_baseline(results, baseline, threshold=0.10):
+    """
+    Compare benchmark results against a stored baseline.
+
+    Args:
+        results (dict): Mapping of case id to result records
+        baseline (dict): Mapping of case id to result records from an earlier run
+        threshold (float): Relative wall time increase reported as a regression
+
+    Returns:
+        list: Case ids whose wall time regressed by more than threshold
+    """
+    regressions = []
+    print("\n{:<60} {:>10} {:>10} {:>8} {:>10}".format('Case', 'Baseline', 'Current', 'Ratio', 'Evals'))
+    print("-" * 102)
+    for case_id, current in results.items():
+        previous = baseline.get(case_id)
+        if previous is None:
+            print(f"{case_id:<60} {'-':>10} {current['wall_time']:>10.3f} {'new':>8}")
+            continue
+        ratio = current['wall_time'] / previous['wall_time'] if previous['wall_time'] > 0 else float('inf')
+        evals = ''
+        if 'likelihood_evaluations' in current:
+            evals = f"{previous.get('likelihood_evaluations', '-')}->{current['likelihood_evaluations']}"
+        flag = ' *' if ratio > 1 + threshold else ''
+        print(f"{case_id:<60} {previous['wall_time']:>10.3f} {current['wall_time']:>10.3f} {ratio:>8.2f} {evals:>10}{flag}")
+        if ratio > 1 + threshold:
+            regressions.append(case_id)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model fitting, resimulation, loading and prediction")
+    parser.add_argument('--teams', type=int, nargs='+', default=list(DEFAULT_TEAMS))
+    parser.add_argument('--seasons', type=int, nargs='+', default=list(DEFAULT_SEASONS))
+    parser.add_argument('--simulations', type=int, nargs='+', default=list(DEFAULT_SIMULATIONS))
+    parser.add_argument('--cases', nargs='+', default=list(DEFAULT_CASES), choices=DEFAULT_CASES)
+    parser.add_argument('--models', nargs='+', default=list(MODEL_CLASSES), choices=list(MODEL_CLASSES))
+    parser.add_argument('--multi-division', action='store_true',
+                        help="Fit with per-division constraints using the sparse solver")
+    parser.add_argument('--quick', action='store_true', help="Only run 20 teams, 1 season, 5 simulations")
+    parser.add_argument('--repeat', type=int, default=1, help="Time each case this many times and keep the fastest")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc peak memory run")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help="Store results as the baseline")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help="Compare results with a baseline file")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.teams, args.seasons, args.simulations = [20], [1], [5]
+
+    results = {}
+    for case_id, params, func in build_cases(args.teams, args.seasons, args.simulations, args.cases, args.models,
+                                                 args.multi_division):
+        print(f"Running {case_id} ...", end=' ', flush=True)
+        record = dict(params)
+        record.update(run_case(func, measure_memory=not args.no_memory, repeat=args.repeat))
+        results[case_id] = record
+        memory = f"{record['peak_memory_mb']:.1f} MB" if record['peak_memory_mb'] is not None else '-'
+        evals = f", {record['likelihood_evaluations']} evals" if 'likelihood_evaluations' in record else ''
+        print(f"{record['wall_time']:.3f}s, {memory}{evals}")
+
+    meta = {'created': datetime.now().isoformat(timespec='seconds'), 'python': sys.version.split()[0],
+            'numpy': np.__version__, 'pandas': pd.__version__}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump({'meta': meta, 'results': results}, f, indent=2)
+            print(f"\nResults saved to {path}")
+
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"\nNo baseline at {args.compare}; record one first with --save-baseline")
+            return 1
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
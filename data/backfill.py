@@ -0,0 +1,320 @@
+"""
+Resumable historical backfill of match reports.
+
+Every match report of the requested competitions and seasons is queued in a
+scrape_jobs table in the team model database, then worker threads fetch,
+parse and ingest the jobs one match at a time. Each job records its status
+(pending, running, done, empty or failed), the number of attempts, the last
+error and when it may next be tried; failed attempts are retried with
+exponential backoff until max_attempts is reached.
+
+Because the queue lives in the database, a backfill can be stopped at any
+point and started again with the same command: matches already queued are
+not queued twice, finished jobs are not redone and jobs left running by an
+interrupted run are picked up again.
+
+Usage (from the repo root):
+
+    python -m data.backfill --competitions Premier-League Championship --seasons 2022-2023 2023-2024
+    python -m data.backfill --status
+    python -m data.backfill --retry-failed
+"""
+import argparse
+import sys
+import threading
+import time
+
+from data.db import connect, get_db_path
+from data.http_client import DEFAULT_REQUESTS_PER_MINUTE, Fetcher, HttpCache
+from data.ingest import check_schema, ingest_shots
+from data.schema import table_exists
+from data.scrape_matches import (COMPETITIONS, DEFAULT_CACHE_DIR, MATCH_REPORT_MAX_AGE, parse_fixtures_html,
+                                 parse_match_page, schedule_url)
+
+JOBS_TABLE = "scrape_jobs"
+
+JOB_STATUSES = ('pending', 'running', 'done', 'empty', 'failed')
+
+CREATE_JOBS_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+    match_url TEXT PRIMARY KEY,
+    competition TEXT NOT NULL,
+    season TEXT NOT NULL,
+    match_date TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    rows_inserted INTEGER,
+    updated_at REAL
+)
+"""
+
+CREATE_JOBS_INDEX_SQL = (
+    f"CREATE INDEX IF NOT EXISTS idx_{JOBS_TABLE}_status ON {JOBS_TABLE} (status, next_attempt_at)"
+)
+
+
+def create_jobs_table(conn):
+    """Create the scrape_jobs queue table if it doesn't exist (caller commits)."""
+    conn.execute(CREATE_JOBS_TABLE_SQL)
+    conn.execute(CREATE_JOBS_INDEX_SQL)
+
+
+def job_counts(db_path=None):
+    """Number of jobs in each status, for every status."""
+    counts = dict.fromkeys(JOB_STATUSES, 0)
+    conn = connect(db_path)
+    if table_exists(conn, JOBS_TABLE):
+        counts.update(conn.execute(f"SELECT status, COUNT(*) FROM {JOBS_TABLE} GROUP BY status").fetchall())
+    return counts
+
+
+def retry_failed(db_path=None):
+    """Put failed jobs back in the queue with their attempts reset. Returns the number requeued."""
+    conn = connect(db_path)
+    with conn:
+        create_jobs_table(conn)
+        cursor = conn.execute(
+            f"UPDATE {JOBS_TABLE} SET status = 'pending', attempts = 0, next_attempt_at = 0, updated_at = ? "
+            f"WHERE status = 'failed'",
+            (time.time(),)
+        )
+    return cursor.rowcount
+
+
+class Backfill:
+    """
+    Queue and scrape every match report for a set of competitions and seasons.
+
+    Parameters:
+    competitions: Competition names from COMPETITIONS, e.g. ['Premier-League', 'Championship']
+    seasons: Seasons such as ['2022-2023', '2023-2024']
+    db_path: Database holding prem_data and the job queue (None for the configured database)
+    workers: Worker threads; they share one rate limit, so more workers mostly
+             overlap parsing and ingest with the next download
+    requests_per_minute: Shared request rate across all workers
+    max_attempts: Attempts before a job is marked failed
+    backoff: Seconds before the first retry of a job, doubled after each failure
+    cache_dir: HTTP cache directory (None disables the cache)
+    """
+
+    def __init__(self, competitions, seasons, db_path=None, workers=2,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, max_attempts=5, backoff=60.0,
+                 cache_dir=DEFAULT_CACHE_DIR):
+        unknown = [c for c in competitions if c not in COMPETITIONS]
+        if unknown:
+            raise ValueError(f"Unknown competition(s) {', '.join(unknown)}, expected some of {', '.join(COMPETITIONS)}")
+        self.competitions = list(competitions)
+        self.seasons = list(seasons)
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.fetcher = Fetcher(requests_per_minute=requests_per_minute,
+                               cache=HttpCache(cache_dir) if cache_dir else None)
+        self._stop = threading.Event()
+
+    def enqueue(self):
+        """
+        Queue the match reports of every competition and season.
+
+        Schedule pages are always revalidated, so fixtures played since the
+        last run are added; matches already queued keep their status.
+
+        Returns:
+            int: Number of new jobs queued
+        """
+        conn = connect(self.db_path)
+        with conn:
+            create_jobs_table(conn)
+
+        queued = 0
+        for competition in self.competitions:
+            for season in self.seasons:
+                url = schedule_url(season, competition)
+                try:
+                    fixtures = parse_fixtures_html(self.fetcher.get(url), season, base_url=url,
+                                                   comp_id=COMPETITIONS[competition])
+                except Exception as e:
+                    print(f"Error fetching fixtures for {competition} {season}: {str(e)}")
+                    continue
+                if fixtures is None:
+                    print(f"No fixtures table found for {competition} {season}")
+                    continue
+
+                # Only fixtures with a match report, i.e. matches already played
+                jobs = [(match_url, competition, season, date_text or None, time.time())
+                        for date_text, match_url in fixtures if match_url]
+                with conn:
+                    before = conn.total_changes
+                    conn.executemany(
+                        f"INSERT OR IGNORE INTO {JOBS_TABLE} (match_url, competition, season, match_date, updated_at) "
+                        f"VALUES (?, ?, ?, ?, ?)",
+                        jobs
+                    )
+                    added = conn.total_changes - before
+                queued += added
+                print(f"{competition} {season}: {len(jobs)} match reports, {added} newly queued")
+        return queued
+
+    def claim_job(self, conn):
+        """
+        Take the next job that is due and mark it running, atomically.
+
+        Returns:
+            tuple: (match_url, season) or None if no job is due
+        """
+        with conn:
+            row = conn.execute(
+                f"UPDATE {JOBS_TABLE} SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                f"WHERE match_url = ("
+                f"  SELECT match_url FROM {JOBS_TABLE} WHERE status = 'pending' AND next_attempt_at <= ? "
+                f"  ORDER BY next_attempt_at, match_date, match_url LIMIT 1"
+                f") RETURNING match_url, season",
+                (time.time(), time.time())
+            ).fetchone()
+        return row
+
+    def finish_job(self, conn, match_url, status, rows_inserted=None):
+        with conn:
+            conn.execute(
+                f"UPDATE {JOBS_TABLE} SET status = ?, rows_inserted = ?, last_error = NULL, updated_at = ? "
+                f"WHERE match_url = ?",
+                (status, rows_inserted, time.time(), match_url)
+            )
+
+    def fail_job(self, conn, match_url, error):
+        """Schedule a retry with exponential backoff, or mark the job failed after max_attempts."""
+        with conn:
+            attempts = conn.execute(f"SELECT attempts FROM {JOBS_TABLE} WHERE match_url = ?", (match_url,)).fetchone()[0]
+            if attempts >= self.max_attempts:
+                conn.execute(
+                    f"UPDATE {JOBS_TABLE} SET status = 'failed', last_error = ?, updated_at = ? WHERE match_url = ?",
+                    (error, time.time(), match_url)
+                )
+                print(f"Giving up on {match_url} after {attempts} attempts: {error}")
+                return
+            delay = self.backoff * 2 ** (attempts - 1)
+            conn.execute(
+                f"UPDATE {JOBS_TABLE} SET status = 'pending', last_error = ?, next_attempt_at = ?, updated_at = ? "
+                f"WHERE match_url = ?",
+                (error, time.time() + delay, time.time(), match_url)
+            )
+            print(f"Attempt {attempts} for {match_url} failed ({error}), retrying in {delay:.0f}s")
+
+    def process_job(self, conn, match_url, season):
+        try:
+            page_html = self.fetcher.get(match_url, max_age=MATCH_REPORT_MAX_AGE)
+            try:
+                match_df = parse_match_page(page_html, match_url, season=season)
+            except Exception:
+                # Fetch the page again on the retry rather than reparsing the same copy
+                self.fetcher.discard(match_url)
+                raise
+            if match_df is None:
+                # A complete report without a shots table (no xG data); nothing to retry
+                self.finish_job(conn, match_url, 'empty')
+                return
+            result = ingest_shots(match_df, db_path=self.db_path)
+        except Exception as e:
+            self.fail_job(conn, match_url, str(e))
+            return
+        self.finish_job(conn, match_url, 'done', result['inserted'])
+        print(f"Ingested {match_url}: {result['inserted']} new rows")
+
+    def worker(self):
+        conn = connect(self.db_path)
+        while not self._stop.is_set():
+            job = self.claim_job(conn)
+            if job is None:
+                # Nothing due; stop once no retries are waiting either
+                waiting = conn.execute(
+                    f"SELECT MIN(next_attempt_at) FROM {JOBS_TABLE} WHERE status IN ('pending', 'running')"
+                ).fetchone()[0]
+                if waiting is None:
+                    return
+                self._stop.wait(min(max(waiting - time.time(), 0.1), 5.0))
+                continue
+            self.process_job(conn, *job)
+
+    def run(self, enqueue=True):
+        """
+        Queue the matches (optionally) and work through the queue until it is empty.
+
+        Jobs left running by an interrupted run are put back in the queue
+        first. Stop with Ctrl+C; the next run carries on from where this one
+        stopped. A database that still needs data.migrate_db raises
+        OutdatedSchemaError before anything is queued.
+
+        Returns:
+            dict: Number of jobs in each status at the end of the run
+        """
+        conn = connect(self.db_path)
+        check_schema(conn)
+        if enqueue:
+            self.enqueue()
+
+        with conn:
+            create_jobs_table(conn)
+            resumed = conn.execute(
+                f"UPDATE {JOBS_TABLE} SET status = 'pending', next_attempt_at = 0 WHERE status = 'running'"
+            ).rowcount
+        if resumed:
+            print(f"Resuming {resumed} job(s) interrupted in an earlier run")
+
+        threads = [threading.Thread(target=self.worker, name=f"backfill-{i}", daemon=True)
+                   for i in range(self.workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            print("\nStopping after the jobs in progress...")
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        counts = job_counts(self.db_path)
+        print(f"\nBackfill finished in {time.perf_counter() - start:.0f}s: "
+              + ", ".join(f"{count} {status}" for status, count in counts.items()))
+        return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill match reports for competitions and seasons, resumably.")
+    parser.add_argument("--competitions", nargs="+", default=['Premier-League'], choices=list(COMPETITIONS))
+    parser.add_argument("--seasons", nargs="+", help="Seasons such as 2023-2024")
+    parser.add_argument("--db", default=None,
+                        help="Path to the SQLite database (default: $TEAM_MODEL_DB or data/team_model_db.db)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--requests-per-minute", type=float, default=DEFAULT_REQUESTS_PER_MINUTE)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--no-enqueue", action="store_true", help="Only work through jobs already queued")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue failed jobs before running")
+    parser.add_argument("--status", action="store_true", help="Show the job counts and exit")
+    args = parser.parse_args(argv)
+
+    print(f"Database: {get_db_path(args.db)}")
+    if args.status:
+        for status, count in job_counts(args.db).items():
+            print(f"- {status}: {count}")
+        return 0
+    if args.retry_failed:
+        print(f"Requeued {retry_failed(args.db)} failed job(s)")
+    if not args.seasons and not args.no_enqueue:
+        if not args.retry_failed:
+            parser.error("--seasons is required unless --no-enqueue, --retry-failed or --status is given")
+        args.no_enqueue = True
+
+    backfill = Backfill(args.competitions, args.seasons or [], db_path=args.db, workers=args.workers,
+                        requests_per_minute=args.requests_per_minute, max_attempts=args.max_attempts)
+    counts = backfill.run(enqueue=not args.no_enqueue)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+
+
+class ScrapeCheckpoint:
+    """
+    Append-only record of match reports a scrape has already processed.
+
+    A match is recorded (as one JSON line with its match_url and the number of
+    rows it produced) once its rows are committed to the database, or once it
+    is known to have nothing to save, and the line is flushed to disk straight
+    away. An interrupted run can then be resumed without fetching those
+    matches again. The file is removed when a run completes.
+
+    Parameters:
+    path: JSON lines file to keep the checkpoint in
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.processed = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; that match is fetched again
+                    continue
+                self.processed.add(record['match_url'])
+
+    def record(self, match_url, rows=0):
+        """Mark a match as processed, with the number of rows it produced."""
+        line = json.dumps({'match_url': match_url, 'rows': rows}) + '\n'
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.processed.add(match_url)
+
+    def clear(self):
+        """Forget everything, once a run has completed."""
+        with self.lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.processed.clear()
@@ -0,0 +1,121 @@
+import atexit
+import os
+import sqlite3
+import threading
+
+# Set this to point every component (scraper, uploader, load_data) at the same database
+DB_PATH_ENV = "TEAM_MODEL_DB"
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "team_model_db.db")
+
+# Seconds a connection waits on a lock held by another process before giving up
+BUSY_TIMEOUT = 30
+
+_local = threading.local()
+_all_connections = []
+_all_connections_lock = threading.Lock()
+
+
+def get_db_path(db_path=None):
+    """
+    Resolve the database path: an explicit path wins, then the TEAM_MODEL_DB
+    environment variable, then data/team_model_db.db in this repository.
+    """
+    return os.path.abspath(db_path or os.environ.get(DB_PATH_ENV) or DEFAULT_DB_PATH)
+
+
+def _open(path, read_only):
+    if read_only:
+        uri = "file:" + path.replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        # WAL lets readers keep reading while a writer commits; the setting is
+        # stored in the database file, so one writer connection enables it for all
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def connect(db_path=None, read_only=False):
+    """
+    Get a connection to the team model database.
+
+    Connections are reused: each thread gets one writer and one read-only
+    connection per database, opened on first use and closed at exit. Don't
+    close the returned connection; commit (or use it as a context manager) to
+    end write transactions.
+
+    Args:
+        db_path (str): Database path, resolved with get_db_path
+        read_only (bool): Open the database read-only, for model code that only
+                          reads. Fails if the database does not exist.
+
+    Returns:
+        sqlite3.Connection
+    """
+    path = get_db_path(db_path)
+    cache = getattr(_local, "connections", None)
+    if cache is None:
+        cache = _local.connections = {}
+
+    key = (path, read_only)
+    conn = cache.get(key)
+    if conn is None:
+        conn = _open(path, read_only)
+        cache[key] = conn
+        with _all_connections_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def change_token(db_path=None):
+    """
+    Cheap fingerprint of the database contents, for caching query results.
+    
+    Combines the highest prem_data rowid with the size and modification time
+    of the database file and its write-ahead log, so it changes whenever rows
+    are added, deleted or rewritten, without reading any table data.
+    
+    Returns:
+        tuple: Hashable token; equal tokens mean the data has not changed
+    """
+    path = get_db_path(db_path)
+    files = []
+    for file_path in (path, path + "-wal"):
+        try:
+            stat = os.stat(file_path)
+            files.append((stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            files.append(None)
+    max_rowid = connect(path, read_only=True).execute("SELECT MAX(rowid) FROM prem_data").fetchone()[0]
+    return (max_rowid, *files)
+
+
+def close_connections(db_path=None):
+    """
+    Close this thread's cached connections, to one database or to all of them.
+
+    Call this before deleting or replacing a database file.
+    """
+    cache = getattr(_local, "connections", {})
+    path = get_db_path(db_path) if db_path is not None else None
+    for key in list(cache):
+        if path is None or key[0] == path:
+            conn = cache.pop(key)
+            with _all_connections_lock:
+                if conn in _all_connections:
+                    _all_connections.remove(conn)
+            conn.close()
+
+
+@atexit.register
+def _close_all():
+    with _all_connections_lock:
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Owned by a thread that has gone away
+                pass
+        _all_connections.clear()
@@ -1,26 +1,265 @@
-import sqlite3
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
-def load_data(days_ago=365):
+from data.db import change_token, connect, get_db_path
+from data.match_summaries import SUMMARY_SELECT, summaries_ready
+from data.snapshot import MANIFEST_FILE, load_snapshot
+
+# Columns of prem_data returned as shot data by default
+SHOT_COLUMNS = ['Minute', 'Team', 'Player', 'Event Type', 'Outcome', 'xG', 'PSxG',
+                'match_url', 'match_date', 'home_team', 'away_team', 'division', 'season']
+
+MATCH_KEYS = ['match_url', 'match_date', 'home_team', 'away_team', 'season', 'division']
+
+# Match summaries in load_data's column order
+SUMMARY_COLUMNS = MATCH_KEYS + ['home_goals', 'home_xg', 'home_psxg', 'away_goals', 'away_xg', 'away_psxg',
+                                'home_shots', 'away_shots', 'home_red_cards', 'away_red_cards']
+
+# Shot columns stored as categoricals by compact_shot_data
+COMPACT_CATEGORICAL_COLUMNS = ['Team', 'Player', 'Event Type', 'Outcome']
+
+# Numeric shot columns and the smaller types compact_shot_data stores them as
+COMPACT_NUMERIC_TYPES = {'Minute': np.int16, 'xG': np.float32, 'PSxG': np.float32, 'is_goal': np.int8}
+
+
+# load_data results kept in memory, least recently used dropped first
+LOAD_DATA_CACHE_SIZE = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _quote(column):
+    """Quote a column name for SQLite (prem_data has names with spaces)."""
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _query_data(cutoff_time, as_of, db_path, shot_columns):
+    # Dates are stored as text, so compare against the cutoff in the same format.
+    # Keeping the time of day matches the old "match_date > today - days_ago" filter.
+    where = "match_date > ?"
+    params = [cutoff_time.strftime('%Y-%m-%d %H:%M:%S')]
+    if as_of is not None:
+        where += " AND match_date <= ?"
+        params.append(as_of.strftime('%Y-%m-%d'))
+    
+    shot_query = (
+        f"SELECT {', '.join(_quote(c) for c in shot_columns)}, "
+        f"CASE WHEN Outcome = 'Goal' THEN 1 ELSE 0 END AS is_goal "
+        f"FROM prem_data WHERE {where}"
+    )
+    
+    # Load shot data and match summaries over the shared read-only connection
+    conn = connect(db_path, read_only=True)
+    shot_data = pd.read_sql_query(shot_query, conn, params=params)
+    if summaries_ready(conn):
+        summary_query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM match_summaries WHERE {where}"
+    else:
+        summary_query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM ({SUMMARY_SELECT.format(where=where)})"
+    summary_query += f" ORDER BY {', '.join(MATCH_KEYS)}"
+    match_summaries = pd.read_sql_query(summary_query, conn, params=params)
+    
+    if 'match_date' in shot_data.columns:
+        shot_data['match_date'] = pd.to_datetime(shot_data['match_date'])
+    match_summaries['match_date'] = pd.to_datetime(match_summaries['match_date'])
+    
+    return shot_data, match_summaries
+
+
+def _load_snapshot(snapshot_dir, cutoff_time, as_of, shot_columns):
+    shot_data, match_summaries = load_snapshot(snapshot_dir, cutoff_time, shot_columns)
+    if as_of is not None:
+        if 'match_date' in shot_data.columns:
+            shot_data = shot_data[shot_data['match_date'] <= as_of].reset_index(drop=True)
+        match_summaries = match_summaries[match_summaries['match_date'] <= as_of].reset_index(drop=True)
+    return shot_data, match_summaries
+
+
+def clear_load_data_cache():
+    """Drop every load_data result memoized in this process."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def load_data(days_ago=365, db_path=None, shot_columns=None,
+              snapshot_dir=None, as_of=None, cache=True, cache_dir=None, compact=False):
     """
     Load shot data from the database and create match summaries.
     
+    The date filter and the goal flag run in SQLite, so only rows inside the
+    window and the requested columns are read. Match summaries come from the
+    match_summaries table via its match_date index; databases that have not
+    been migrated yet aggregate prem_data instead.
+    
+    Results are memoized in-process (and optionally on disk), keyed on the
+    query parameters, the cutoff day and a cheap database change token (see
+    data.db.change_token), so calling load_data again is instant until new
+    data arrives or the date moves on. Each call returns its own copies.
+    
+    Args:
+        days_ago (int): Only include shots from matches in the last `days_ago` days
+        db_path (str): Path to the SQLite database holding the prem_data table
+                       (defaults to data.db.get_db_path(): $TEAM_MODEL_DB or
+                       data/team_model_db.db)
+        shot_columns (list): prem_data columns to return in shot_data (defaults to SHOT_COLUMNS)
+        snapshot_dir (str): Read from this Parquet snapshot (see data.snapshot) instead
+                            of the database. Files are memory-mapped and only the
+                            needed seasons and columns are read; text columns come
+                            back as categoricals and shots are ordered by match_date
+        as_of (str or datetime): Load the data as it would have been on this date:
+                                 the `days_ago` window ends here and later matches
+                                 are left out (defaults to today)
+        cache (bool): Reuse a memoized result when the database has not changed
+        cache_dir (str): Also keep results as pickles in this directory, so they
+                         survive restarts (e.g. of a notebook kernel)
+        compact (bool): Return shot_data in the compact layout of
+                        compact_shot_data, with integer match ids and a match
+                        lookup table
+    
     Returns:
         tuple: (shot_data, match_summaries) - Two dataframes containing:
                - shot_data: Individual shot data with added 'is_goal' column
-               - match_summaries: Aggregated match statistics
+               - match_summaries: Per-match goals, xG, PSxG, shots and red cards
+               With compact=True, (shot_data, match_summaries, matches) as
+               returned by compact_shot_data
     """
-    # Connect to database and load shot data
-    conn = sqlite3.connect(r"C:\Users\Owner\dev\team-model\data\team_model_db.db")
-    shot_data = pd.read_sql_query("SELECT * FROM prem_data", conn)
-    conn.close()
+    shot_columns = list(shot_columns or SHOT_COLUMNS)
     
-    # Filter data to only include shots from the last year
-    shot_data['match_date'] = pd.to_datetime(shot_data['match_date'])
-    shot_data = shot_data[shot_data['match_date'] > pd.Timestamp('today') - pd.Timedelta(days=days_ago)]
+    if as_of is not None:
+        as_of = pd.Timestamp(as_of).normalize()
+    cutoff_time = (as_of if as_of is not None else pd.Timestamp('today')) - pd.Timedelta(days=days_ago)
+    
+    if not cache:
+        if snapshot_dir is not None:
+            result = _load_snapshot(snapshot_dir, cutoff_time, as_of, shot_columns)
+        else:
+            result = _query_data(cutoff_time, as_of, db_path, shot_columns)
+        return compact_shot_data(*result) if compact else result
+    
+    # Stored dates have no time of day, so the result only depends on the cutoff day
+    if snapshot_dir is not None:
+        manifest = os.path.join(snapshot_dir, MANIFEST_FILE)
+        source = ('snapshot', os.path.abspath(snapshot_dir),
+                  os.stat(manifest).st_mtime_ns if os.path.exists(manifest) else None)
+    else:
+        source = ('db', get_db_path(db_path), change_token(db_path))
+    key = (source, tuple(shot_columns), cutoff_time.strftime('%Y-%m-%d'),
+           as_of.strftime('%Y-%m-%d') if as_of is not None else None, compact)
+    
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+    
+    cache_path = None
+    if cache_dir is not None:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        cache_path = os.path.join(cache_dir, f"load_data_{digest}.pkl")
+    if result is None and cache_path is not None and os.path.exists(cache_path):
+        result = pd.read_pickle(cache_path)
+    
+    if result is None:
+        if snapshot_dir is not None:
+            result = _load_snapshot(snapshot_dir, cutoff_time, as_of, shot_columns)
+        else:
+            result = _query_data(cutoff_time, as_of, db_path, shot_columns)
+        if compact:
+            result = compact_shot_data(*result)
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            pd.to_pickle(result, tmp_path)
+            os.replace(tmp_path, cache_path)
+    
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > LOAD_DATA_CACHE_SIZE:
+            _cache.popitem(last=False)
+    
+    # Copies, so callers can modify what they get without touching the cache
+    return tuple(df.copy() for df in result)
+
+
+def compact_shot_data(shot_data, match_summaries):
+    """
+    Convert load_data output to a compact layout.
+
+    The match columns (MATCH_KEYS) repeated on every shot row move to a lookup
+    table with one row per match, and each shot keeps an integer match_id
+    instead. Team, Player, Event Type and Outcome become categoricals, with
+    Team sharing its categories with the lookup's home_team and away_team so
+    the three can still be compared. xG and PSxG become float32, Minute int16
+    and is_goal int8. A season of shots then takes a fraction of the memory
+    and pickles quickly to worker processes.
+
+    Args:
+        shot_data (DataFrame): Shot rows as returned by load_data; needs match_url
+        match_summaries (DataFrame): Match summaries as returned by load_data
+
+    Returns:
+        tuple: (shot_data, match_summaries, matches) - compact shot rows with
+               a match_id column, the match summaries with a match_id column
+               added, and the lookup table of match columns indexed by
+               match_id, ordered by match_date and match_url
+    """
+    if 'match_url' not in shot_data.columns:
+        raise ValueError("compact_shot_data needs the match_url column in shot_data")
+
+    # Every match in either frame gets an id; summaries supply the match
+    # columns that shot_data may not have been loaded with
+    shot_keys = [c for c in MATCH_KEYS if c in shot_data.columns]
+    matches = pd.concat([
+        match_summaries[MATCH_KEYS],
+        shot_data[shot_keys].drop_duplicates('match_url'),
+    ], ignore_index=True).drop_duplicates('match_url')
+    matches = matches.sort_values(['match_date', 'match_url'], kind='stable').reset_index(drop=True)
+    matches.index = pd.RangeIndex(len(matches), name='match_id')
+
+    teams = pd.Index(pd.concat([matches['home_team'], matches['away_team']]).dropna().unique())
+    if 'Team' in shot_data.columns:
+        teams = teams.union(pd.Index(shot_data['Team'].dropna().unique()))
+    team_type = pd.CategoricalDtype(teams.sort_values())
+    matches['home_team'] = matches['home_team'].astype(team_type)
+    matches['away_team'] = matches['away_team'].astype(team_type)
+    matches['division'] = matches['division'].astype('category')
+
+    compact = shot_data.drop(columns=shot_keys)
+    for column in COMPACT_CATEGORICAL_COLUMNS:
+        if column in compact.columns:
+            compact[column] = compact[column].astype(team_type if column == 'Team' else 'category')
+    for column, dtype in COMPACT_NUMERIC_TYPES.items():
+        if column in compact.columns:
+            compact[column] = compact[column].fillna(0).astype(dtype)
+    match_ids = pd.Categorical(shot_data['match_url'], categories=matches['match_url']).codes
+    compact['match_id'] = match_ids.astype(np.int32)
 
-    # Add a goal column
-    shot_data['is_goal'] = shot_data['Outcome'].apply(lambda x: 1 if x == 'Goal' else 0)
+    match_summaries = match_summaries.copy()
+    match_summaries.insert(0, 'match_id', pd.Index(matches['match_url']).get_indexer(match_summaries['match_url'])
+                           .astype(np.int32))
+    return compact, match_summaries, matches
+
+
+def create_match_summaries(shot_data):
+    """
+    Aggregate shot data into one row per match.
+    
+    Args:
+        shot_data (DataFrame): Shot rows with an 'is_goal' column
+    
+    Returns:
+        DataFrame: Home and away goals, xG, PSxG, shots and red cards for each
+                   match, in SUMMARY_COLUMNS order
+    """
+    shot_data = shot_data.assign(
+        is_shot=shot_data['Event Type'].isin(['Shot', 'Penalty']).astype(int),
+        is_red_card=(shot_data['Outcome'] == 'Red Card').astype(int),
+    )
     
     # Split into home and away shots
     home_shots = shot_data[shot_data['Team'] == shot_data['home_team']]
@@ -30,27 +269,35 @@ def load_data(days_ago=365):
     home_stats = home_shots.groupby(['match_url', 'match_date', 'home_team', 'away_team', 'season', 'division'], as_index=False).agg({
         'is_goal': 'sum',  # Total goals
         'xG': 'sum',       # Total xG
-        'PSxG': 'sum'      # Total PSxG
+        'PSxG': 'sum',     # Total PSxG
+        'is_shot': 'sum',
+        'is_red_card': 'sum'
     })
     
     # Aggregate by match for away teams
     away_stats = away_shots.groupby(['match_url', 'match_date', 'home_team', 'away_team', 'season', 'division'], as_index=False).agg({
         'is_goal': 'sum',  # Total goals
         'xG': 'sum',       # Total xG
-        'PSxG': 'sum'      # Total PSxG
+        'PSxG': 'sum',     # Total PSxG
+        'is_shot': 'sum',
+        'is_red_card': 'sum'
     })
     
     # Rename columns
     home_stats = home_stats.rename(columns={
         'is_goal': 'home_goals',
         'xG': 'home_xg',
-        'PSxG': 'home_psxg'
+        'PSxG': 'home_psxg',
+        'is_shot': 'home_shots',
+        'is_red_card': 'home_red_cards'
     })
     
     away_stats = away_stats.rename(columns={
         'is_goal': 'away_goals',
         'xG': 'away_xg',
-        'PSxG': 'away_psxg'
+        'PSxG': 'away_psxg',
+        'is_shot': 'away_shots',
+        'is_red_card': 'away_red_cards'
     })
     
     # Merge home and away stats
@@ -61,5 +308,4 @@ def load_data(days_ago=365):
         how='inner'
     )
     
-    return shot_data, match_summaries
-
+    return match_summaries[SUMMARY_COLUMNS]
@@ -0,0 +1,223 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+
+# Same browser identity the Selenium driver uses
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# fbref asks for no more than 10 requests a minute from one client
+DEFAULT_REQUESTS_PER_MINUTE = 10
+
+# Responses worth retrying after a pause
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpCache:
+    """
+    Content-addressed on-disk cache of fetched pages.
+
+    Page bodies are stored gzipped under the SHA-256 of their content
+    (objects/ab/abcd....html.gz), so identical pages are kept once. A small
+    JSON entry per URL (urls/<sha1 of url>.json) records which object holds
+    the latest body, plus the ETag and Last-Modified headers used to
+    revalidate it and when it was last confirmed fresh.
+
+    Files are written to a temporary name and renamed into place, so
+    concurrent fetch threads and interrupted runs never leave partial entries.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'urls'), exist_ok=True)
+
+    def _entry_path(self, url):
+        return os.path.join(self.cache_dir, 'urls', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest + '.html.gz')
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, url):
+        """Cache entry for a URL (dict with sha256, etag, last_modified, checked_at) or None."""
+        try:
+            with open(self._entry_path(url)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if os.path.exists(self._object_path(entry['sha256'])) else None
+
+    def read(self, entry):
+        """Page text stored for a cache entry."""
+        with gzip.open(self._object_path(entry['sha256']), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+    def store(self, url, text, etag=None, last_modified=None):
+        """Save a freshly fetched page and point the URL's entry at it."""
+        body = text.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            self._write_atomic(object_path, gzip.compress(body))
+        entry = {'url': url, 'sha256': digest, 'etag': etag, 'last_modified': last_modified,
+                 'checked_at': time.time()}
+        self._write_atomic(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+        return entry
+
+    def mark_fresh(self, entry):
+        """Record that the server confirmed a cached page is unchanged (304)."""
+        entry = dict(entry, checked_at=time.time())
+        self._write_atomic(self._entry_path(entry['url']), json.dumps(entry).encode('utf-8'))
+        return entry
+
+    def discard(self, url):
+        """Forget a URL's cached page so the next fetch downloads it again."""
+        try:
+            os.remove(self._entry_path(url))
+        except FileNotFoundError:
+            pass
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Parameters:
+    rate: Tokens added per second
+    capacity: Most tokens that can build up, i.e. the largest burst allowed
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """
+    Rate-limited HTTP client shared by fetch threads.
+
+    Every request, retries included, takes a token from one bucket, so any
+    number of threads together stay within the request rate. Failed requests
+    (connection errors, 429 and 5xx) are retried with exponential backoff,
+    honouring Retry-After when the server sends it.
+
+    With a cache, pages checked within max_age are served from disk without a
+    request, and older copies are revalidated with If-None-Match /
+    If-Modified-Since so an unchanged page costs a 304 instead of a download.
+
+    Parameters:
+    requests_per_minute: Shared request rate across all threads
+    burst: Requests that may go out back to back after an idle spell
+    retries: Retries after the first attempt
+    backoff: Seconds to wait before the first retry, doubled each time
+    timeout: Seconds to wait for a response
+    cache: HttpCache to read and store pages, or None
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, burst=1, retries=3, backoff=5.0,
+                 timeout=30, cache=None):
+        self.limiter = TokenBucket(requests_per_minute / 60.0, capacity=burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """One requests.Session per thread (sessions are not thread-safe)."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+        return session
+
+    def _retry_delay(self, attempt, response):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * 2 ** attempt * random.uniform(1, 1.5)
+
+    def get(self, url, max_age=0):
+        """
+        Fetch a page and return its text.
+
+        Args:
+            url (str): Page to fetch
+            max_age (float): Use a cached copy without any request if it was
+                             checked less than this many seconds ago
+
+        Raises:
+            requests.RequestException: If the request still fails after all retries
+        """
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None and time.time() - entry['checked_at'] < max_age:
+            return self.cache.read(entry)
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            response = None
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304 and entry is not None:
+                    self.cache.mark_fresh(entry)
+                    return self.cache.read(entry)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    if self.cache is not None:
+                        self.cache.store(url, response.text, etag=response.headers.get('ETag'),
+                                         last_modified=response.headers.get('Last-Modified'))
+                    return response.text
+                response.raise_for_status()
+            except requests.HTTPError:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    raise
+            except requests.RequestException:
+                if attempt == self.retries:
+                    raise
+            delay = self._retry_delay(attempt, response)
+            print(f"Request for {url} failed (attempt {attempt + 1}), retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+    def discard(self, url):
+        """Drop a URL's cached page, so a page that turned out to be unusable is fetched afresh next time."""
+        if self.cache is not None:
+            self.cache.discard(url)
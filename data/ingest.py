@@ -0,0 +1,85 @@
+from data.db import connect
+from data.match_summaries import refresh_match_summaries
+from data.schema import PREM_DATA_KEY, conform_rows, create_schema, is_current, quote, table_exists
+
+
+class OutdatedSchemaError(RuntimeError):
+    """The shot table predates the current schema and has to be migrated before ingesting."""
+
+
+def check_schema(conn, table_name="prem_data"):
+    """
+    Raise OutdatedSchemaError if the shot table exists without the current schema.
+
+    ingest_shots needs the table's uniqueness key. Long-running writers also
+    call this before they start, so an old database stops the run up front
+    rather than failing once per match.
+    """
+    if table_exists(conn, table_name) and not is_current(conn, table_name):
+        raise OutdatedSchemaError(
+            f"Table '{table_name}' predates the current schema; upgrade the database with "
+            f"`python -m data.migrate_db` before ingesting"
+        )
+
+
+def upsert_sql(columns, table_name="prem_data"):
+    """INSERT statement that skips events already stored under the natural key."""
+    return (
+        f"INSERT INTO {quote(table_name)} ({', '.join(quote(c) for c in columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT ({', '.join(quote(c) for c in PREM_DATA_KEY)}) DO NOTHING"
+    )
+
+
+def ingest_shots(shot_data, db_path=None, table_name="prem_data", conn=None):
+    """
+    Write shot events to the database idempotently, in one transaction.
+
+    Rows are shaped to the prem_data schema and inserted with executemany;
+    events already in the table (same natural key, see PREM_DATA_KEY) are
+    skipped, so re-ingesting an overlapping scrape or re-uploading a CSV
+    changes nothing. match_summaries is refreshed for the ingested matches in
+    the same transaction.
+
+    A table that predates the current schema raises OutdatedSchemaError
+    (run python -m data.migrate_db first); a missing table is created.
+
+    Args:
+        shot_data (DataFrame): Events with prem_data columns ('EventType' is accepted)
+        db_path (str): Database path (None for the configured database)
+        table_name (str): Shot table to write to
+        conn: Connection to use instead of connect(db_path)
+
+    Returns:
+        dict: Counts of rows inserted, skipped as already present, and
+              skipped as invalid (no match_url), plus the number of matches
+    """
+    rows = conform_rows(shot_data)
+    if 'match_url' not in rows.columns:
+        raise ValueError("Shot data needs a match_url column")
+
+    valid = rows['match_url'].notna()
+    invalid = int((~valid).sum())
+    rows = rows[valid]
+    match_urls = rows['match_url'].unique()
+
+    # Plain Python values for sqlite3 (NaN becomes None for nullable columns)
+    columns = list(rows.columns)
+    records = rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+
+    conn = conn or connect(db_path)
+    check_schema(conn, table_name)
+    with conn:
+        create_schema(conn, table_name)
+        before = conn.total_changes
+        conn.executemany(upsert_sql(columns, table_name), records)
+        inserted = conn.total_changes - before
+        if table_name == "prem_data" and len(match_urls):
+            refresh_match_summaries(conn, match_urls)
+
+    return {
+        'inserted': inserted,
+        'skipped': len(rows) - inserted,
+        'invalid': invalid,
+        'matches': len(match_urls),
+    }
@@ -1,17 +1,81 @@
+import argparse
 import pandas as pd
-import sqlite3
 import os
 import sys
-from datetime import datetime
+import time
 
-def upload_csv_to_db(csv_path, db_path="team_model_db", table_name="prem_data"):
+from data.db import connect, get_db_path
+from data.ingest import ingest_shots
+
+# Rows read, and inserted in one transaction, at a time
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def add_season(df):
+    """
+    Add a season column derived from match_date, in place.
+    
+    Matches from August onwards belong to the season starting that year,
+    earlier ones to the season that started the year before (2024-03-01 is
+    season 2023). Dates that are missing or not YYYY-MM-DD get no season.
+    """
+    dates = pd.to_datetime(df['match_date'], format='%Y-%m-%d', errors='coerce')
+    df['season'] = (dates.dt.year - (dates.dt.month < 8)).astype('Int64')
+    return df
+
+
+def split_on_matches(chunks):
+    """
+    Regroup CSV chunks so that no match is split between two of them.
+    
+    ingest_shots numbers identical consecutive events within each frame it
+    is given (the occurrence column), so a repeated shot cut off from its
+    twin by a chunk boundary would be numbered 0 again and dropped as a
+    duplicate. The rows of the last match in each chunk are held back and put
+    in front of the next chunk.
+    
+    Args:
+        chunks: Iterable of DataFrames, e.g. pd.read_csv(..., chunksize=...)
+    
+    Yields:
+        DataFrame: Chunks that end on a match boundary
+    """
+    held = None
+    for df in chunks:
+        if held is not None:
+            df = pd.concat([held, df], ignore_index=True)
+            held = None
+        if 'match_url' not in df.columns or df.empty:
+            yield df
+            continue
+        urls = df['match_url']
+        last_match_start = urls.ne(urls.shift()).to_numpy().nonzero()[0][-1]
+        if last_match_start > 0:
+            yield df.iloc[:last_match_start]
+        held = df.iloc[last_match_start:]
+    if held is not None:
+        yield held
+
+
+def upload_csv_to_db(csv_path, db_path=None, table_name="prem_data", chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Upload data from a CSV file to a SQLite database table.
     
+    The CSV is streamed in chunks of about chunk_size rows (extended to the
+    end of the last match, see split_on_matches), each inserted with a
+    prepared bulk statement in its own transaction, so memory stays bounded
+    however large the file is. Progress and throughput are printed after
+    every chunk.
+    
+    Safe to re-run: events already in the table are skipped, so no
+    duplicate check or confirmation is needed. An interrupted upload can be
+    resumed by running it again.
+    
     Args:
         csv_path (str): Path to the CSV file
-        db_path (str): Path to the SQLite database
+        db_path (str): Path to the SQLite database (defaults to $TEAM_MODEL_DB or data/team_model_db.db)
         table_name (str): Name of the table to insert data into
+        chunk_size (int): Rows per chunk and transaction
     
     Returns:
         bool: True if successful, False otherwise
@@ -24,99 +88,53 @@ def upload_csv_to_db(csv_path, db_path="team_model_db", table_name="prem_data"):
         return False
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_path)
-        print(f"Successfully read {len(df)} rows from CSV")
-        
-        # Display sample of data
-        print("\nSample data (first 3 rows):")
-        print(df.head(3))
-        
-        # Check for season column, add if missing
-        if 'season' not in df.columns:
-            print("\nAdding 'season' column based on match_date...")
-            # Function to determine season based on match date
-            def get_season(date_str):
-                if pd.isna(date_str):
-                    return None
-                try:
-                    date = datetime.strptime(date_str, '%Y-%m-%d')
-                    # If month is August or later, use current year, otherwise previous year
-                    if date.month >= 8:
-                        return date.year
-                    else:
-                        return date.year - 1
-                except:
-                    return None
-            
-            # Apply function to create season column
-            df['season'] = df['match_date'].apply(get_season)
-            print("Season column added")
-        
-        # Connect to database
-        print(f"\nConnecting to database: {db_path}")
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        conn = connect(db_path)
+        print(f"Inserting data into {table_name} in {get_db_path(db_path)} in chunks of {chunk_size} rows...")
         
-        # Check if table exists
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
-        table_exists = cursor.fetchone() is not None
+        totals = {'rows': 0, 'inserted': 0, 'skipped': 0, 'invalid': 0}
+        match_urls = set()
+        file_size = os.path.getsize(csv_path)
+        start = time.perf_counter()
         
-        if table_exists:
-            # Get current row count
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            before_count = cursor.fetchone()[0]
-            print(f"Current rows in {table_name}: {before_count}")
-            
-            # Check for duplicate prevention
-            should_check_duplicates = input("Check for duplicates before inserting? (y/n): ").lower() == 'y'
-            
-            if should_check_duplicates and 'match_url' in df.columns and 'Minute' in df.columns and 'Player' in df.columns:
-                print("Checking for potential duplicates...")
-                # Get a list of existing match URLs
-                cursor.execute(f"SELECT DISTINCT match_url FROM {table_name}")
-                existing_urls = [row[0] for row in cursor.fetchall()]
+        with open(csv_path, 'rb') as f:
+            for chunk_number, df in enumerate(split_on_matches(pd.read_csv(f, chunksize=chunk_size))):
+                if chunk_number == 0:
+                    # Display sample of data
+                    print("\nSample data (first 3 rows):")
+                    print(df.head(3))
+                    if 'season' not in df.columns:
+                        print("\nAdding 'season' column based on match_date")
                 
-                # Filter out rows that might be duplicates
-                original_len = len(df)
-                df = df[~df['match_url'].isin(existing_urls)]
-                filtered_count = original_len - len(df)
+                # Check for season column, add if missing
+                if 'season' not in df.columns:
+                    add_season(df)
                 
-                if filtered_count > 0:
-                    print(f"Filtered out {filtered_count} potential duplicate rows")
-                    print(f"Proceeding with {len(df)} new rows")
-                else:
-                    print("No duplicates found")
-        else:
-            print(f"Table '{table_name}' does not exist, it will be created")
-            before_count = 0
-        
-        # Insert data
-        print(f"\nInserting data into {table_name}...")
-        df.to_sql(table_name, conn, if_exists='append', index=False)
-        
-        # Verify insertion
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        after_count = cursor.fetchone()[0]
-        rows_added = after_count - before_count
+                # One transaction per chunk; events already in the table are skipped
+                result = ingest_shots(df, table_name=table_name, conn=conn)
+                totals['rows'] += len(df)
+                for key in ('inserted', 'skipped', 'invalid'):
+                    totals[key] += result[key]
+                if 'match_url' in df.columns:
+                    match_urls.update(df['match_url'].dropna().unique())
+                
+                elapsed = time.perf_counter() - start
+                print(f"Chunk {chunk_number + 1}: {totals['rows']} rows "
+                      f"({100 * f.tell() / file_size if file_size else 100:.0f}% of file), "
+                      f"{totals['inserted']} inserted, {totals['rows'] / elapsed:,.0f} rows/s")
         
-        # Commit changes
-        conn.commit()
+        elapsed = time.perf_counter() - start
         print("Changes committed to database")
         
         # Report results
-        print(f"\nOperation completed:")
-        print(f"- Rows in CSV: {len(df)}")
-        print(f"- Rows added to database: {rows_added}")
-        print(f"- Total rows in table now: {after_count}")
-        
-        if rows_added != len(df):
-            print(f"\nWARNING: The number of rows added ({rows_added}) doesn't match the CSV row count ({len(df)})")
-            print("This could be due to constraints or data type issues.")
-        
-        # Close connection
-        cursor.close()
-        conn.close()
+        print(f"\nOperation completed in {elapsed:.1f}s:")
+        print(f"- Rows in CSV: {totals['rows']}")
+        print(f"- Rows added to database: {totals['inserted']}")
+        print(f"- Rows already in database (skipped): {totals['skipped']}")
+        if totals['invalid']:
+            print(f"- Rows without a match_url (skipped): {totals['invalid']}")
+        print(f"- Matches touched: {len(match_urls)}")
+        if elapsed > 0:
+            print(f"- Throughput: {totals['rows'] / elapsed:,.0f} rows/s")
         
         return True
     
@@ -125,22 +143,17 @@ def upload_csv_to_db(csv_path, db_path="team_model_db", table_name="prem_data"):
         return False
 
 if __name__ == "__main__":
-    # Check command line arguments
-    if len(sys.argv) < 2:
-        print("Usage: python csv_to_db.py path_to_csv [database_path] [table_name]")
-        print("\nExample: python csv_to_db.py data/recent_matches.csv team_model_db prem_data")
-        
-        # Ask for CSV path if not provided
-        csv_path = input("\nEnter path to CSV file: ")
-        if not csv_path:
-            print("No CSV path provided. Exiting.")
-            sys.exit(1)
-    else:
-        csv_path = sys.argv[1]
-    
-    # Get optional database path and table name
-    db_path = sys.argv[2] if len(sys.argv) > 2 else "data/team_model_db.db"
-    table_name = sys.argv[3] if len(sys.argv) > 3 else "prem_data"
+    parser = argparse.ArgumentParser(
+        description="Upload a CSV of shot events to the team model database.",
+        epilog="Example: python -m data.manual_upload_to_db data/recent_matches.csv data/team_model_db.db prem_data"
+    )
+    parser.add_argument("csv_path", help="CSV file to upload")
+    parser.add_argument("db_path", nargs="?", default=None,
+                        help="Path to the SQLite database (default: $TEAM_MODEL_DB or data/team_model_db.db)")
+    parser.add_argument("table_name", nargs="?", default="prem_data", help="Table to insert into (default: prem_data)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per chunk and transaction (default: {DEFAULT_CHUNK_SIZE})")
+    args = parser.parse_args()
     
     # Run the upload
-    upload_csv_to_db(csv_path, db_path, table_name)
\ No newline at end of file
+    sys.exit(0 if upload_csv_to_db(args.csv_path, args.db_path, args.table_name, args.chunk_size) else 1)
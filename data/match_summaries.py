@@ -0,0 +1,71 @@
+from data.schema import MATCH_SUMMARIES_COLUMNS, SCHEMA_VERSION, table_exists
+
+# Per-match goals, xG, PSxG, shots and red cards for each side, aggregated inside
+# SQLite. Matches need at least one event for each side, like the inner merge in
+# create_match_summaries. {where} restricts which prem_data rows are aggregated.
+SUMMARY_SELECT = """
+    SELECT match_url, match_date, home_team, away_team, season, division,
+           SUM(CASE WHEN Team = home_team AND Outcome = 'Goal' THEN 1 ELSE 0 END) AS home_goals,
+           TOTAL(CASE WHEN Team = home_team THEN xG END) AS home_xg,
+           TOTAL(CASE WHEN Team = home_team THEN PSxG END) AS home_psxg,
+           SUM(CASE WHEN Team = away_team AND Outcome = 'Goal' THEN 1 ELSE 0 END) AS away_goals,
+           TOTAL(CASE WHEN Team = away_team THEN xG END) AS away_xg,
+           TOTAL(CASE WHEN Team = away_team THEN PSxG END) AS away_psxg,
+           SUM(CASE WHEN Team = home_team AND "Event Type" IN ('Shot', 'Penalty') THEN 1 ELSE 0 END) AS home_shots,
+           SUM(CASE WHEN Team = away_team AND "Event Type" IN ('Shot', 'Penalty') THEN 1 ELSE 0 END) AS away_shots,
+           SUM(CASE WHEN Team = home_team AND Outcome = 'Red Card' THEN 1 ELSE 0 END) AS home_red_cards,
+           SUM(CASE WHEN Team = away_team AND Outcome = 'Red Card' THEN 1 ELSE 0 END) AS away_red_cards
+    FROM prem_data
+    WHERE {where}
+      AND home_team IS NOT NULL AND away_team IS NOT NULL
+      AND season IS NOT NULL AND division IS NOT NULL
+    GROUP BY match_url, match_date, home_team, away_team, season, division
+    HAVING SUM(Team = home_team) > 0 AND SUM(Team = away_team) > 0
+"""
+
+
+def summaries_ready(conn):
+    """
+    Whether match_summaries covers every match in prem_data.
+
+    The table is only complete once migrate() has built it for the existing
+    rows; until then readers should aggregate prem_data directly.
+    """
+    return table_exists(conn, "match_summaries") and \
+        conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION
+
+
+def refresh_match_summaries(conn, match_urls=None):
+    """
+    Recompute match_summaries rows from prem_data.
+
+    Only the given matches are aggregated, using the match_url index, so
+    writers can call this with just the matches they ingested. Matches that
+    no longer qualify (no events for one side) are removed.
+
+    Args:
+        conn: Open sqlite3 connection; the caller commits
+        match_urls (iterable): Matches to refresh, or None to rebuild the whole table
+
+    Returns:
+        int: Number of match_summaries rows written
+    """
+    columns = ', '.join(MATCH_SUMMARIES_COLUMNS)
+    if match_urls is None:
+        conn.execute("DELETE FROM match_summaries")
+        cursor = conn.execute(
+            f"INSERT OR REPLACE INTO match_summaries ({columns}) {SUMMARY_SELECT.format(where='1')}"
+        )
+        return cursor.rowcount
+
+    # Stage the urls in a temp table so any number of them can be refreshed at once
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_urls (match_url TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM refresh_urls")
+    conn.executemany("INSERT OR IGNORE INTO refresh_urls VALUES (?)", ((url,) for url in match_urls))
+    conn.execute("DELETE FROM match_summaries WHERE match_url IN (SELECT match_url FROM refresh_urls)")
+    cursor = conn.execute(
+        f"INSERT OR REPLACE INTO match_summaries ({columns}) "
+        f"{SUMMARY_SELECT.format(where='match_url IN (SELECT match_url FROM refresh_urls)')}"
+    )
+    conn.execute("DELETE FROM refresh_urls")
+    return cursor.rowcount
@@ -0,0 +1,187 @@
+import argparse
+import os
+import sys
+
+from data.db import connect, get_db_path
+from data.match_summaries import refresh_match_summaries
+from data.schema import (COLUMN_ALIASES, PREM_DATA_COLUMNS, PREM_DATA_KEY, SCHEMA_VERSION,
+                         create_indexes, create_schema, create_table_sql, is_current, quote,
+                         table_columns, table_exists)
+
+# Duplicate events listed in the migration report, at most
+DUPLICATE_EXAMPLES = 10
+
+
+def _upgrade_shot_table(conn, table_name):
+    """
+    Copy an untyped shot table into the typed schema, inside the caller's transaction.
+
+    Match dates are normalised to YYYY-MM-DD, numeric columns are cast and
+    missing key values get their column defaults. Events are numbered with
+    occurrence in rowid order, as data.schema.event_occurrences numbers them
+    on ingest, so a repeated shot on consecutive rows survives while a match
+    or row that was stored again is dropped. Rows without a match_url are dropped.
+
+    Returns:
+        dict: rows_before, rows_after, duplicates_removed, invalid_removed,
+              dropped_columns and duplicate_examples (the first
+              DUPLICATE_EXAMPLES duplicates removed, as dicts)
+    """
+    old_columns = table_columns(conn, table_name)
+    source = {}
+    for column in old_columns:
+        target = COLUMN_ALIASES.get(column, column)
+        if target in PREM_DATA_COLUMNS and target not in source:
+            source[target] = column
+    if 'match_url' not in source:
+        raise ValueError(f"Table '{table_name}' has no match_url column, cannot migrate")
+    dropped_columns = [c for c in old_columns if c not in source.values()]
+
+    # Build the SELECT that converts old values to the new types
+    expressions = []
+    for column, decl in PREM_DATA_COLUMNS.items():
+        if column not in source:
+            continue
+        expr = quote(source[column])
+        if column == 'match_date':
+            expr = f"substr({expr}, 1, 10)"
+        elif decl.startswith('INTEGER'):
+            expr = f"CAST(CAST({expr} AS REAL) AS INTEGER)"
+        elif decl.startswith('REAL'):
+            expr = f"CAST({expr} AS REAL)"
+        if 'DEFAULT' in decl:
+            default = decl.split('DEFAULT', 1)[1].strip()
+            expr = f"COALESCE({expr}, {default})"
+        expressions.append(f"{expr} AS {quote(column)}")
+    columns = [c for c in PREM_DATA_COLUMNS if c in source or c == 'occurrence']
+    key = [quote(c) for c in PREM_DATA_KEY if c in columns]
+
+    old_table = f"{table_name}_pre_migration"
+    rows_before = conn.execute(f"SELECT COUNT(*) FROM {quote(table_name)}").fetchone()[0]
+    conn.execute(f"ALTER TABLE {quote(table_name)} RENAME TO {quote(old_table)}")
+    conn.execute(create_table_sql(table_name))
+
+    converted = (f"SELECT rowid AS source_rowid, {', '.join(expressions)} FROM {quote(old_table)} "
+                 f"WHERE {quote(source['match_url'])} IS NOT NULL")
+    if 'occurrence' not in source:
+        # Runs of identical events on consecutive rows, numbered from 0 (see event_occurrences)
+        same_as_previous = ' AND '.join(f"{c} IS LAG({c}) OVER previous" for c in key[:-1])
+        converted = f"""
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY run ORDER BY source_rowid) - 1 AS occurrence
+            FROM (SELECT *, SUM(new_run) OVER (ORDER BY source_rowid) AS run
+                  FROM (SELECT *, CASE WHEN {same_as_previous} THEN 0 ELSE 1 END AS new_run
+                        FROM ({converted})
+                        WINDOW previous AS (ORDER BY source_rowid)))"""
+    conn.execute(
+        f"CREATE TEMP TABLE migrating AS SELECT *, "
+        f"ROW_NUMBER() OVER (PARTITION BY {', '.join(key)} ORDER BY source_rowid) AS copy FROM ({converted})"
+    )
+    target_columns = ', '.join(quote(c) for c in columns)
+    conn.execute(
+        f"INSERT INTO {quote(table_name)} ({target_columns}) "
+        f"SELECT {target_columns} FROM temp.migrating WHERE copy = 1 ORDER BY source_rowid"
+    )
+    duplicates_removed = conn.execute("SELECT COUNT(*) FROM temp.migrating WHERE copy > 1").fetchone()[0]
+    cursor = conn.execute(
+        f"SELECT {', '.join(key)} FROM temp.migrating WHERE copy > 1 "
+        f"ORDER BY source_rowid LIMIT {DUPLICATE_EXAMPLES}"
+    )
+    duplicate_examples = [dict(zip([d[0] for d in cursor.description], row)) for row in cursor]
+    conn.execute("DROP TABLE temp.migrating")
+
+    rows_after = conn.execute(f"SELECT COUNT(*) FROM {quote(table_name)}").fetchone()[0]
+    conn.execute(f"DROP TABLE {quote(old_table)}")
+    # Old indexes went with the old table; create the new ones
+    create_indexes(conn, table_name)
+    return {
+        'rows_before': rows_before,
+        'rows_after': rows_after,
+        'duplicates_removed': duplicates_removed,
+        'invalid_removed': rows_before - rows_after - duplicates_removed,
+        'dropped_columns': dropped_columns,
+        'duplicate_examples': duplicate_examples,
+    }
+
+
+def migrate(db_path, table_name="prem_data"):
+    """
+    Upgrade a database to the current schema in place.
+
+    An untyped shot table is copied into the typed, indexed prem_data schema
+    and match_summaries is built for every match, all in one transaction.
+    Columns that are not part of the schema are reported and dropped.
+
+    Args:
+        db_path (str): Path to the SQLite database (None for the configured database)
+        table_name (str): Name of the shot table
+
+    Returns:
+        dict: Summary with rows_before, rows_after, duplicates_removed (and
+              duplicate_examples), invalid_removed (rows without a match_url),
+              dropped_columns, summaries_built and whether anything was migrated
+    """
+    conn = connect(db_path)
+    summary = {'migrated': False, 'duplicates_removed': 0, 'duplicate_examples': [], 'invalid_removed': 0,
+               'dropped_columns': [], 'summaries_built': None}
+    with conn:
+        # Begin explicitly, otherwise sqlite3 runs the DDL below outside the transaction
+        conn.execute("BEGIN")
+        if table_exists(conn, table_name) and not is_current(conn, table_name):
+            summary.update(_upgrade_shot_table(conn, table_name), migrated=True)
+        create_schema(conn, table_name)
+
+        if table_name == "prem_data" and conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            summary['summaries_built'] = refresh_match_summaries(conn)
+            summary['migrated'] = True
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        rows = conn.execute(f"SELECT COUNT(*) FROM {quote(table_name)}").fetchone()[0]
+        summary.setdefault('rows_before', rows)
+        summary['rows_after'] = rows
+
+    if summary['migrated']:
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Upgrade a team model database to the current schema in place."
+    )
+    parser.add_argument("db_path", nargs="?", default=None,
+                        help="Path to the SQLite database (default: $TEAM_MODEL_DB or data/team_model_db.db)")
+    parser.add_argument("--table", default="prem_data", help="Shot table to migrate (default: prem_data)")
+    args = parser.parse_args(argv)
+
+    db_path = get_db_path(args.db_path)
+    if not os.path.exists(db_path):
+        print(f"ERROR: Database '{db_path}' does not exist!")
+        return 1
+
+    print(f"Migrating {db_path} to schema version {SCHEMA_VERSION}...")
+    summary = migrate(db_path, args.table)
+
+    if not summary['migrated']:
+        print(f"Already up to date ({summary['rows_after']} rows), indexes checked")
+        return 0
+
+    print("Migration completed:")
+    print(f"- Rows before: {summary['rows_before']}")
+    print(f"- Rows after: {summary['rows_after']}")
+    print(f"- Duplicate events removed: {summary['duplicates_removed']}")
+    for event in summary['duplicate_examples']:
+        print("    " + ", ".join(f"{column}={value}" for column, value in event.items()))
+    if summary['duplicates_removed'] > len(summary['duplicate_examples']):
+        print(f"    ... and {summary['duplicates_removed'] - len(summary['duplicate_examples'])} more")
+    if summary['invalid_removed']:
+        print(f"- Rows without a match_url removed: {summary['invalid_removed']}")
+    if summary['dropped_columns']:
+        print(f"- Columns not in the schema (dropped): {', '.join(summary['dropped_columns'])}")
+    if summary['summaries_built'] is not None:
+        print(f"- Match summaries built: {summary['summaries_built']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
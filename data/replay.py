@@ -0,0 +1,190 @@
+"""
+Offline replay of saved match reports.
+
+Parses a directory of saved match report pages with the scraper's own
+parse_match_page, on a pool of worker processes, and writes the rows through
+the normal ingest path (ingest_shots, one transaction per match), so parsing
+and ingest can be tested and timed at scale without touching fbref.
+
+The directory can hold .html or gzipped .html.gz files (searched
+recursively), or be the scraper's HTTP cache (data/http_cache), in which case
+each page is stored under the URL it was fetched from. For plain files the
+match_url is the page's canonical link, or the file's own file:// URL.
+
+Usage (from the repo root):
+
+    python -m data.replay data/http_cache --db /tmp/replay.db
+    python -m data.replay path/to/pages --no-ingest --workers 8
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from data.db import get_db_path
+from data.ingest import ingest_shots
+from data.scrape_matches import MatchPageError, parse_match_page
+
+CANONICAL_LINK = re.compile(r'<link\b[^>]*\brel="canonical"[^>]*>', re.IGNORECASE)
+HREF = re.compile(r'\bhref="([^"]+)"', re.IGNORECASE)
+
+
+def read_saved_page(path):
+    """Text of a saved page, gunzipping .gz files."""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return f.read()
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def find_saved_pages(pages_dir):
+    """
+    List the saved pages below pages_dir.
+
+    Returns:
+        list: (path, match_url) pairs, with match_url None when it has to be
+              read from the page itself
+    """
+    entries_dir = os.path.join(pages_dir, 'urls')
+    if os.path.isdir(entries_dir) and os.path.isdir(os.path.join(pages_dir, 'objects')):
+        # An HttpCache: the URL entries say which object holds each page
+        pages = []
+        for name in sorted(os.listdir(entries_dir)):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(entries_dir, name)) as f:
+                entry = json.load(f)
+            digest = entry['sha256']
+            pages.append((os.path.join(pages_dir, 'objects', digest[:2], digest + '.html.gz'), entry['url']))
+        return pages
+
+    pages = []
+    for root, _, files in os.walk(pages_dir):
+        for name in sorted(files):
+            if name.endswith(('.html', '.html.gz')):
+                pages.append((os.path.join(root, name), None))
+    return pages
+
+
+def _page_url(page_html, path):
+    link = CANONICAL_LINK.search(page_html)
+    href = HREF.search(link.group(0)) if link else None
+    return href.group(1) if href else Path(os.path.abspath(path)).as_uri()
+
+
+def parse_saved_page(page):
+    """
+    Read and parse one saved page (run in the worker processes).
+
+    Args:
+        page (tuple): (path, match_url or None) from find_saved_pages
+
+    Returns:
+        tuple: (match_url, DataFrame or None, seconds spent parsing, MatchPageError
+               message or None)
+    """
+    path, match_url = page
+    page_html = read_saved_page(path)
+    match_url = match_url or _page_url(page_html, path)
+    start = time.perf_counter()
+    try:
+        match_df, error = parse_match_page(page_html, match_url), None
+    except MatchPageError as e:
+        match_df, error = None, str(e)
+    return match_url, match_df, time.perf_counter() - start, error
+
+
+def replay(pages_dir, db_path=None, workers=None, ingest=True):
+    """
+    Parse every saved page in pages_dir in parallel and ingest the results.
+
+    Match reports without a shots table are counted as empty; pages that
+    can't be read as a match report (truncated pages, or schedule pages in an
+    HTTP cache) are counted as unreadable.
+
+    Args:
+        pages_dir (str): Directory of saved pages or an HTTP cache directory
+        db_path (str): Database to ingest into (None for the configured database)
+        workers (int): Parser processes (None for one per CPU, 0 to parse in this process)
+        ingest (bool): Write the parsed rows to the database; False only parses
+
+    Returns:
+        dict: Counts of pages, parsed, empty and unreadable pages, events and
+              rows inserted, plus wall time, total parse time and pages per second
+    """
+    pages = find_saved_pages(pages_dir)
+    summary = {'pages': len(pages), 'parsed': 0, 'empty': 0, 'unreadable': 0, 'events': 0, 'inserted': 0,
+               'skipped': 0, 'parse_time': 0.0}
+
+    start = time.perf_counter()
+    if workers == 0:
+        results = map(parse_saved_page, pages)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, len(pages) // (4 * (workers or os.cpu_count() or 1)))
+        results = pool.map(parse_saved_page, pages, chunksize=chunksize)
+
+    try:
+        for match_url, match_df, parse_time, error in results:
+            summary['parse_time'] += parse_time
+            if error is not None:
+                summary['unreadable'] += 1
+                continue
+            if match_df is None:
+                summary['empty'] += 1
+                continue
+            summary['parsed'] += 1
+            summary['events'] += len(match_df)
+            if ingest:
+                result = ingest_shots(match_df, db_path=db_path)
+                summary['inserted'] += result['inserted']
+                summary['skipped'] += result['skipped']
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    summary['wall_time'] = time.perf_counter() - start
+    summary['pages_per_sec'] = len(pages) / summary['wall_time'] if summary['wall_time'] > 0 else None
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse a directory of saved match reports and ingest the rows.")
+    parser.add_argument("pages_dir", help="Directory of saved .html/.html.gz pages, or the scraper's HTTP cache")
+    parser.add_argument("--db", default=None,
+                        help="Path to the SQLite database (default: $TEAM_MODEL_DB or data/team_model_db.db)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: one per CPU, 0 parses in this process)")
+    parser.add_argument("--no-ingest", action="store_true", help="Only parse, don't write to the database")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.pages_dir):
+        print(f"ERROR: '{args.pages_dir}' is not a directory")
+        return 1
+    if not args.no_ingest:
+        print(f"Ingesting into {get_db_path(args.db)}")
+
+    summary = replay(args.pages_dir, db_path=args.db, workers=args.workers, ingest=not args.no_ingest)
+
+    print(f"\nReplayed {summary['pages']} pages in {summary['wall_time']:.1f}s "
+          f"({summary['pages_per_sec'] or 0:.1f} pages/s)")
+    print(f"- Parsed: {summary['parsed']} ({summary['empty']} with nothing to keep)")
+    if summary['unreadable']:
+        print(f"- Unreadable: {summary['unreadable']} (not complete match reports)")
+    print(f"- Events: {summary['events']}")
+    if summary['pages']:
+        print(f"- Parse time per page: {1000 * summary['parse_time'] / summary['pages']:.1f} ms")
+    if not args.no_ingest:
+        print(f"- Rows inserted: {summary['inserted']} ({summary['skipped']} already present)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
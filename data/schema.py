@@ -0,0 +1,177 @@
+import pandas as pd
+
+# Bump when the schema below changes, and teach data.migrate_db how to upgrade
+SCHEMA_VERSION = 3
+
+# Columns of prem_data in table order, with their declared types
+PREM_DATA_COLUMNS = {
+    'Minute': "INTEGER NOT NULL DEFAULT 0",
+    'Team': "TEXT NOT NULL DEFAULT ''",
+    'Player': "TEXT NOT NULL DEFAULT ''",
+    'Event Type': "TEXT NOT NULL DEFAULT 'Shot'",
+    'Outcome': "TEXT NOT NULL DEFAULT ''",
+    'xG': "REAL NOT NULL DEFAULT 0",
+    'PSxG': "REAL NOT NULL DEFAULT 0",
+    'occurrence': "INTEGER NOT NULL DEFAULT 0",
+    'match_url': "TEXT NOT NULL",
+    'match_date': "TEXT",  # YYYY-MM-DD
+    'home_team': "TEXT",
+    'away_team': "TEXT",
+    'division': "TEXT",
+    'season': "INTEGER",
+}
+
+# Natural key of a shot or card event. fbref has no event id, so an event is
+# identified by everything it records within a match. Two real shots can record
+# the same thing (same player, minute and xG), so occurrence numbers identical
+# events that follow each other in a match's shot table (see event_occurrences).
+# match_url comes first so the key's index also serves lookups by match_url.
+PREM_DATA_KEY = ['match_url', 'Team', 'Player', 'Minute', 'Event Type', 'Outcome', 'xG', 'PSxG', 'occurrence']
+
+PREM_DATA_INDEXES = {
+    'idx_prem_data_match_date': ['match_date'],
+    'idx_prem_data_season_division': ['season', 'division'],
+}
+
+# One row per match, maintained from prem_data by data.match_summaries.refresh_match_summaries
+MATCH_SUMMARIES_COLUMNS = {
+    'match_url': "TEXT PRIMARY KEY",
+    'match_date': "TEXT NOT NULL",  # YYYY-MM-DD
+    'home_team': "TEXT NOT NULL",
+    'away_team': "TEXT NOT NULL",
+    'season': "INTEGER NOT NULL",
+    'division': "TEXT NOT NULL",
+    'home_goals': "INTEGER NOT NULL",
+    'home_xg': "REAL NOT NULL",
+    'home_psxg': "REAL NOT NULL",
+    'away_goals': "INTEGER NOT NULL",
+    'away_xg': "REAL NOT NULL",
+    'away_psxg': "REAL NOT NULL",
+    'home_shots': "INTEGER NOT NULL",
+    'away_shots': "INTEGER NOT NULL",
+    'home_red_cards': "INTEGER NOT NULL",
+    'away_red_cards': "INTEGER NOT NULL",
+}
+
+MATCH_SUMMARIES_INDEXES = {
+    'idx_match_summaries_match_date': ['match_date'],
+}
+
+# Older databases, and CSV exports, use this spelling for 'Event Type'
+COLUMN_ALIASES = {'EventType': 'Event Type'}
+
+
+def quote(name):
+    """Quote an identifier for SQLite (several prem_data columns contain spaces)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def create_table_sql(table_name="prem_data"):
+    """CREATE TABLE statement for prem_data."""
+    columns = [f"    {quote(name)} {decl}" for name, decl in PREM_DATA_COLUMNS.items()]
+    columns.append(f"    UNIQUE ({', '.join(quote(c) for c in PREM_DATA_KEY)})")
+    return f"CREATE TABLE IF NOT EXISTS {quote(table_name)} (\n" + ",\n".join(columns) + "\n)"
+
+
+def _create_indexes(conn, table_name, indexes, suffix=""):
+    for index_name, columns in indexes.items():
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(index_name + suffix)} "
+            f"ON {quote(table_name)} ({', '.join(quote(c) for c in columns)})"
+        )
+
+
+def create_indexes(conn, table_name="prem_data"):
+    """Create the prem_data indexes if they don't exist."""
+    suffix = "" if table_name == "prem_data" else f"_{table_name}"
+    _create_indexes(conn, table_name, PREM_DATA_INDEXES, suffix)
+
+
+def create_match_summaries_table(conn):
+    """Create the match_summaries table and its indexes if they don't exist."""
+    columns = [f"    {quote(name)} {decl}" for name, decl in MATCH_SUMMARIES_COLUMNS.items()]
+    conn.execute("CREATE TABLE IF NOT EXISTS match_summaries (\n" + ",\n".join(columns) + "\n)")
+    _create_indexes(conn, "match_summaries", MATCH_SUMMARIES_INDEXES)
+
+
+def create_schema(conn, table_name="prem_data"):
+    """
+    Create the typed prem_data table, match_summaries and their indexes if they
+    don't exist.
+
+    Existing tables are left alone; use data.migrate_db to upgrade them. A shot table
+    under another name gets no match_summaries, which always follows prem_data.
+    """
+    conn.execute(create_table_sql(table_name))
+    create_indexes(conn, table_name)
+    if table_name != "prem_data":
+        return
+    summaries_existed = table_exists(conn, "match_summaries")
+    create_match_summaries_table(conn)
+    # A fresh database is at the current version; anything else goes through data.migrate_db
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0 and not summaries_existed \
+            and is_current(conn, table_name) \
+            and conn.execute("SELECT 1 FROM prem_data LIMIT 1").fetchone() is None:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def table_exists(conn, table_name):
+    """Whether the database has a table with this name."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,)
+    ).fetchone() is not None
+
+
+def event_occurrences(df):
+    """
+    Number repeated events: 0 for an event, 1 for an identical event (same
+    match and key values) on the very next row, and so on.
+
+    fbref lists a repeated shot on consecutive rows of a match's shot table,
+    while a match or a row that is stored again lands elsewhere in the table.
+    Numbering runs of identical rows keeps the first apart and lets the
+    uniqueness key drop the second. data.migrate_db numbers existing rows the
+    same way, in rowid order.
+
+    Returns:
+        Series: Occurrence of each row, aligned with df
+    """
+    columns = [c for c in PREM_DATA_KEY if c in df.columns and c != 'occurrence']
+    repeated = (df[columns] == df[columns].shift()).all(axis=1)
+    return df.groupby((~repeated).cumsum()).cumcount()
+
+
+def conform_rows(df):
+    """
+    Shape a DataFrame of shot events to the prem_data schema before inserting.
+
+    Renames legacy column spellings, normalises match_date to YYYY-MM-DD,
+    fills missing key values with the column defaults (NULLs never compare
+    equal, so they would slip past the uniqueness key) and adds occurrence
+    (see event_occurrences) when df doesn't have it.
+
+    Returns:
+        DataFrame: Copy of df with only the schema columns that df has, plus occurrence
+    """
+    df = df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if v not in df.columns})
+    df = df[[c for c in PREM_DATA_COLUMNS if c in df.columns]].copy()
+    if 'match_date' in df.columns and not pd.api.types.is_string_dtype(df['match_date']):
+        df['match_date'] = pd.to_datetime(df['match_date']).dt.strftime('%Y-%m-%d')
+    for column, decl in PREM_DATA_COLUMNS.items():
+        if column in df.columns and 'DEFAULT' in decl:
+            default = decl.split('DEFAULT', 1)[1].strip()
+            df[column] = df[column].fillna(default.strip("'") if default.startswith("'") else float(default))
+    if 'occurrence' not in df.columns and 'match_url' in df.columns:
+        df['occurrence'] = event_occurrences(df)
+    return df
+
+
+def table_columns(conn, table_name):
+    """Column names of a table, in order."""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({quote(table_name)})")]
+
+
+def is_current(conn, table_name):
+    """Whether the table already has the typed schema with its uniqueness key."""
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone()
+    return sql is not None and 'UNIQUE' in sql[0] and table_columns(conn, table_name) == list(PREM_DATA_COLUMNS)
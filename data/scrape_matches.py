@@ -1,39 +1,473 @@
+import numpy as np
 import pandas as pd
 import time
 import random
 import os
-import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import requests
-from bs4 import BeautifulSoup
+from functools import partial
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Comment
 import html
 import re
+import sqlite3
+
+from data.checkpoint import ScrapeCheckpoint
+from data.db import connect, get_db_path
+from data.http_client import DEFAULT_REQUESTS_PER_MINUTE, Fetcher, HttpCache
+from data.ingest import OutdatedSchemaError, check_schema, ingest_shots
 
 # Try to import lxml, use html.parser as fallback
 try:
-    import lxml
+    import lxml.html
     DEFAULT_PARSER = 'lxml'
 except ImportError:
     print("lxml parser not available, using html.parser instead")
     DEFAULT_PARSER = 'html.parser'
 
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fetched pages are cached here, so reruns revalidate instead of downloading again
+DEFAULT_CACHE_DIR = os.path.join(DATA_DIR, 'http_cache')
+
+# Match reports rarely change once published; cached copies younger than this
+# are used without asking the server (the schedule page is always revalidated)
+MATCH_REPORT_MAX_AGE = 7 * 24 * 3600
+
+
+# fbref competition ids, by the name used in its URLs
+COMPETITIONS = {
+    'Premier-League': 9,
+    'Championship': 10,
+    'League-One': 15,
+    'League-Two': 16,
+    'La-Liga': 12,
+    'Serie-A': 11,
+    'Bundesliga': 20,
+    'Ligue-1': 13,
+}
+
+
+def schedule_url(season, competition='Premier-League'):
+    """fbref "Scores & Fixtures" page for one competition and season, e.g. ("2024-2025", "Championship")."""
+    if competition not in COMPETITIONS:
+        raise ValueError(f"Unknown competition '{competition}', expected one of {', '.join(COMPETITIONS)}")
+    return (f"https://fbref.com/en/comps/{COMPETITIONS[competition]}/{season}/schedule/"
+            f"{season}-{competition}-Scores-and-Fixtures")
+
+
+def _find_fixtures_table(soup, season=None, comp_id=9):
+    selectors = ["table.stats_table.sortable", "table.stats_table"]
+    if season:
+        selectors.insert(0, f"table#sched_{season}_{comp_id}_1")
+    for selector in selectors:
+        table = soup.select_one(selector)
+        if table is not None:
+            return table
+    return None
+
+
+def parse_fixtures_html(page_html, season=None, base_url="https://fbref.com", comp_id=9):
+    """
+    Read the fixtures from a fbref "Scores & Fixtures" page without a browser.
+    
+    Looks for the same tables the Selenium path waits for, including tables
+    fbref ships inside HTML comments.
+    
+    Args:
+        page_html (str): Schedule page HTML
+        season (str): Season such as "2024-2025", to pick the sched_{season}_{comp_id}_1 table
+        base_url (str): URL the page came from, to make match report links absolute
+        comp_id (int): fbref competition id (see COMPETITIONS)
+    
+    Returns:
+        list: (date_text, match_url) for every fixture row in table order, with
+              match_url None when there is no match report yet; None if the
+              page has no fixtures table
+    """
+    soup = BeautifulSoup(page_html, DEFAULT_PARSER)
+    table = _find_fixtures_table(soup, season, comp_id)
+    if table is None:
+        for comment in soup.find_all(string=lambda text: isinstance(text, Comment) and 'stats_table' in text):
+            table = _find_fixtures_table(BeautifulSoup(comment, DEFAULT_PARSER), season, comp_id)
+            if table is not None:
+                break
+    if table is None:
+        return None
+    
+    fixtures = []
+    for row in table.find_all('tr'):
+        date_cell = row.find('td', attrs={'data-stat': 'date'})
+        if date_cell is None:
+            continue
+        link = next((a for a in row.select('td a') if a.get_text(strip=True) == 'Match Report'), None)
+        match_url = urljoin(base_url, link['href']) if link is not None and link.get('href') else None
+        fixtures.append((date_cell.get_text(strip=True), match_url))
+    return fixtures
+
+
+def _has_class(name):
+    # XPath test for one token of a space-separated class attribute
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _stripped_text(element):
+    # Same text as BeautifulSoup's get_text(strip=True)
+    return ''.join(text.strip() for text in element.itertext())
+
+
+class _LxmlMatchPage:
+    """
+    Reads the parts of a match report parse_match_page needs with lxml XPath.
+    
+    Only the elements that are used are visited; nothing else of the page is
+    converted to Python objects.
+    """
+    
+    def __init__(self, page_html):
+        self.root = lxml.html.document_fromstring(page_html)
+    
+    def _first(self, path):
+        found = self.root.xpath(path)
+        return found[0] if found else None
+    
+    def is_match_report(self):
+        return self._first(f"//div[{_has_class('scorebox')}]") is not None
+    
+    def match_date(self):
+        venue_time = self._first(f"//span[{_has_class('venuetime')}]")
+        return venue_time.attrib['data-venue-date'] if venue_time is not None else None
+    
+    def team_names(self):
+        team_stats = self._first("//div[@id='team_stats_extra']")
+        if team_stats is None:
+            return None
+        return [t.text_content().strip() for t in team_stats.xpath(f".//div[{_has_class('th')}]")]
+    
+    def division(self):
+        link = self._first("//a[contains(@href, '/comps/') and contains(@href, '-Stats')]")
+        return link.text_content().strip() if link is not None else None
+    
+    def shots_header_rows(self):
+        self.shots_table = self._first("//table[@id='shots_all']")
+        if self.shots_table is None:
+            return None
+        return [[_stripped_text(cell) for cell in tr.xpath('.//th|.//td')]
+                for tr in self.shots_table.xpath('.//tr')[:2]]
+    
+    def shots_body_rows(self):
+        body = self.shots_table.xpath('.//tbody')[0]
+        return [[_stripped_text(cell) for cell in tr.xpath('.//th|.//td')] for tr in body.xpath('.//tr')]
+    
+    def events(self):
+        events = []
+        for event in self.root.xpath("//div[starts-with(normalize-space(@class), 'event ')]"):
+            divs = list(event.iterdescendants('div'))
+            link = next(event.iterdescendants('a'), None)
+            event_type = next((div for div in divs if '—' in div.text_content()), None)
+            team_logo = next((img for img in event.iterdescendants('img')
+                              if 'teamlogo' in (img.get('class') or '').split()), None)
+            events.append((
+                _stripped_text(divs[0]) if divs else None,
+                _stripped_text(link) if link is not None else '',
+                _stripped_text(event_type) if event_type is not None else None,
+                team_logo.get('alt').replace(' Club Crest', '') if team_logo is not None else 'Unknown',
+            ))
+        return events
+
+
+class _SoupMatchPage:
+    """
+    Reads the same parts of a match report with BeautifulSoup, for when lxml
+    is not installed.
+    """
+    
+    def __init__(self, page_html):
+        self.soup = BeautifulSoup(page_html, DEFAULT_PARSER)
+    
+    def is_match_report(self):
+        return self.soup.find('div', class_='scorebox') is not None
+    
+    def match_date(self):
+        venue_time = self.soup.find('span', class_='venuetime')
+        return venue_time['data-venue-date'] if venue_time else None
+    
+    def team_names(self):
+        team_stats = self.soup.find('div', id='team_stats_extra')
+        if not team_stats:
+            return None
+        return [t.text.strip() for t in team_stats.find_all('div', class_='th')]
+    
+    def division(self):
+        link = self.soup.find('a', href=lambda x: x and '/comps/' in x and '-Stats' in x)
+        return link.text.strip() if link else None
+    
+    def shots_header_rows(self):
+        self.shots_table = self.soup.find('table', id='shots_all')
+        if not self.shots_table:
+            return None
+        return [[cell.get_text(strip=True) for cell in tr.find_all(['th', 'td'])]
+                for tr in self.shots_table.find_all('tr')[:2]]
+    
+    def shots_body_rows(self):
+        body = self.shots_table.find_all('tbody')[0]
+        return [[cell.get_text(strip=True) for cell in tr.find_all(['th', 'td'])] for tr in body.find_all('tr')]
+    
+    def events(self):
+        events = []
+        for event in self.soup.find_all('div', class_=re.compile(r'^event\s')):
+            first_div = event.find('div')
+            link = event.find('a')
+            event_type = next((div for div in event.find_all('div') if '—' in div.get_text()), None)
+            team_logo = event.find('img', class_='teamlogo')
+            events.append((
+                first_div.get_text(strip=True) if first_div else None,
+                link.get_text(strip=True) if link else '',
+                event_type.get_text(strip=True) if event_type else None,
+                team_logo.get('alt').replace(' Club Crest', '') if team_logo else 'Unknown',
+            ))
+        return events
+
+
+class MatchPageError(ValueError):
+    """A fetched page that can't be read as a complete match report (worth fetching again)."""
+
+
+MATCH_PAGE_READERS = {'lxml': _LxmlMatchPage, 'soup': _SoupMatchPage}
+DEFAULT_MATCH_PAGE_READER = 'lxml' if DEFAULT_PARSER == 'lxml' else 'soup'
+
+
+def parse_match_page(page_html, url, cutoff_date=None, season=None, reader=DEFAULT_MATCH_PAGE_READER):
+    """
+    Parse a fbref match report into prem_data rows (shots and red cards).
+    
+    Module level and free of scraper state so it can run in a process pool.
+    Only the shots_all table, the event divs and a few header elements are
+    read from the page, and the columns are derived with vectorized string
+    operations.
+    
+    Args:
+        page_html (str): Match report HTML
+        url (str): Match report URL, stored as match_url
+        cutoff_date (datetime): Skip matches played before this date
+        season (str): Season such as "2024-2025", used when the page has no date
+        reader (str): 'lxml' (XPath, the default when lxml is installed) or
+                      'soup' (BeautifulSoup); both give the same rows
+    
+    Returns:
+        DataFrame: One row per event, or None if the match is before cutoff_date
+                   or the report has no shots table (no xG data for the competition)
+
+    Raises:
+        MatchPageError: If the page is truncated, is not a match report or its
+                        shots table can't be read
+    """
+    if '</html>' not in page_html[-1024:].lower():
+        raise MatchPageError(f"Truncated page for {url}")
+    page = MATCH_PAGE_READERS[reader](page_html)
+    if not page.is_match_report():
+        raise MatchPageError(f"Not a match report: {url}")
+
+    # Extract match date
+    match_date = page.match_date()
+    
+    # Skip if match is older than cutoff date
+    if match_date and cutoff_date is not None:
+        match_datetime = datetime.strptime(match_date, '%Y-%m-%d')
+        if match_datetime < cutoff_date:
+            print(f"Skipping match from {match_date} (older than {cutoff_date.strftime('%Y-%m-%d')})")
+            return None
+    
+    # Extract teams
+    teams = page.team_names()
+    if teams is not None:
+        teams = [t for t in teams if t != '']
+        teams = list(dict.fromkeys(teams))  # Remove duplicates while preserving order
+        home_team = teams[0] if len(teams) > 0 else None
+        away_team = teams[1] if len(teams) > 1 else None
+    else:
+        home_team, away_team = None, None
+        
+    # Extract division
+    division = page.division()
+    
+    # Get shots data, first both header rows
+    header_rows = page.shots_header_rows()
+    if header_rows is None:
+        print(f"No shots table found for {url}")
+        return None
+    if len(header_rows) < 2:
+        raise MatchPageError(f"Invalid shots table structure for {url}")
+        
+    # Extract headers from the second row (contains actual column names)
+    headers = []
+    for header_text in header_rows[1]:
+        # If header is empty, use a placeholder
+        headers.append(header_text if header_text else f"Column_{len(headers)}")
+    
+    # Make headers unique
+    unique_headers = []
+    header_counts = {}
+    for header in headers:
+        if header in header_counts:
+            header_counts[header] += 1
+            unique_headers.append(f"{header}_{header_counts[header]}")
+        else:
+            header_counts[header] = 1
+            unique_headers.append(header)
+    
+    # Extract shot data rows, only rows that match the header count; empty cells become "0"
+    rows_data = [[value or "0" for value in row] for row in page.shots_body_rows()
+                 if len(row) == len(unique_headers)]
+    
+    # Create shots DataFrame with unique headers
+    shots_df = pd.DataFrame(rows_data, columns=unique_headers)
+    
+    # Check for penalties in player names and set event type accordingly
+    player_col = [col for col in shots_df.columns if 'Player' in col][0]
+    shots_df["Event Type"] = np.where(
+        shots_df[player_col].str.lower().str.contains("(pen)", regex=False), "Penalty", "Shot"
+    )
+    
+    # Get red cards data
+    events = page.events()
+    
+    times, scores, players, event_types, teams = [], [], [], [], []
+    
+    for time_score_text, player, event_type_text, team in events:
+        # Time and score
+        if time_score_text is not None:
+            time_score_text = html.unescape(time_score_text)
+            time = time_score_text.split("'")[0] + "'" if "'" in time_score_text else time_score_text
+            score = time_score_text.split("'")[1] if "'" in time_score_text else ''
+            times.append(time)
+            scores.append(score)
+            
+        # Player name
+        players.append(player)
+        
+        # Event type
+        event_types.append(event_type_text.split('—')[-1].strip() if event_type_text is not None else 'Unknown')
+        
+        # Team
+        teams.append(team)
+
+    # Create events DataFrame
+    events_df = pd.DataFrame({
+        'Time': times,
+        'Score': scores,
+        'Player': players,
+        'Event Type': event_types,
+        'Team': teams
+    })
+    
+    # Filter for red cards
+    red_cards_df = events_df[events_df['Event Type'].isin(['Red Card', 'Second Yellow Card'])]
+    red_cards_df = red_cards_df.reset_index(drop=True)
+    
+    # Process minute information
+    red_cards_df["Minute"] = red_cards_df["Time"].str.extract(r'(\d+)').fillna('0')
+    red_cards_df["Outcome"] = "Red Card"
+    
+    # Process shots DataFrame
+    minute_col = [col for col in shots_df.columns if 'Minute' in col][0]
+    squad_col = [col for col in shots_df.columns if 'Squad' in col][0]
+    outcome_col = [col for col in shots_df.columns if 'Outcome' in col][0]
+    xg_col = [col for col in shots_df.columns if 'xG' in col][0]
+    psxg_col = [col for col in shots_df.columns if 'PSxG' in col][0]
+    
+    shots_df["Minute"] = shots_df[minute_col].str.extract(r'(\d+)').fillna('0')
+    shots_df["Team"] = shots_df[squad_col]
+    shots_df["Outcome"] = shots_df[outcome_col]
+    shots_df["xG"] = shots_df[xg_col]
+    shots_df["PSxG"] = shots_df[psxg_col]
+    
+    shots_df = shots_df[["Minute", "Team", "Player", "Event Type", "Outcome", "xG", "PSxG"]]
+    
+    # Clean up data
+    shots_df.drop(shots_df[shots_df['Minute'] == ''].index, inplace=True)
+    
+    # Prepare red cards DataFrame for merging
+    red_cards_df = red_cards_df[["Minute", "Team", "Player", "Event Type", "Outcome"]]
+    red_cards_df["xG"] = 0
+    red_cards_df["PSxG"] = 0
+    
+    # Combine DataFrames
+    df = pd.concat([shots_df, red_cards_df], ignore_index=True)
+    
+    # Clean and convert data types
+    df["Minute"] = pd.to_numeric(df["Minute"], errors='coerce')
+    df["xG"] = pd.to_numeric(df["xG"], errors='coerce')
+    df["PSxG"] = pd.to_numeric(df["PSxG"], errors='coerce')
+    df.fillna(0.00, inplace=True)
+    df.sort_values(by=["Minute"], inplace=True)
+    
+    # Add match metadata
+    df["match_url"] = url
+    df["match_date"] = match_date
+    df["home_team"] = home_team
+    df["away_team"] = away_team
+    df["division"] = division
+    
+    # Add season column (format: 2023 for 2023-24 season, 2024 for 2024-25 season)
+    if match_date:
+        match_datetime = datetime.strptime(match_date, '%Y-%m-%d')
+        # If match date is after August 1st, use the year of the match
+        # Otherwise use previous year (for matches Jan-Jul which are part of previous season)
+        if match_datetime.month >= 8:
+            df["season"] = match_datetime.year
+        else:
+            df["season"] = match_datetime.year - 1
+    else:
+        # If no date available, extract from season string (e.g. "2023-2024" -> 2023)
+        try:
+            df["season"] = int(season.split("-")[0])
+        except:
+            df["season"] = None
+            
+    df = df.reset_index(drop=True)
+    
+    return df
+
+
 class RecentMatchDataScraper:
-    def __init__(self, season, days_back=7, headless=True, db_path="team_model_db"):
+    def __init__(self, season, days_back=7, headless=True, db_path=None,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, fetch_workers=4, parse_workers=None,
+                 use_selenium='fallback', cache_dir=DEFAULT_CACHE_DIR, checkpoint_path=None,
+                 skip_existing=True, competition='Premier-League', save_csv=True):
         self.season = season
         self.days_back = days_back
-        self.base_url = f"https://fbref.com/en/comps/9/{season}/schedule/{season}-Premier-League-Scores-and-Fixtures"
-        self.match_data = []
+        self.competition = competition
+        self.base_url = schedule_url(season, competition)
         self.db_path = db_path
-        self.setup_driver(headless)
+        # Each match is also appended to data/recent_matches_<days>days_<time>.csv
+        self.save_csv = save_csv
+        self.csv_path = None
+        self.matches_found = 0
+        # Match reports are fetched on fetch_workers threads sharing one rate
+        # limit and parsed on parse_workers processes (0 parses in this process)
+        self.fetcher = Fetcher(requests_per_minute=requests_per_minute,
+                               cache=HttpCache(cache_dir) if cache_dir else None)
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        # Fixtures come from the static schedule page; Selenium is started only
+        # if that fails ('fallback'), for every run ('always') or never ('never')
+        self.use_selenium = use_selenium
+        self.headless = headless
+        # Saved matches are checkpointed so an interrupted run resumes where it
+        # stopped (checkpoint_path=False turns this off), and matches already in
+        # the database are not fetched again
+        if checkpoint_path is None:
+            checkpoint_path = os.path.join(DATA_DIR, f'scrape_checkpoint_{competition}_{season}.jsonl')
+        self.checkpoint = ScrapeCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.skip_existing = skip_existing
         self.cutoff_date = datetime.now() - timedelta(days=days_back)
         print(f"Scraping matches played after: {self.cutoff_date.strftime('%Y-%m-%d')}")
         
     def setup_driver(self, headless):
+        # Imported here so the scraper runs without Selenium installed
+        from selenium import webdriver
+        
         options = webdriver.ChromeOptions()
         if headless:
             options.add_argument('--headless')
@@ -49,212 +483,103 @@ class RecentMatchDataScraper:
         time.sleep(random.uniform(min_seconds, max_seconds))
 
     def get_match_data(self, url):
-        self.random_delay()
-        
+        """Fetch and parse one match report (see parse_match_page)."""
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, DEFAULT_PARSER)
-
-            # Extract match date
-            venue_time = soup.find('span', class_='venuetime')
-            match_date = venue_time['data-venue-date'] if venue_time else None
-            
-            # Skip if match is older than cutoff date
-            if match_date:
-                match_datetime = datetime.strptime(match_date, '%Y-%m-%d')
-                if match_datetime < self.cutoff_date:
-                    print(f"Skipping match from {match_date} (older than {self.days_back} days)")
-                    return None
-            
-            # Extract teams
-            team_stats = soup.find('div', id='team_stats_extra')
-            if team_stats:
-                teams = team_stats.find_all('div', class_='th')
-                teams = [t.text.strip() for t in teams if t.text.strip() != '']
-                teams = list(dict.fromkeys(teams))  # Remove duplicates while preserving order
-                home_team = teams[0] if len(teams) > 0 else None
-                away_team = teams[1] if len(teams) > 1 else None
-            else:
-                home_team, away_team = None, None
-                
-            # Extract division
-            division_link = soup.find('a', href=lambda x: x and '/comps/' in x and '-Stats' in x)
-            division = division_link.text.strip() if division_link else None
-            
-            # Get shots data
-            shots_table = soup.find('table', id='shots_all')
-            if not shots_table:
-                print(f"No shots table found for {url}")
-                return None
-            
-            # First, get all header rows
-            header_rows = shots_table.find_all('tr')[:2]  # Get both header rows
-            if len(header_rows) < 2:
-                print(f"Invalid shots table structure for {url}")
-                return None
-                
-            # Extract headers from the second row (contains actual column names)
-            headers = []
-            for th in header_rows[1].find_all(['th', 'td']):
-                header_text = th.get_text(strip=True)
-                # If header is empty, use a placeholder
-                headers.append(header_text if header_text else f"Column_{len(headers)}")
-            
-            # Make headers unique
-            unique_headers = []
-            header_counts = {}
-            for header in headers:
-                if header in header_counts:
-                    header_counts[header] += 1
-                    unique_headers.append(f"{header}_{header_counts[header]}")
-                else:
-                    header_counts[header] = 1
-                    unique_headers.append(header)
-            
-            # Extract shot data rows
-            rows_data = []
-            for tr in shots_table.find_all('tbody')[0].find_all('tr'):
-                cols = tr.find_all(['th', 'td'])
-                row_data = []
-                for col in cols:
-                    value = col.get_text(strip=True)
-                    if value == '':
-                        value = "0"
-                    row_data.append(value)
-                if len(row_data) == len(unique_headers):  # Only add rows that match header count
-                    rows_data.append(row_data)
-            
-            # Create shots DataFrame with unique headers
-            shots_df = pd.DataFrame(rows_data, columns=unique_headers)
-            
-            # Check for penalties in player names and set event type accordingly
-            player_col = [col for col in shots_df.columns if 'Player' in col][0]
-            shots_df["Event Type"] = shots_df.apply(
-                lambda row: "Penalty" if "(pen)" in str(row[player_col]).lower() else "Shot", 
-                axis=1
-            )
-            
-            # Get red cards data
-            events = soup.find_all('div', class_=re.compile(r'^event\s'))
-            
-            times, scores, players, event_types, teams = [], [], [], [], []
-            
-            for event in events:
-                # Time and score
-                time_score_div = event.find('div')
-                if time_score_div:
-                    time_score_text = html.unescape(time_score_div.get_text(strip=True))
-                    time = time_score_text.split("'")[0] + "'" if "'" in time_score_text else time_score_text
-                    score = time_score_text.split("'")[1] if "'" in time_score_text else ''
-                    times.append(time)
-                    scores.append(score)
-                    
-                # Player name
-                player = event.find('a').get_text(strip=True) if event.find('a') else ''
-                players.append(player)
-                
-                # Event type
-                event_type = 'Unknown'
-                for div in event.find_all('div'):
-                    if '—' in div.get_text():
-                        event_type = div.get_text(strip=True).split('—')[-1].strip()
-                        break
-                event_types.append(event_type)
-                
-                # Team
-                team_logo = event.find('img', class_='teamlogo')
-                if team_logo:
-                    team_name = team_logo.get('alt').replace(' Club Crest', '')
-                    teams.append(team_name)
-                else:
-                    teams.append('Unknown')
-            
-            # Create events DataFrame
-            events_df = pd.DataFrame({
-                'Time': times,
-                'Score': scores,
-                'Player': players,
-                'Event Type': event_types,
-                'Team': teams
-            })
-            
-            # Filter for red cards
-            red_cards_df = events_df[events_df['Event Type'].isin(['Red Card', 'Second Yellow Card'])]
-            red_cards_df = red_cards_df.reset_index(drop=True)
-            
-            # Process minute information
-            red_cards_df["Minute"] = red_cards_df["Time"].str.extract(r'(\d+)').fillna('0')
-            red_cards_df["Outcome"] = "Red Card"
-            
-            # Process shots DataFrame
-            minute_col = [col for col in shots_df.columns if 'Minute' in col][0]
-            squad_col = [col for col in shots_df.columns if 'Squad' in col][0]
-            outcome_col = [col for col in shots_df.columns if 'Outcome' in col][0]
-            xg_col = [col for col in shots_df.columns if 'xG' in col][0]
-            psxg_col = [col for col in shots_df.columns if 'PSxG' in col][0]
-            
-            shots_df["Minute"] = shots_df[minute_col].str.extract(r'(\d+)').fillna('0')
-            shots_df["Team"] = shots_df[squad_col]
-            shots_df["Outcome"] = shots_df[outcome_col]
-            shots_df["xG"] = shots_df[xg_col]
-            shots_df["PSxG"] = shots_df[psxg_col]
-            
-            shots_df = shots_df[["Minute", "Team", "Player", "Event Type", "Outcome", "xG", "PSxG"]]
-            
-            # Clean up data
-            shots_df.drop(shots_df[shots_df['Minute'] == ''].index, inplace=True)
-            
-            # Prepare red cards DataFrame for merging
-            red_cards_df = red_cards_df[["Minute", "Team", "Player", "Event Type", "Outcome"]]
-            red_cards_df["xG"] = 0
-            red_cards_df["PSxG"] = 0
-            
-            # Combine DataFrames
-            df = pd.concat([shots_df, red_cards_df], ignore_index=True)
-            
-            # Clean and convert data types
-            df["Minute"] = pd.to_numeric(df["Minute"], errors='coerce')
-            df["xG"] = pd.to_numeric(df["xG"], errors='coerce')
-            df["PSxG"] = pd.to_numeric(df["PSxG"], errors='coerce')
-            df.fillna(0.00, inplace=True)
-            df.sort_values(by=["Minute"], inplace=True)
-            
-            # Add match metadata
-            df["match_url"] = url
-            df["match_date"] = match_date
-            df["home_team"] = home_team
-            df["away_team"] = away_team
-            df["division"] = division
-            
-            # Add season column (format: 2023 for 2023-24 season, 2024 for 2024-25 season)
-            if match_date:
-                match_datetime = datetime.strptime(match_date, '%Y-%m-%d')
-                # If match date is after August 1st, use the year of the match
-                # Otherwise use previous year (for matches Jan-Jul which are part of previous season)
-                if match_datetime.month >= 8:
-                    df["season"] = match_datetime.year
-                else:
-                    df["season"] = match_datetime.year - 1
-            else:
-                # If no date available, extract from season string (e.g. "2023-2024" -> 2023)
-                try:
-                    df["season"] = int(self.season.split("-")[0])
-                except:
-                    df["season"] = None
-                    
-            df = df.reset_index(drop=True)
-            
-            return df
-            
+            page_html = self.fetcher.get(url, max_age=MATCH_REPORT_MAX_AGE)
+        except Exception as e:
+            print(f"Error fetching match data for {url}: {str(e)}")
+            return None
+        try:
+            return parse_match_page(page_html, url, self.cutoff_date, self.season)
         except Exception as e:
-            print(f"Error processing match data for {url}: {str(e)}")
+            print(f"Error parsing match data for {url}: {str(e)}")
+            self.fetcher.discard(url)
             return None
 
+    def _parsed(self, url, parse):
+        # Yields (url, parse()) unless parsing fails; the failed page is dropped
+        # from the cache and left out of the checkpoint, so it is fetched again
+        try:
+            match_df = parse()
+        except Exception as e:
+            print(f"Error parsing match data for {url}: {str(e)}")
+            self.fetcher.discard(url)
+            return
+        yield url, match_df
+
+    def iter_matches(self, match_urls):
+        """
+        Fetch and parse match reports concurrently, yielding each match as soon as it is parsed.
+        
+        Pages are downloaded on a thread pool under the fetcher's shared rate
+        limit; each page is handed to a process pool for parsing as soon as it
+        arrives, so parsing overlaps the remaining downloads. Only pages that
+        are downloaded but not yet consumed are held in memory. Matches that
+        fail to download or parse are reported and not yielded.
+        
+        Yields:
+            tuple: (match_url, DataFrame or None if the page had nothing to keep), in completion order
+        """
+        if not match_urls:
+            return
+        
+        parse_pool = None
+        if self.parse_workers != 0:
+            parse_pool = ProcessPoolExecutor(max_workers=min(self.parse_workers or os.cpu_count() or 1, len(match_urls)))
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        
+        parses = {}
+        try:
+            fetches = {fetch_pool.submit(self.fetcher.get, url, MATCH_REPORT_MAX_AGE): url for url in match_urls}
+            for future in as_completed(fetches):
+                url = fetches.pop(future)
+                try:
+                    page_html = future.result()
+                except Exception as e:
+                    print(f"Error fetching match data for {url}: {str(e)}")
+                    continue
+                print(f"Fetched {url}")
+                if parse_pool is None:
+                    yield from self._parsed(url, partial(parse_match_page, page_html, url, self.cutoff_date,
+                                                         self.season))
+                    continue
+                parses[parse_pool.submit(parse_match_page, page_html, url, self.cutoff_date, self.season)] = url
+                for parse in [parse for parse in parses if parse.done()]:
+                    yield from self._parsed(parses.pop(parse), parse.result)
+            for parse in as_completed(list(parses)):
+                yield from self._parsed(parses.pop(parse), parse.result)
+        finally:
+            # Also reached when the consumer stops early: drop the downloads not started yet
+            fetch_pool.shutdown(cancel_futures=True)
+            if parse_pool is not None:
+                parse_pool.shutdown(cancel_futures=True)
+
+    def existing_match_urls(self, match_urls):
+        """The subset of match_urls that already have rows in prem_data."""
+        existing = set()
+        try:
+            conn = connect(self.db_path, read_only=True)
+            for start in range(0, len(match_urls), 500):
+                chunk = match_urls[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT DISTINCT match_url FROM prem_data WHERE match_url IN ({', '.join('?' for _ in chunk)})",
+                    chunk
+                ).fetchall()
+                existing.update(row[0] for row in rows)
+        except sqlite3.OperationalError:
+            # No database or no prem_data table yet, so nothing to skip
+            pass
+        return existing
+
     def find_fixtures_table(self):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         try:
             table_selectors = [
-                f"table#sched_{self.season}_9_1",
+                f"table#sched_{self.season}_{COMPETITIONS[self.competition]}_1",
                 "table.stats_table.sortable",
                 "//table[contains(@class, 'stats_table')]"
             ]
@@ -279,125 +604,208 @@ class RecentMatchDataScraper:
             print(f"Error finding fixtures table: {e}")
             return None
 
-    def scrape_matches(self):
-        try:
-            print(f"\nStarting scrape for season {self.season}, matches from last {self.days_back} days")
-            self.driver.get(self.base_url)
-            self.random_delay()
-            
-            table = self.find_fixtures_table()
-            if not table:
-                raise Exception("Could not find fixtures table")
+    def find_fixtures_with_selenium(self):
+        """Load the schedule page in a browser and read (date_text, match_url) rows."""
+        from selenium.common.exceptions import NoSuchElementException
+        from selenium.webdriver.common.by import By
+        
+        if not hasattr(self, 'driver'):
+            self.setup_driver(self.headless)
+        self.driver.get(self.base_url)
+        self.random_delay()
+        
+        table = self.find_fixtures_table()
+        if not table:
+            return None
+        
+        fixtures = []
+        for row in table.find_elements(By.TAG_NAME, "tr")[1:]:
+            try:
+                date_cell = row.find_element(By.XPATH, ".//td[@data-stat='date']")
+            except NoSuchElementException:
+                continue
+            try:
+                match_url = row.find_element(By.XPATH, ".//td/a[text()='Match Report']").get_attribute('href')
+            except NoSuchElementException:
+                match_url = None
+            fixtures.append((date_cell.text.strip(), match_url))
+        return fixtures
+
+    def find_fixtures(self):
+        """
+        Get the season's fixtures as (date_text, match_url) rows.
+        
+        Parses the static schedule page first and only starts a browser when
+        that finds no fixtures table (unless use_selenium says otherwise).
+        """
+        if self.use_selenium != 'always':
+            try:
+                fixtures = parse_fixtures_html(self.fetcher.get(self.base_url), self.season, base_url=self.base_url,
+                                               comp_id=COMPETITIONS[self.competition])
+                if fixtures is not None:
+                    return fixtures
+                print("No fixtures table in the static schedule page")
+            except Exception as e:
+                print(f"Error fetching schedule page: {e}")
+            if self.use_selenium == 'never':
+                return None
+            print("Falling back to Selenium")
+        return self.find_fixtures_with_selenium()
+
+    def find_match_urls(self):
+        """Match report URLs of the fixtures played since the cutoff date, most recent first."""
+        fixtures = self.find_fixtures()
+        if fixtures is None:
+            raise Exception("Could not find fixtures table")
+        
+        print(f"\nFound {len(fixtures)} total matches to check")
+        
+        match_urls = []
+        
+        # Iterate in reverse order to get most recent matches first
+        for match_date_text, match_url in reversed(fixtures):
+            # Skip if there's no date (postponed matches, etc.)
+            if not match_date_text:
+                continue
             
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            print(f"\nFound {len(rows)-1} total matches to check")
+            # Convert the date text to a datetime object
+            try:
+                match_date = datetime.strptime(match_date_text, '%Y-%m-%d')
+            except ValueError:
+                # Try alternate date formats if needed
+                try:
+                    match_date = datetime.strptime(match_date_text, '%a %d/%m/%Y')
+                except ValueError:
+                    print(f"Could not parse date: {match_date_text}")
+                    continue
             
-            matches_processed = 0
-            matches_collected = 0
+            # Check if the match is within our date range
+            if match_date < self.cutoff_date:
+                # If we've passed the cutoff date, we can stop processing
+                print(f"Reached matches older than {self.days_back} days, stopping search")
+                break
             
-            # Iterate in reverse order to get most recent matches first
-            for index, row in enumerate(reversed(rows[1:]), 1):
-                try:
-                    # Check if the match has a date cell
-                    date_cell = row.find_element(By.XPATH, ".//td[@data-stat='date']")
-                    match_date_text = date_cell.text.strip()
-                    
-                    # Skip if there's no date (postponed matches, etc.)
-                    if not match_date_text:
-                        continue
-                    
-                    # Convert the date text to a datetime object
-                    try:
-                        match_date = datetime.strptime(match_date_text, '%Y-%m-%d')
-                    except ValueError:
-                        # Try alternate date formats if needed
-                        try:
-                            match_date = datetime.strptime(match_date_text, '%a %d/%m/%Y')
-                        except ValueError:
-                            print(f"Could not parse date: {match_date_text}")
-                            continue
-                    
-                    # Check if the match is within our date range
-                    if match_date < self.cutoff_date:
-                        # If we've passed the cutoff date, we can stop processing
-                        print(f"Reached matches older than {self.days_back} days, stopping search")
-                        break
-                    
-                    # Try to find match report link
-                    match_report = row.find_element(By.XPATH, ".//td/a[text()='Match Report']")
-                    
-                    if match_report:
-                        match_url = match_report.get_attribute('href')
-                        matches_processed += 1
-                        print(f"\nProcessing match {matches_processed} from {match_date_text}: {match_url}")
-                        
-                        match_df = self.get_match_data(match_url)
-                        if match_df is not None:
-                            self.match_data.append(match_df)
-                            matches_collected += 1
-                            print(f"Successfully processed match data")
-                        else:
-                            print(f"No data retrieved for match")
-                    
-                except NoSuchElementException:
-                    print("No Match Report link found in this row (match may not have been played yet)")
+            if match_url:
+                match_urls.append(match_url)
+                print(f"Found match from {match_date_text}: {match_url}")
+            else:
+                print("No Match Report link found in this row (match may not have been played yet)")
+        
+        return match_urls
+
+    def stream_matches(self):
+        """
+        Yield parsed matches one at a time as they come in.
+        
+        Matches recorded in the checkpoint by an interrupted run, and (with
+        skip_existing) matches already in the database, are not fetched again.
+        
+        Yields:
+            tuple: (match_url, DataFrame or None if the page had nothing to keep)
+        """
+        match_urls = self.find_match_urls()
+        self.matches_found = len(match_urls)
+        
+        # Resume from the checkpoint, then skip matches the database already has
+        to_fetch = match_urls
+        if self.checkpoint is not None:
+            recovered = [url for url in to_fetch if url in self.checkpoint.processed]
+            if recovered:
+                print(f"\nResuming: {len(recovered)} matches already saved by an earlier run")
+                to_fetch = [url for url in to_fetch if url not in self.checkpoint.processed]
+        if self.skip_existing and to_fetch:
+            existing = self.existing_match_urls(to_fetch)
+            if existing:
+                print(f"Skipping {len(existing)} matches already in the database")
+                to_fetch = [url for url in to_fetch if url not in existing]
+        
+        yield from self.iter_matches(to_fetch)
+
+    def save_match(self, match_url, match_df):
+        """
+        Commit one match to the database in its own transaction, append it to
+        the CSV file (if enabled) and mark it done in the checkpoint.
+        
+        Returns:
+            dict: ingest_shots counts, or None if the match could not be saved
+        """
+        try:
+            # Events from an overlapping earlier scrape are skipped rather than duplicated
+            result = ingest_shots(match_df, db_path=self.db_path)
+        except OutdatedSchemaError:
+            # Every other match would fail the same way
+            raise
+        except Exception as e:
+            print(f"Error saving {match_url} to database: {str(e)}")
+            return None
+        
+        if self.save_csv:
+            if self.csv_path is None:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                os.makedirs('data', exist_ok=True)
+                self.csv_path = os.path.join('data', f'recent_matches_{self.days_back}days_{timestamp}.csv')
+            match_df.to_csv(self.csv_path, mode='a', header=not os.path.exists(self.csv_path), index=False)
+        
+        if self.checkpoint is not None:
+            self.checkpoint.record(match_url, len(match_df))
+        return result
+
+    def scrape_matches(self):
+        """
+        Scrape the recent matches, saving each one as soon as it is parsed.
+        
+        Memory use does not grow with the number of matches: every match is
+        committed (and written to the CSV file) before the next is handled.
+        
+        Returns:
+            bool: True if the run completed
+        """
+        try:
+            print(f"\nStarting scrape for {self.competition} {self.season}, matches from last {self.days_back} days")
+            print(f"Saving to database: {get_db_path(self.db_path)}")
+            check_schema(connect(self.db_path))
+            
+            matches = events = inserted = skipped = 0
+            for match_url, match_df in self.stream_matches():
+                if match_df is None:
+                    print(f"No data retrieved for match {match_url}")
+                    if self.checkpoint is not None:
+                        self.checkpoint.record(match_url)
                     continue
-                except Exception as e:
-                    print(f"Error processing row: {str(e)}")
+                result = self.save_match(match_url, match_df)
+                if result is None:
                     continue
-                
-                # Add delay between matches
-                self.random_delay(2, 4)
+                matches += 1
+                events += len(match_df)
+                inserted += result['inserted']
+                skipped += result['skipped']
+                print(f"Saved {match_url}: {result['inserted']} new rows")
+            
+            print(f"\nProcessed {self.matches_found} matches within date range, saved data for {matches} matches")
+            if matches:
+                print(f"Successfully appended {inserted} rows to prem_data table ({skipped} already present)")
+                if self.csv_path:
+                    print(f"Results saved to {self.csv_path}")
+                print(f"\nTotal events collected: {events}")
+            else:
+                print("\nNo match data collected")
             
-            print(f"\nProcessed {matches_processed} matches within date range, collected data for {matches_collected} matches")
+            # The run is complete, so the next one starts fresh
+            if self.checkpoint is not None:
+                self.checkpoint.clear()
             return True
             
         except Exception as e:
             print(f"An error occurred during scraping: {e}")
             return False
 
-    def save_results(self):
-        if self.match_data:
-            # Combine all match data into a single DataFrame
-            combined_df = pd.concat(self.match_data, ignore_index=True)
-            
-            # Save to CSV
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'recent_matches_{self.days_back}days_{timestamp}.csv'
-            
-            os.makedirs('data', exist_ok=True)
-            filepath = os.path.join('data', filename)
-            combined_df.to_csv(filepath, index=False)
-            print(f"\nResults saved to {filepath}")
-            
-            # Save to SQLite database
-            try:
-                conn = sqlite3.connect(self.db_path)
-                print(f"\nConnected to database: {self.db_path}")
-                
-                # Append data to prem_data table
-                combined_df.to_sql('prem_data', conn, if_exists='append', index=False)
-                print(f"Successfully appended {len(combined_df)} rows to prem_data table")
-                
-                # Close connection
-                conn.close()
-            except Exception as e:
-                print(f"Error saving to database: {str(e)}")
-                
-            print(f"\nTotal events collected: {len(combined_df)}")
-            return True
-        else:
-            print("\nNo match data collected")
-            return False
-
     def cleanup(self):
         if hasattr(self, 'driver'):
             self.driver.quit()
             
     def run(self):
         try:
-            if self.scrape_matches():
-                self.save_results()
+            self.scrape_matches()
         finally:
             self.cleanup()
             print("\nScript completed")
@@ -406,12 +814,12 @@ if __name__ == "__main__":
     # Set the season and number of days to look back
     season = "2024-2025"  # Update with current season
     days_back = 7  # Get matches from last 14 days
-    db_path = "team_model_db"  # SQLite database file path
+    db_path = None  # SQLite database file path, None uses $TEAM_MODEL_DB or data/team_model_db.db
     
     # Check and notify about required packages
     required_packages = {
         'lxml': 'Optional but recommended: pip install lxml',
-        'selenium': 'Required for web scraping: pip install selenium',
+        'selenium': 'Optional, fallback for reading fixtures: pip install selenium',
         'requests': 'Required for HTTP requests: pip install requests',
         'beautifulsoup4': 'Required for HTML parsing: pip install beautifulsoup4',
         'pandas': 'Required for data handling: pip install pandas',
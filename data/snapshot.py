@@ -0,0 +1,254 @@
+"""
+Columnar Parquet snapshot of prem_data for fast, memory-mapped reads.
+
+The snapshot is a directory of Parquet files partitioned by season and
+division (hive layout: season=2024/division=Premier%20League/part-0.parquet)
+plus match_summaries.parquet and a manifest. Team, player and other repeated
+text columns are dictionary encoded, so they load as pandas categoricals.
+
+Keep it in sync with the database with
+
+    python -m data.snapshot [db_path] [snapshot_dir]
+
+which only rewrites partitions whose rows changed since the last sync. pyarrow
+is imported when a snapshot is written or read, so the rest of the data
+package works without it.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from urllib.parse import quote as quote_path
+
+import pandas as pd
+
+from data.db import connect, get_db_path
+from data.match_summaries import SUMMARY_SELECT, summaries_ready
+from data.schema import quote
+
+MANIFEST_FILE = "_manifest.json"
+SUMMARIES_FILE = "match_summaries.parquet"
+
+# Repeated text columns stored dictionary encoded (categoricals in pandas)
+CATEGORICAL_COLUMNS = ['Team', 'Player', 'Event Type', 'Outcome', 'match_url', 'home_team', 'away_team']
+
+# Columns holding team names; they share one set of categories after loading
+# so they can still be compared with each other
+TEAM_COLUMNS = ['Team', 'home_team', 'away_team']
+
+
+def default_snapshot_dir(db_path):
+    """Snapshot directory kept next to the database (prem_data_snapshot/)."""
+    return os.path.join(os.path.dirname(get_db_path(db_path)), "prem_data_snapshot")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet snapshots need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _partition_path(snapshot_dir, season, division):
+    return os.path.join(snapshot_dir, f"season={season}", f"division={quote_path(str(division), safe='')}")
+
+
+def _partition_fingerprints(conn):
+    """
+    Row count, highest rowid, total xG and last match date for each
+    (season, division) in prem_data.
+    """
+    rows = conn.execute(
+        "SELECT season, division, COUNT(*), MAX(rowid), TOTAL(xG), MAX(match_date) FROM prem_data "
+        "WHERE season IS NOT NULL AND division IS NOT NULL GROUP BY season, division"
+    ).fetchall()
+    return {f"{season}|{division}": [count, max_rowid, round(total_xg, 6), last_date]
+            for season, division, count, max_rowid, total_xg, last_date in rows}
+
+
+def _write_partition(pa, conn, path, season, division):
+    columns = ['Minute', 'Team', 'Player', 'Event Type', 'Outcome', 'xG', 'PSxG',
+               'match_url', 'match_date', 'home_team', 'away_team']
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(quote(c) for c in columns)} FROM prem_data "
+        f"WHERE season = ? AND division = ? ORDER BY match_date, rowid",
+        conn, params=(season, division)
+    )
+    df['match_date'] = pd.to_datetime(df['match_date'])
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+
+    os.makedirs(path, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pa.parquet.write_table(table, os.path.join(path, "part-0.parquet"))
+    return len(df)
+
+
+def sync_snapshot(db_path, snapshot_dir=None):
+    """
+    Bring the Parquet snapshot of prem_data up to date with the database.
+
+    Partitions are compared with the manifest from the previous sync; only
+    new or changed (season, division) partitions are rewritten and partitions
+    that no longer exist are removed. match_summaries is always rewritten.
+
+    Args:
+        db_path (str): Path to the SQLite database (None for the configured database)
+        snapshot_dir (str): Snapshot directory (defaults to prem_data_snapshot/
+                            next to the database)
+
+    Returns:
+        dict: Partitions written, removed and unchanged, and rows written
+    """
+    pa = _import_pyarrow()
+    snapshot_dir = snapshot_dir or default_snapshot_dir(db_path)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f).get('partitions', {})
+
+    # Read every partition inside one read transaction so the snapshot is
+    # consistent even if the scraper commits part way through
+    conn = connect(db_path, read_only=True)
+    conn.execute("BEGIN")
+    try:
+        current = _partition_fingerprints(conn)
+        written, rows_written = [], 0
+        for key, fingerprint in current.items():
+            if previous.get(key) == fingerprint:
+                continue
+            season, division = key.split('|', 1)
+            path = _partition_path(snapshot_dir, season, division)
+            rows_written += _write_partition(pa, conn, path, int(season), division)
+            written.append(key)
+
+        removed = [key for key in previous if key not in current]
+        for key in removed:
+            season, division = key.split('|', 1)
+            shutil.rmtree(_partition_path(snapshot_dir, season, division), ignore_errors=True)
+
+        if summaries_ready(conn):
+            summaries = pd.read_sql_query("SELECT * FROM match_summaries", conn)
+        else:
+            summaries = pd.read_sql_query(SUMMARY_SELECT.format(where='1'), conn)
+    finally:
+        conn.rollback()
+
+    summaries['match_date'] = pd.to_datetime(summaries['match_date'])
+    pa.parquet.write_table(pa.Table.from_pandas(summaries, preserve_index=False),
+                           os.path.join(snapshot_dir, SUMMARIES_FILE))
+
+    # Write the manifest last so an interrupted sync is redone next time
+    with open(manifest_path, 'w') as f:
+        json.dump({'db_path': get_db_path(db_path), 'partitions': current}, f, indent=2)
+
+    return {'written': written, 'removed': removed,
+            'unchanged': len(current) - len(written), 'rows_written': rows_written}
+
+
+def load_snapshot(snapshot_dir, cutoff, shot_columns):
+    """
+    Read shot data and match summaries after `cutoff` from a snapshot.
+
+    Files are memory-mapped, partitions whose last match is before the cutoff
+    are pruned using the manifest without being opened, and only the
+    requested columns are read.
+
+    Args:
+        snapshot_dir (str): Snapshot directory written by sync_snapshot
+        cutoff (Timestamp): Only matches after this time are returned
+        shot_columns (list): prem_data columns to return in shot_data
+
+    Returns:
+        tuple: (shot_data, match_summaries) as returned by load_data
+    """
+    pa = _import_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.fs
+
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(
+            f"No snapshot in '{snapshot_dir}', create one with: python -m data.snapshot <db_path> {snapshot_dir}"
+        )
+    with open(manifest_path) as f:
+        partitions = json.load(f)['partitions']
+
+    # Partition pruning: skip partitions with no match after the cutoff. One
+    # partition is always kept so the dataset has a schema even when nothing
+    # matches; the row filter and its row-group statistics skip it cheaply.
+    cutoff = pd.Timestamp(cutoff)
+    files = []
+    for key, fingerprint in sorted(partitions.items()):
+        last_date = fingerprint[-1]
+        if files and (last_date is None or pd.Timestamp(last_date) <= cutoff):
+            continue
+        season, division = key.split('|', 1)
+        files.append(os.path.join(_partition_path(snapshot_dir, season, division), "part-0.parquet"))
+
+    filesystem = pa.fs.LocalFileSystem(use_mmap=True)
+    partitioning = pa.dataset.partitioning(
+        pa.schema([('season', pa.int64()), ('division', pa.string())]), flavor='hive'
+    )
+    dataset = pa.dataset.dataset(
+        files, format='parquet', partitioning=partitioning, filesystem=filesystem,
+        partition_base_dir=snapshot_dir
+    )
+    row_filter = pc.field('match_date') > cutoff
+
+    # Outcome is always read for the goal flag and dropped again if not requested
+    read_columns = list(dict.fromkeys(shot_columns + ['Outcome']))
+    table = dataset.to_table(columns=read_columns, filter=row_filter)
+    is_goal = pc.cast(pc.equal(pc.dictionary_decode(table['Outcome'])
+                               if pa.types.is_dictionary(table['Outcome'].type) else table['Outcome'],
+                               'Goal'), pa.int64())
+    table = table.append_column('is_goal', is_goal)
+    if 'Outcome' not in shot_columns:
+        table = table.drop_columns(['Outcome'])
+    shot_data = table.to_pandas()
+
+    team_columns = [c for c in TEAM_COLUMNS if c in shot_data.columns]
+    if team_columns:
+        teams = sorted(set().union(*(shot_data[c].cat.categories for c in team_columns)))
+        for column in team_columns:
+            shot_data[column] = shot_data[column].cat.set_categories(teams)
+
+    summaries = pa.parquet.read_table(
+        os.path.join(snapshot_dir, SUMMARIES_FILE), filters=[('match_date', '>', cutoff)],
+        memory_map=True
+    ).to_pandas()
+    summaries = summaries.sort_values(['match_url', 'match_date', 'home_team', 'away_team', 'season', 'division'])
+    return shot_data, summaries.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync the Parquet snapshot of prem_data with the database.")
+    parser.add_argument("db_path", nargs="?", default=None,
+                        help="Path to the SQLite database (default: $TEAM_MODEL_DB or data/team_model_db.db)")
+    parser.add_argument("snapshot_dir", nargs="?", default=None,
+                        help="Snapshot directory (default: prem_data_snapshot/ next to the database)")
+    args = parser.parse_args(argv)
+
+    db_path = get_db_path(args.db_path)
+    if not os.path.exists(db_path):
+        print(f"ERROR: Database '{db_path}' does not exist!")
+        return 1
+
+    snapshot_dir = args.snapshot_dir or default_snapshot_dir(db_path)
+    print(f"Syncing snapshot of {db_path} into {snapshot_dir}...")
+    result = sync_snapshot(db_path, snapshot_dir)
+    print(f"- Partitions written: {len(result['written'])} ({result['rows_written']} rows)")
+    print(f"- Partitions removed: {len(result['removed'])}")
+    print(f"- Partitions unchanged: {result['unchanged']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
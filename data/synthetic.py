@@ -0,0 +1,318 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data.db import connect
+from data.fetch_match_data import create_match_summaries
+from data.ingest import ingest_shots
+from data.schema import quote, table_exists
+
+DIVISION_NAMES = ['Premier League', 'EFL Championship', 'League One', 'League Two', 'National League']
+
+PREM_DATA_COLUMNS = ['Minute', 'Team', 'Player', 'Event Type', 'Outcome', 'xG', 'PSxG',
+                     'match_url', 'match_date', 'home_team', 'away_team', 'division', 'season']
+
+
+def generate_true_parameters(n_teams=20, n_divisions=1, home_advantage=1.3, spread=0.25,
+                             division_gap=0.2, seed=0):
+    """
+    Draw true attack/defense strengths for a set of teams.
+
+    Teams are split evenly across divisions, with lower divisions weaker on
+    average (lower attack, higher defense) by `division_gap` on the log scale.
+
+    Args:
+        n_teams (int): Total number of teams
+        n_divisions (int): Number of divisions the teams are split across
+        home_advantage (float): True multiplicative home advantage
+        spread (float): Standard deviation of log attack/defense within a division
+        division_gap (float): Log-scale strength drop between consecutive divisions
+        seed (int): Random seed
+
+    Returns:
+        dict: team_attack, team_defense, home_advantage, rho and the starting
+              division of each team
+    """
+    rng = np.random.default_rng(seed)
+    teams = [f"Team {i:03d}" for i in range(n_teams)]
+    division_index = np.concatenate([
+        np.full(len(members), k) for k, members in enumerate(np.array_split(np.arange(n_teams), n_divisions))
+    ])
+
+    log_attack = rng.normal(0, spread, n_teams) - division_gap * division_index
+    log_defense = rng.normal(0, spread, n_teams) + division_gap * division_index
+
+    return {
+        'team_attack': dict(zip(teams, np.exp(log_attack))),
+        'team_defense': dict(zip(teams, np.exp(log_defense))),
+        'home_advantage': home_advantage,
+        'rho': 0.0,  # Goals are drawn shot by shot, so there is no extra low-score dependency
+        'team_division': {team: _division_name(k) for team, k in zip(teams, division_index)},
+    }
+
+
+def _division_name(k):
+    """Real division names for the top five tiers, generic names below that."""
+    return DIVISION_NAMES[k] if k < len(DIVISION_NAMES) else f"Division {k + 1}"
+
+
+def _round_robin(members):
+    """Double round-robin fixture list (circle method) as a list of rounds of (home, away) pairs."""
+    members = list(members)
+    if len(members) % 2:
+        members.append(None)  # Bye
+    n = len(members)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            home, away = members[i], members[n - 1 - i]
+            if home is not None and away is not None:
+                pairs.append((home, away) if r % 2 == 0 else (away, home))
+        rounds.append(pairs)
+        members = [members[0]] + [members[-1]] + members[1:-1]
+    # Second half of the season reverses home and away
+    return rounds + [[(away, home) for home, away in pairs] for pairs in rounds]
+
+
+def _schedule(true_params, n_seasons, end_date, promotion_spots, rng):
+    """Build the match list for every season, moving teams between divisions each summer."""
+    teams = list(true_params['team_attack'])
+    strength = np.array([np.log(true_params['team_attack'][t]) - np.log(true_params['team_defense'][t]) for t in teams])
+    division_names = list(dict.fromkeys(true_params['team_division'].values()))
+    divisions = {name: [t for t in teams if true_params['team_division'][t] == name] for name in division_names}
+    team_strength = dict(zip(teams, strength))
+
+    fixtures = []
+    for season_offset in range(n_seasons):
+        season_end = end_date - timedelta(days=365 * (n_seasons - 1 - season_offset))
+        season_start = season_end - timedelta(days=280)
+        # Same rule the scraper uses: August onwards belongs to that year's season
+        season = season_start.year if season_start.month >= 8 else season_start.year - 1
+
+        for division, members in divisions.items():
+            rounds = _round_robin(members)
+            spacing = 280 / max(1, len(rounds) - 1)
+            for r, pairs in enumerate(rounds):
+                match_date = season_start + timedelta(days=int(round(r * spacing)))
+                for home, away in pairs:
+                    fixtures.append((home, away, match_date, division, season))
+
+        # Promotion and relegation, decided by true strength plus some luck
+        if promotion_spots and season_offset < n_seasons - 1:
+            for upper, lower in zip(division_names[:-1], division_names[1:]):
+                upper_rank = sorted(divisions[upper], key=lambda t: team_strength[t] + rng.normal(0, 0.2))
+                lower_rank = sorted(divisions[lower], key=lambda t: team_strength[t] + rng.normal(0, 0.2), reverse=True)
+                spots = min(promotion_spots, len(upper_rank), len(lower_rank))
+                relegated, promoted = upper_rank[:spots], lower_rank[:spots]
+                divisions[upper] = [t for t in divisions[upper] if t not in relegated] + promoted
+                divisions[lower] = [t for t in divisions[lower] if t not in promoted] + relegated
+
+    return pd.DataFrame(fixtures, columns=['home_team', 'away_team', 'match_date', 'division', 'season'])
+
+
+def generate_shot_data(n_teams=20, n_divisions=1, n_seasons=1, shots_per_match=24.0, end_date=None,
+                       true_params=None, promotion_spots=3, penalty_rate=0.015, red_card_rate=0.05, seed=0):
+    """
+    Generate shot rows in the prem_data schema from known team strengths.
+
+    Each team in a match takes a Poisson number of shots whose xG adds up, on
+    average, to attack * opponent defense (* home advantage for the home side).
+    Goals are Bernoulli draws on each shot's xG, so xG resimulation is the
+    true data-generating process.
+
+    Args:
+        n_teams (int): Total number of teams
+        n_divisions (int): Number of divisions
+        n_seasons (int): Number of seasons, the last one finishing at end_date
+        shots_per_match (float): Average total shots per match (both teams)
+        end_date (datetime): Date of the final round (defaults to today)
+        true_params (dict): Output of generate_true_parameters, drawn if not given
+        promotion_spots (int): Teams swapped between adjacent divisions each season
+        penalty_rate (float): Share of shots that are penalties
+        red_card_rate (float): Chance of a red card for each team in a match
+        seed (int): Random seed
+
+    Returns:
+        tuple: (shot_data, true_params) - shot rows with the prem_data columns
+               and the parameters they were generated from
+    """
+    rng = np.random.default_rng(seed)
+    if true_params is None:
+        true_params = generate_true_parameters(n_teams, n_divisions, seed=seed)
+    if end_date is None:
+        end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    matches = _schedule(true_params, n_seasons, end_date, promotion_spots, rng)
+    n_matches = len(matches)
+
+    # Expected goals for each side: first all home sides, then all away sides
+    attack = true_params['team_attack']
+    defense = true_params['team_defense']
+    lambda_home = (matches['home_team'].map(attack) * matches['away_team'].map(defense)).values * true_params['home_advantage']
+    lambda_away = (matches['away_team'].map(attack) * matches['home_team'].map(defense)).values
+    side_lambda = np.concatenate([lambda_home, lambda_away])
+    side_match = np.concatenate([np.arange(n_matches), np.arange(n_matches)])
+    side_team = np.concatenate([matches['home_team'].values, matches['away_team'].values])
+
+    # Shots per side, and xG per shot scaled so each side's xG averages its lambda
+    shots_per_side = shots_per_match / 2
+    n_shots = np.maximum(rng.poisson(shots_per_side, len(side_lambda)), 1)
+    shot_side = np.repeat(np.arange(len(side_lambda)), n_shots)
+    shot_mean = (side_lambda / n_shots)[shot_side]
+    xg = np.clip(rng.gamma(1.5, shot_mean / 1.5), 0.01, 0.95)
+
+    is_penalty = rng.random(len(xg)) < penalty_rate
+    xg = np.where(is_penalty, 0.79, xg)
+    is_goal = rng.random(len(xg)) < xg
+
+    # Post-shot xG: higher for goals, present for saved shots, zero when off target or blocked
+    on_target = is_goal | (rng.random(len(xg)) < 0.35)
+    psxg = np.where(is_goal, np.clip(xg * rng.uniform(1.0, 2.5, len(xg)), 0.05, 0.99),
+                    np.where(on_target, np.clip(xg * rng.uniform(0.3, 1.2, len(xg)), 0.01, 0.99), 0.0))
+    outcome = np.where(is_goal, 'Goal', np.where(on_target, 'Saved',
+                       np.where(rng.random(len(xg)) < 0.5, 'Off Target', 'Blocked')))
+
+    shot_team = side_team[shot_side]
+    player_number = rng.integers(1, 12, len(xg)).astype(str)
+    shots = pd.DataFrame({
+        'match_index': side_match[shot_side],
+        'Minute': rng.integers(1, 96, len(xg)),
+        'Team': shot_team,
+        'Player': pd.Series(shot_team).str.cat(player_number, sep=' Player ').values,
+        'Event Type': np.where(is_penalty, 'Penalty', 'Shot'),
+        'Outcome': outcome,
+        'xG': np.round(xg, 2),
+        'PSxG': np.round(psxg, 2),
+    })
+    shots.loc[is_penalty, 'Player'] = shots.loc[is_penalty, 'Player'] + ' (pen)'
+
+    # Red cards, in the same shape the scraper gives them
+    red_side = np.flatnonzero(rng.random(len(side_lambda)) < red_card_rate)
+    red_cards = pd.DataFrame({
+        'match_index': side_match[red_side],
+        'Minute': rng.integers(1, 96, len(red_side)),
+        'Team': side_team[red_side],
+        'Player': pd.Series(side_team[red_side], dtype=object).str.cat(
+            rng.integers(1, 12, len(red_side)).astype(str), sep=' Player ').values,
+        'Event Type': 'Red Card',
+        'Outcome': 'Red Card',
+        'xG': 0.0,
+        'PSxG': 0.0,
+    })
+
+    events = pd.concat([shots, red_cards], ignore_index=True)
+    events = events.sort_values(['match_index', 'Minute'], kind='stable').reset_index(drop=True)
+
+    # Attach match metadata
+    match_dates = matches['match_date'].dt.strftime('%Y-%m-%d')
+    url_dates = matches['match_date'].dt.strftime('%B-%d-%Y')
+    match_urls = ("https://fbref.com/en/matches/" + pd.Series(np.arange(n_matches)).map('{:08x}'.format) + "/"
+                  + matches['home_team'].str.replace(' ', '-') + "-" + matches['away_team'].str.replace(' ', '-')
+                  + "-" + url_dates + "-" + matches['division'].str.replace(' ', '-'))
+    index = events.pop('match_index').values
+    events['match_url'] = match_urls.values[index]
+    events['match_date'] = match_dates.values[index]
+    events['home_team'] = matches['home_team'].values[index]
+    events['away_team'] = matches['away_team'].values[index]
+    events['division'] = matches['division'].values[index]
+    events['season'] = matches['season'].values[index]
+
+    return events[PREM_DATA_COLUMNS], true_params
+
+
+def generate_league(n_teams=20, n_divisions=1, n_seasons=1, shots_per_match=24.0, end_date=None, seed=0, **kwargs):
+    """
+    Generate a synthetic league in the same shape as load_data output.
+
+    Args:
+        n_teams (int): Total number of teams
+        n_divisions (int): Number of divisions
+        n_seasons (int): Number of seasons
+        shots_per_match (float): Average total shots per match
+        end_date (datetime): Date of the final round (defaults to today)
+        seed (int): Random seed
+        **kwargs: Passed through to generate_shot_data
+
+    Returns:
+        tuple: (shot_data, match_summaries, true_params) - shot_data and
+               match_summaries as load_data returns them, plus the true parameters
+    """
+    shot_data, true_params = generate_shot_data(
+        n_teams=n_teams, n_divisions=n_divisions, n_seasons=n_seasons, shots_per_match=shots_per_match,
+        end_date=end_date, seed=seed, **kwargs
+    )
+    shot_data['match_date'] = pd.to_datetime(shot_data['match_date'])
+    shot_data['is_goal'] = (shot_data['Outcome'] == 'Goal').astype(int)
+    match_summaries = create_match_summaries(shot_data)
+    return shot_data, match_summaries, true_params
+
+
+def write_to_db(shot_data, db_path, table_name="prem_data", if_exists='append'):
+    """
+    Write prem_data-schema shot rows to a SQLite database, creating the typed
+    table if needed. Events already in the table are skipped, and
+    match_summaries is refreshed for the written matches.
+
+    Args:
+        shot_data (DataFrame): Output of generate_shot_data
+        db_path (str): Path to the SQLite database
+        table_name (str): Name of the table to write to
+        if_exists (str): 'append', 'replace' or 'fail', as for DataFrame.to_sql
+
+    Returns:
+        int: Number of rows inserted
+    """
+    conn = connect(db_path)
+    if if_exists == 'replace':
+        with conn:
+            conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)}")
+            if table_name == "prem_data":
+                conn.execute("DROP TABLE IF EXISTS match_summaries")
+    elif if_exists == 'fail' and table_exists(conn, table_name):
+        raise ValueError(f"Table '{table_name}' already exists.")
+    return ingest_shots(shot_data[PREM_DATA_COLUMNS], table_name=table_name, conn=conn)['inserted']
+
+
+def parameter_recovery(model, true_params):
+    """
+    Compare a fitted model's team strengths with the parameters the data came from.
+
+    Attack and defense are only identified up to scale, so the true values are
+    rescaled to the fitted totals before comparing (the number of teams for a
+    single-division fit), with the scale difference folded into home advantage.
+
+    Args:
+        model: Any fitted model with team_attack, team_defense and home_advantage
+        true_params (dict): Output of generate_true_parameters
+
+    Returns:
+        dict: RMSE and correlation for attack and defense, true and fitted home
+              advantage, and a per-team comparison DataFrame
+    """
+    teams = sorted(set(model.team_attack) & set(true_params['team_attack']))
+    true_attack = np.array([true_params['team_attack'][t] for t in teams])
+    true_defense = np.array([true_params['team_defense'][t] for t in teams])
+    fitted_attack = np.array([model.team_attack[t] for t in teams])
+    fitted_defense = np.array([model.team_defense[t] for t in teams])
+    attack_scale = fitted_attack.sum() / true_attack.sum()
+    defense_scale = fitted_defense.sum() / true_defense.sum()
+
+    table = pd.DataFrame({
+        'team': teams,
+        'true_attack': true_attack * attack_scale,
+        'fitted_attack': fitted_attack,
+        'true_defense': true_defense * defense_scale,
+        'fitted_defense': fitted_defense,
+    })
+
+    return {
+        'attack_rmse': float(np.sqrt(np.mean((table['fitted_attack'] - table['true_attack']) ** 2))),
+        'defense_rmse': float(np.sqrt(np.mean((table['fitted_defense'] - table['true_defense']) ** 2))),
+        'attack_corr': float(table['fitted_attack'].corr(table['true_attack'])),
+        'defense_corr': float(table['fitted_defense'].corr(table['true_defense'])),
+        'true_home_advantage': float(true_params['home_advantage'] / (attack_scale * defense_scale)),
+        'fitted_home_advantage': float(model.home_advantage),
+        'table': table,
+    }
@@ -0,0 +1,44 @@
+"""
+Team strength models.
+
+The model classes and helpers below can be imported from the package
+(``from models import StandardTeamModel``); each is loaded from its module on
+first use, so ``import models`` itself is nearly free. Inside the model
+modules scipy and pandas are imported by the fitting code, which means a
+process that only calls predict_match on stored parameters never loads them.
+"""
+import importlib
+
+_EXPORTS = {
+    'StandardTeamModel': 'models.standard_dc',
+    'xGShotsTeamModel': 'models.xg_shots_resimmed_dc',
+    'xGTotalTeamModel': 'models.xg_totals_resimmed_dc',
+    'PSxGShotsTeamModel': 'models.psxg_shots_resimmed_dc',
+    'PSxGTotalTeamModel': 'models.psxg_totals_resimmed_dc',
+    'FitInstrumentation': 'models.instrumentation',
+    'ListSink': 'models.instrumentation',
+    'LoggerSink': 'models.instrumentation',
+    'JsonLinesSink': 'models.instrumentation',
+    'fit_multi_division': 'models.sparse_dc',
+    'preprocess_matches': 'models.preprocessing',
+    'PreparedDataset': 'models.preprocessing',
+    'PairingTables': 'models.tables',
+    'decay_weights': 'models.preprocessing',
+    'evaluate_forecasts': 'models.evaluation',
+    'score_matrices': 'models.evaluation',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
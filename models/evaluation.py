@@ -0,0 +1,194 @@
+import numpy as np
+
+# Outcome order used throughout: home win, draw, away win
+OUTCOMES = ('home', 'draw', 'away')
+
+
+def score_matrices(lambda_home, lambda_away, rho=0.0, max_goals=10, normalise=True):
+    """
+    Build Dixon-Coles score matrices for many fixtures at once.
+
+    Uses the same low-score adjustment as the models' dc_probability.
+
+    Args:
+        lambda_home (array): Expected home goals, one per fixture
+        lambda_away (array): Expected away goals, one per fixture
+        rho (float or array): Dixon-Coles rho, scalar or one per fixture
+        max_goals (int): Highest goal count per team in the matrix
+        normalise (bool): Rescale each matrix to sum to 1 (truncation and the
+                          rho adjustment both leave some mass unaccounted for)
+
+    Returns:
+        array: Shape (n_fixtures, max_goals + 1, max_goals + 1), entry [i, h, a]
+               is the probability fixture i finishes h-a
+    """
+    from scipy.stats import poisson
+
+    lambda_home = np.atleast_1d(np.asarray(lambda_home, dtype=float))
+    lambda_away = np.atleast_1d(np.asarray(lambda_away, dtype=float))
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), lambda_home.shape)
+    goals = np.arange(max_goals + 1)
+
+    p_home = poisson.pmf(goals[None, :], lambda_home[:, None])
+    p_away = poisson.pmf(goals[None, :], lambda_away[:, None])
+    matrices = p_home[:, :, None] * p_away[:, None, :]
+
+    # Dixon-Coles adjustment for low-scoring dependencies
+    matrices[:, 0, 0] *= 1 - rho
+    matrices[:, 0, 1] *= 1 + rho * lambda_home
+    matrices[:, 1, 0] *= 1 + rho * lambda_away
+    matrices[:, 1, 1] *= 1 - rho * lambda_home * lambda_away
+    np.clip(matrices, 0, None, out=matrices)
+
+    if normalise:
+        matrices /= matrices.sum(axis=(1, 2), keepdims=True)
+    return matrices
+
+
+def outcome_probabilities(matrices):
+    """
+    Collapse score matrices into home/draw/away probabilities.
+
+    Returns:
+        array: Shape (n_fixtures, 3) in OUTCOMES order
+    """
+    size = matrices.shape[-1]
+    home_mask = np.tril(np.ones((size, size), dtype=bool), -1)
+    away_mask = home_mask.T
+    return np.stack([
+        matrices[:, home_mask].sum(axis=1),
+        np.trace(matrices, axis1=1, axis2=2),
+        matrices[:, away_mask].sum(axis=1),
+    ], axis=1)
+
+
+def outcome_index(home_goals, away_goals):
+    """Index of the actual result in OUTCOMES order (0 home win, 1 draw, 2 away win)."""
+    home_goals = np.asarray(home_goals)
+    away_goals = np.asarray(away_goals)
+    return np.where(home_goals > away_goals, 0, np.where(home_goals == away_goals, 1, 2))
+
+
+def ranked_probability_score(probabilities, outcomes):
+    """
+    Ranked probability score for ordered home/draw/away forecasts (lower is better).
+
+    Args:
+        probabilities (array): Shape (n_fixtures, 3) in OUTCOMES order
+        outcomes (array): Result indices from outcome_index
+
+    Returns:
+        array: RPS for each fixture
+    """
+    observed = np.eye(3)[outcomes]
+    cumulative_diff = np.cumsum(probabilities, axis=1) - np.cumsum(observed, axis=1)
+    return (cumulative_diff[:, :-1] ** 2).sum(axis=1) / 2
+
+
+def brier_score(probabilities, outcomes):
+    """
+    Multi-class Brier score for home/draw/away forecasts (lower is better).
+
+    Returns:
+        array: Brier score for each fixture
+    """
+    observed = np.eye(3)[outcomes]
+    return ((probabilities - observed) ** 2).sum(axis=1)
+
+
+def scoreline_log_loss(matrices, home_goals, away_goals, eps=1e-15):
+    """
+    Negative log probability given to the exact final score.
+
+    A score with more than max_goals for either side has no cell in the
+    matrix, and the edge cell's probability is not the tail's, so those
+    fixtures are NaN rather than scored; evaluate_forecasts leaves them out
+    of the mean and reports how many there were.
+
+    Returns:
+        array: Log-loss for each fixture (NaN beyond the matrix)
+    """
+    max_goals = matrices.shape[-1] - 1
+    home_goals = np.asarray(home_goals, dtype=int)
+    away_goals = np.asarray(away_goals, dtype=int)
+    in_matrix = (home_goals <= max_goals) & (away_goals <= max_goals)
+    p = matrices[np.arange(len(matrices)), np.minimum(home_goals, max_goals), np.minimum(away_goals, max_goals)]
+    return np.where(in_matrix, -np.log(np.clip(p, eps, None)), np.nan)
+
+
+def calibration_bins(probabilities, outcomes, n_bins=10):
+    """
+    Reliability table comparing forecast probabilities with observed frequencies.
+
+    Args:
+        probabilities (array): Shape (n_fixtures, 3) in OUTCOMES order
+        outcomes (array): Result indices from outcome_index
+        n_bins (int): Number of equal-width probability bins
+
+    Returns:
+        DataFrame: One row per (outcome, bin) with mean forecast, observed
+                   frequency and fixture count
+    """
+    import pandas as pd
+
+    observed = np.eye(3)[outcomes]
+    bins = np.minimum((probabilities * n_bins).astype(int), n_bins - 1)
+
+    # Offset bin ids per outcome so one bincount covers all three
+    flat_bins = (bins + np.arange(3) * n_bins).ravel()
+    size = 3 * n_bins
+    counts = np.bincount(flat_bins, minlength=size)
+    forecast_sum = np.bincount(flat_bins, weights=probabilities.ravel(), minlength=size)
+    observed_sum = np.bincount(flat_bins, weights=observed.ravel(), minlength=size)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table = pd.DataFrame({
+            'outcome': np.repeat(OUTCOMES, n_bins),
+            'bin_lower': np.tile(np.arange(n_bins) / n_bins, 3),
+            'bin_upper': np.tile((np.arange(n_bins) + 1) / n_bins, 3),
+            'mean_forecast': forecast_sum / counts,
+            'observed_frequency': observed_sum / counts,
+            'count': counts,
+        })
+    return table[table['count'] > 0].reset_index(drop=True)
+
+
+def evaluate_forecasts(lambda_home, lambda_away, home_goals, away_goals, rho=0.0, max_goals=10):
+    """
+    Score a batch of forecasts against results on proper scoring rules in one pass.
+
+    Args:
+        lambda_home (array): Expected home goals, one per fixture
+        lambda_away (array): Expected away goals, one per fixture
+        home_goals (array): Actual home goals
+        away_goals (array): Actual away goals
+        rho (float or array): Dixon-Coles rho, scalar or one per fixture
+        max_goals (int): Highest goal count per team in the score matrices
+
+    Returns:
+        dict: Mean RPS, scoreline log-loss, 1X2 Brier score and goal MAE, plus
+              the number of fixtures. Fixtures with a score beyond max_goals
+              are left out of the log-loss (NaN if none remain) and counted in
+              log_loss_excluded.
+    """
+    lambda_home = np.asarray(lambda_home, dtype=float)
+    lambda_away = np.asarray(lambda_away, dtype=float)
+    home_goals = np.asarray(home_goals)
+    away_goals = np.asarray(away_goals)
+
+    matrices = score_matrices(lambda_home, lambda_away, rho=rho, max_goals=max_goals)
+    probabilities = outcome_probabilities(matrices)
+    outcomes = outcome_index(home_goals, away_goals)
+    log_loss = scoreline_log_loss(matrices, home_goals, away_goals)
+    scored = ~np.isnan(log_loss)
+
+    return {
+        'rps': float(ranked_probability_score(probabilities, outcomes).mean()),
+        'log_loss': float(log_loss[scored].mean()) if scored.any() else float('nan'),
+        'log_loss_excluded': int((~scored).sum()),
+        'brier': float(brier_score(probabilities, outcomes).mean()),
+        'home_mae': float(np.abs(lambda_home - home_goals).mean()),
+        'away_mae': float(np.abs(lambda_away - away_goals).mean()),
+        'total_mae': float(np.abs((lambda_home + lambda_away) - (home_goals + away_goals)).mean()),
+        'num_matches': len(outcomes),
+    }
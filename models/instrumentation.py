@@ -0,0 +1,140 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+
+class ListSink:
+    """Collect instrumentation records in memory."""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+
+class LoggerSink:
+    """Send instrumentation records to a standard library logger as JSON."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('models.fit')
+        self.level = level
+
+    def __call__(self, record):
+        self.logger.log(self.level, json.dumps(record, default=str))
+
+
+class JsonLinesSink:
+    """Append instrumentation records to a JSON lines file, one record per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+
+class FitInstrumentation:
+    """
+    Timing and convergence instrumentation for the fit pipeline.
+
+    Records are plain dicts sent to `sink`, any callable taking one record
+    (ListSink, LoggerSink, JsonLinesSink or your own). With no sink nothing is
+    recorded, so fitting is silent by default.
+
+    Parameters:
+    sink: Callable receiving each record, or None to disable instrumentation
+    trace: Also record the objective value after every optimiser iteration
+    """
+
+    def __init__(self, sink=None, trace=False):
+        self.sink = sink
+        self.trace = trace
+        self.context = {}
+        self.evaluations = 0
+        self.evaluation_time = 0.0
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def start_fit(self, model_name, **fields):
+        """Tag every following record with the model being fitted."""
+        self.context = {'model': model_name}
+        self.context.update(fields)
+
+    def emit(self, event, **fields):
+        """Send one record to the sink."""
+        if self.sink is None:
+            return
+        record = {'event': event, 'time': time.time()}
+        record.update(self.context)
+        record.update(fields)
+        self.sink(record)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """
+        Time a pipeline stage (preprocess, resimulate, encode, optimise).
+
+        Yields a dict that the caller can add fields to; they are included in
+        the stage record along with the wall time.
+        """
+        extra = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.emit('stage', stage=name, wall_time=time.perf_counter() - start, **extra)
+
+    def wrap_objective(self, objective):
+        """
+        Count objective (likelihood) evaluations and the time spent in them.
+
+        Returns the objective unchanged when instrumentation is disabled.
+        """
+        self.evaluations = 0
+        self.evaluation_time = 0.0
+        if not self.enabled:
+            return objective
+
+        def counted(params):
+            start = time.perf_counter()
+            value = objective(params)
+            self.evaluation_time += time.perf_counter() - start
+            self.evaluations += 1
+            return value
+
+        return counted
+
+    def iteration_callback(self):
+        """
+        Return a scipy.optimize callback recording the objective after each iteration.
+
+        Returns None unless tracing is switched on.
+        """
+        if not (self.enabled and self.trace):
+            return None
+        iteration = {'n': 0}
+
+        def callback(intermediate_result):
+            iteration['n'] += 1
+            self.emit('iteration', iteration=iteration['n'], objective=float(intermediate_result.fun))
+
+        return callback
+
+    def optimisation_fields(self, result):
+        """Convergence details for an OptimizeResult, for adding to the optimise stage."""
+        evaluations = self.evaluations
+        return {
+            'success': bool(result.success),
+            'message': str(result.message),
+            'objective': float(result.fun),
+            'nfev': int(result.nfev),
+            'nit': int(result.nit),
+            'n_params': len(result.x),
+            'evaluations': evaluations,
+            'time_per_evaluation': self.evaluation_time / evaluations if evaluations else None,
+        }
@@ -0,0 +1,177 @@
+"""
+Vectorized match preprocessing shared by the team models.
+
+preprocess_matches keeps the matches inside a window that ends at an explicit
+as_of date and encodes what the likelihoods need as arrays: team indices,
+goals, days and seasons before the reference date, and the decay weights for
+a given epsilon and season_penalty. The same matches and as_of always give
+the same result, so backtests can call it once per week instead of
+re-filtering by hand. PreparedDataset bundles that output with the grouped
+shot data so several models can be fitted from one preparation.
+
+pandas is imported when preprocessing runs, so importing this module keeps
+``import models`` cheap.
+"""
+import numpy as np
+
+
+def decay_weights(days_from_ref, seasons_ago, epsilon=0.0065, season_penalty=0.75):
+    """
+    Time decay weights, as applied to each match by the models' dc_log_likelihood.
+
+    Args:
+        days_from_ref (array): Days between each match and the reference date
+        seasons_ago (array): Seasons between each match and the current season
+        epsilon (float): Time decay rate
+        season_penalty (float): Weight multiplier per season ago
+
+    Returns:
+        ndarray: 1 / (1 + epsilon * days_from_ref) * season_penalty ** seasons_ago
+    """
+    days_from_ref = np.asarray(days_from_ref, dtype=float)
+    seasons_ago = np.maximum(np.asarray(seasons_ago, dtype=float), 0)
+    return 1.0 / (1.0 + epsilon * days_from_ref) * season_penalty ** seasons_ago
+
+
+def preprocess_matches(matches, as_of=None, days_ago=365, epsilon=0.0065, season_penalty=0.75,
+                       division_weights=None):
+    """
+    Filter matches to the window ending at as_of and encode them as arrays.
+
+    Matches dated from as_of - days_ago up to and including as_of are kept,
+    in their input order. As in the models' own preprocessing, days are
+    counted back from the latest kept match and seasons from the latest kept
+    season (a missing season counts as no seasons ago).
+
+    Args:
+        matches (list or DataFrame): Match dicts or rows with home_team, away_team,
+                                     home_goals, away_goals and match_date, and
+                                     optionally season, division and weight
+        as_of (str or datetime): Last date of the window (defaults to the latest match date)
+        days_ago (int): Length of the window in days
+        epsilon (float): Time decay rate
+        season_penalty (float): Weight multiplier per season ago
+        division_weights (dict): Optional extra weight per division name
+
+    Returns:
+        dict: Contains:
+              - matches: DataFrame of the kept matches, with match_date as
+                datetimes and a days_from_ref column
+              - teams: Sorted team names
+              - home, away: Team indices into teams
+              - home_goals, away_goals, days_from_ref, seasons_ago: Arrays
+              - weights: decay_weights times each match's own 'weight' (if
+                any) and its division weight
+              - as_of, reference_date, current_season
+    """
+    import pandas as pd
+
+    matches_df = matches if isinstance(matches, pd.DataFrame) else pd.DataFrame(list(matches))
+    match_dates = pd.to_datetime(matches_df['match_date'])
+    as_of = match_dates.max() if as_of is None else pd.Timestamp(as_of)
+    keep = ((match_dates >= as_of - pd.Timedelta(days=days_ago)) & (match_dates <= as_of)).to_numpy()
+
+    filtered = matches_df[keep].reset_index(drop=True)
+    match_dates = match_dates[keep].reset_index(drop=True)
+    filtered['match_date'] = match_dates
+    n_matches = len(filtered)
+
+    reference_date = match_dates.max() if n_matches else None
+    if n_matches:
+        days_from_ref = (reference_date - match_dates).dt.days.clip(lower=0).to_numpy(dtype=np.int64)
+    else:
+        days_from_ref = np.zeros(0, dtype=np.int64)
+    filtered['days_from_ref'] = days_from_ref
+
+    if 'season' in filtered.columns:
+        seasons = filtered['season'].fillna(0).to_numpy(dtype=np.int64)
+    else:
+        seasons = np.zeros(n_matches, dtype=np.int64)
+    current_season = int(seasons.max()) if n_matches else None
+    seasons_ago = np.where((seasons != 0) & bool(current_season), (current_season or 0) - seasons, 0)
+
+    home_names = filtered['home_team'].astype(object).to_numpy()
+    away_names = filtered['away_team'].astype(object).to_numpy()
+    teams = sorted(set(home_names) | set(away_names))
+    team_index = pd.Index(teams)
+
+    weights = decay_weights(days_from_ref, seasons_ago, epsilon, season_penalty)
+    if 'weight' in filtered.columns:
+        weights = weights * filtered['weight'].fillna(1.0).to_numpy(dtype=float)
+    if division_weights and 'division' in filtered.columns:
+        division_weight = filtered['division'].astype(object).map(division_weights).fillna(1.0)
+        weights = weights * division_weight.to_numpy(dtype=float)
+
+    return {
+        'matches': filtered,
+        'teams': teams,
+        'home': team_index.get_indexer(home_names),
+        'away': team_index.get_indexer(away_names),
+        'home_goals': filtered['home_goals'].to_numpy(dtype=np.int64),
+        'away_goals': filtered['away_goals'].to_numpy(dtype=np.int64),
+        'days_from_ref': days_from_ref,
+        'seasons_ago': seasons_ago,
+        'weights': weights,
+        'as_of': as_of,
+        'reference_date': reference_date,
+        'current_season': current_season,
+    }
+
+
+class PreparedDataset:
+    """
+    Matches and shots prepared once and shared by every model in an ensemble.
+
+    Built from load_data output: preprocess_matches filters the match
+    summaries to the window ending at as_of and encodes them, and shot_data
+    (if given) is grouped by match with models.resimulation.group_shots.
+    Every model's fit_models accepts the dataset in place of its match list
+    (and shot data), so ensemble builds and parameter sweeps pay for
+    filtering, team encoding and the shot scan once. The dataset is plain
+    arrays and frames, so it also pickles cheaply to worker processes.
+
+    Models fitted on a dataset use its window, not their own days_ago or
+    as_of defaults; passing either to fit_models with a dataset raises
+    ValueError.
+
+    Parameters:
+    match_summaries: Match summaries (or a list of match dicts) from load_data
+    shot_data: Shot rows from load_data, full or compact; needed by the shot resimulating models
+    as_of: Last date of the window (defaults to the latest match date)
+    days_ago: Length of the window in days
+    """
+
+    def __init__(self, match_summaries, shot_data=None, as_of=None, days_ago=365):
+        from models.resimulation import group_shots
+
+        prepared = preprocess_matches(match_summaries, as_of=as_of, days_ago=days_ago)
+        self.days_ago = days_ago
+        self.as_of = prepared['as_of']
+        self.reference_date = prepared['reference_date']
+        self.current_season = prepared['current_season']
+        self.matches = prepared['matches']
+        self.teams = prepared['teams']
+        self.home = prepared['home']
+        self.away = prepared['away']
+        self.home_goals = prepared['home_goals']
+        self.away_goals = prepared['away_goals']
+        self.days_from_ref = prepared['days_from_ref']
+        self.seasons_ago = prepared['seasons_ago']
+        self.shots = group_shots(self.matches, shot_data) if shot_data is not None else None
+        self._records = self.matches.to_dict('records')
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def metadata(self):
+        """reference_date and current_season, as returned by the models' _preprocess_matches."""
+        return {'reference_date': self.reference_date, 'current_season': self.current_season}
+
+    def match_records(self):
+        """Copies of the match dicts the likelihoods read, safe for a model to modify."""
+        return [record.copy() for record in self._records]
+
+    def weights(self, epsilon=0.0065, season_penalty=0.75):
+        """Time decay weight of each match (see decay_weights)."""
+        return decay_weights(self.days_from_ref, self.seasons_ago, epsilon, season_penalty)
@@ -0,0 +1,169 @@
+"""
+Vectorized match resimulation for the resimulating team models.
+
+group_shots arranges shot_data by match once: each match's home shots
+followed by its away shots, located through an offsets array, so a match's
+shots are a slice rather than a scan of the whole table. The simulate
+functions draw every simulation of a match in one call, consuming numpy's
+global random stream in the same order as drawing one shot (or one side's
+total) at a time, so seeded fits reproduce earlier results exactly.
+"""
+import numpy as np
+
+
+def group_shots(matches, shot_data):
+    """
+    Group shot xG and PSxG by match, home shots first.
+
+    Shots are matched to matches on match_url, or on match_id for compact
+    shot data (see data.fetch_match_data.compact_shot_data), and to a side
+    by their Team. Shots of neither team are dropped, but still count
+    towards has_shots.
+
+    Args:
+        matches (list or DataFrame): Match dicts or rows with home_team, away_team
+                                     and match_url (or match_id)
+        shot_data (DataFrame): Shot rows with Team, xG and PSxG
+
+    Returns:
+        dict: Contains:
+              - offsets: Start of each match's shots, plus the total at the end
+              - home_counts, away_counts: Shots per match for each side
+              - has_shots: Whether any shot row belongs to the match
+              - xG, PSxG: Shot values in grouped order (None if not loaded)
+    """
+    import pandas as pd
+
+    matches_df = matches if isinstance(matches, pd.DataFrame) else pd.DataFrame(list(matches))
+    match_key = 'match_url' if 'match_url' in shot_data.columns else 'match_id'
+    n_matches = len(matches_df)
+
+    if n_matches and match_key in matches_df.columns:
+        match_keys = matches_df[match_key].astype(object).to_numpy()
+        keyed = pd.notna(match_keys) & (match_keys != '')
+        position = pd.Index(match_keys[keyed]).get_indexer(shot_data[match_key].astype(object).to_numpy())
+        position = np.where(position >= 0, np.flatnonzero(keyed)[np.maximum(position, 0)], -1)
+    else:
+        position = np.full(len(shot_data), -1)
+    has_shots = np.bincount(position[position >= 0], minlength=n_matches) > 0
+
+    in_match = position >= 0
+    position = position[in_match]
+    teams = shot_data['Team'].astype(object).to_numpy()[in_match]
+    home_teams = matches_df['home_team'].astype(object).to_numpy() if n_matches else np.empty(0, dtype=object)
+    away_teams = matches_df['away_team'].astype(object).to_numpy() if n_matches else np.empty(0, dtype=object)
+    side = np.where(teams == home_teams[position], 0, np.where(teams == away_teams[position], 1, -1))
+
+    # Stable sort keeps the shots of each side in their original order
+    on_side = side >= 0
+    order = np.flatnonzero(in_match)[on_side]
+    position, side = position[on_side], side[on_side]
+    grouped = np.argsort(2 * position + side, kind='stable')
+    order, position, side = order[grouped], position[grouped], side[grouped]
+
+    home_counts = np.bincount(position[side == 0], minlength=n_matches)
+    away_counts = np.bincount(position[side == 1], minlength=n_matches)
+    values = {column: shot_data[column].to_numpy(dtype=float)[order] if column in shot_data.columns else None
+              for column in ('xG', 'PSxG')}
+    return {
+        'offsets': np.concatenate([[0], np.cumsum(home_counts + away_counts)]),
+        'home_counts': home_counts,
+        'away_counts': away_counts,
+        'has_shots': has_shots,
+        **values,
+    }
+
+
+def simulate_shot_goals(shots, column, n_simulations):
+    """
+    Simulate each match's goals by drawing every shot as a Bernoulli trial.
+
+    Args:
+        shots (dict): Grouped shots from group_shots
+        column (str): Shot probability to use ('xG' or 'PSxG')
+        n_simulations (int): Simulations per match
+
+    Returns:
+        tuple: (home_goals, away_goals) - integer arrays of shape
+               (n_matches, n_simulations); zero for matches without shots
+    """
+    offsets, home_counts, probabilities = shots['offsets'], shots['home_counts'], shots[column]
+    n_matches = len(home_counts)
+    home_goals = np.zeros((n_matches, n_simulations), dtype=np.int64)
+    away_goals = np.zeros((n_matches, n_simulations), dtype=np.int64)
+    for m in np.flatnonzero(shots['has_shots']):
+        start, end = offsets[m], offsets[m + 1]
+        # One row of draws per simulation: home shots, then away shots
+        scored = np.random.random((n_simulations, end - start)) < probabilities[start:end]
+        home_goals[m] = scored[:, :home_counts[m]].sum(axis=1)
+        away_goals[m] = scored[:, home_counts[m]:].sum(axis=1)
+    return home_goals, away_goals
+
+
+def simulate_total_goals(home_totals, away_totals, n_simulations):
+    """
+    Simulate each match's goals as Poisson draws around its xG or PSxG totals.
+
+    Matches where either total is zero are not simulated.
+
+    Args:
+        home_totals (array): Home xG or PSxG per match
+        away_totals (array): Away xG or PSxG per match
+        n_simulations (int): Simulations per match
+
+    Returns:
+        tuple: (home_goals, away_goals, simulated) - integer arrays of shape
+               (n_matches, n_simulations) and which matches were simulated
+    """
+    home_totals = np.asarray(home_totals, dtype=float)
+    away_totals = np.asarray(away_totals, dtype=float)
+    simulated = (home_totals != 0) & (away_totals != 0)
+
+    # Draw order is home, away for each simulation of each match in turn
+    means = np.stack([home_totals[simulated], away_totals[simulated]], axis=1)
+    draws = np.random.poisson(np.repeat(means[:, None, :], n_simulations, axis=1))
+
+    home_goals = np.zeros((len(home_totals), n_simulations), dtype=np.int64)
+    away_goals = np.zeros((len(home_totals), n_simulations), dtype=np.int64)
+    home_goals[simulated] = draws[:, :, 0]
+    away_goals[simulated] = draws[:, :, 1]
+    return home_goals, away_goals, simulated
+
+
+def expand_simulations(matches, home_goals, away_goals, simulated, original_weight):
+    """
+    Add the simulated copies of each match to the match list.
+
+    Simulations follow the original matches and carry is_simulation,
+    simulation_id and a weight of 1 / n_simulations; the originals are given
+    original_weight.
+
+    Args:
+        matches (list): Match dicts; their 'weight' is set in place
+        home_goals (array): Simulated home goals, shape (n_matches, n_simulations)
+        away_goals (array): Simulated away goals, shape (n_matches, n_simulations)
+        simulated (array): Which matches to add simulations for
+        original_weight (float): Weight of the original matches
+
+    Returns:
+        list: The original matches followed by the simulations
+    """
+    n_simulations = home_goals.shape[1]
+    weight = 1.0 / n_simulations if n_simulations else 0.0
+    home_goals, away_goals = home_goals.tolist(), away_goals.tolist()
+
+    expanded_matches = list(matches)
+    for m in np.flatnonzero(simulated):
+        match = matches[m]
+        for i in range(n_simulations):
+            sim_match = match.copy()
+            sim_match['home_goals'] = home_goals[m][i]
+            sim_match['away_goals'] = away_goals[m][i]
+            sim_match['is_simulation'] = True
+            sim_match['simulation_id'] = i
+            sim_match['weight'] = weight
+            expanded_matches.append(sim_match)
+
+    for match in matches:
+        match['weight'] = original_weight
+    return expanded_matches
@@ -0,0 +1,282 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import minimize
+from scipy.special import gammaln
+
+from models.instrumentation import FitInstrumentation
+from models.preprocessing import decay_weights
+
+# Division whose offsets are fixed at 1 when present, so its parameters stay on the usual scale
+DEFAULT_REFERENCE_DIVISION = 'Premier League'
+
+
+def match_weights(matches, metadata, epsilon, season_penalty, division_weights=None):
+    """
+    Per-match likelihood weights, matching the weighting in dc_log_likelihood.
+
+    Combines the time decay and previous-season penalty of
+    models.preprocessing.decay_weights, the match's own 'weight' (fractional
+    for resimulations) and an optional weight per division.
+    """
+    reference_date = metadata.get('reference_date')
+    current_season = metadata.get('current_season')
+    division_weights = division_weights or {}
+
+    days_from_ref = np.zeros(len(matches))
+    seasons_ago = np.zeros(len(matches))
+    extra_weights = np.empty(len(matches))
+    for i, match in enumerate(matches):
+        if 'days_from_ref' in match:
+            days_from_ref[i] = match['days_from_ref']
+        elif reference_date and 'match_date' in match:
+            days_from_ref[i] = max(0, (reference_date - pd.Timestamp(match['match_date'])).days)
+
+        match_season = match.get('season', current_season)
+        if current_season and match_season:
+            seasons_ago[i] = current_season - match_season
+
+        extra_weights[i] = match.get('weight', 1.0) * division_weights.get(match.get('division'), 1)
+
+    # A missing (NaN) season counts as no seasons ago, as in dc_log_likelihood
+    seasons_ago = np.nan_to_num(seasons_ago, nan=0.0)
+    return decay_weights(days_from_ref, seasons_ago, epsilon, season_penalty) * extra_weights
+
+
+def assign_team_divisions(matches, team_list, reference_division=None):
+    """
+    Place each team in the division of its most recent match.
+
+    Args:
+        matches (list): Match dicts with 'division' and 'match_date'
+        team_list (list): Sorted team names
+        reference_division (str): Division whose offsets are fixed at 1 (defaults
+                                  to the Premier League, or else the division
+                                  with the most matches)
+
+    Returns:
+        tuple: (team_division, division_names) - division index per team and
+               the division names, reference division first
+    """
+    latest = {}
+    counts = {}
+    for match in matches:
+        division = match.get('division') or 'Unknown'
+        counts[division] = counts.get(division, 0) + 1
+        match_date = pd.Timestamp(match['match_date']) if match.get('match_date') is not None else pd.Timestamp.min
+        for team in (match['home_team'], match['away_team']):
+            if team not in latest or match_date >= latest[team][0]:
+                latest[team] = (match_date, division)
+
+    if reference_division is None:
+        reference_division = DEFAULT_REFERENCE_DIVISION
+    if reference_division not in counts:
+        reference_division = max(sorted(counts), key=lambda d: counts[d])
+    division_names = [reference_division] + sorted(d for d in counts if d != reference_division)
+    division_index = {d: k for k, d in enumerate(division_names)}
+    team_division = np.array([division_index[latest[team][1]] for team in team_list], dtype=np.int64)
+    return team_division, division_names
+
+
+def encode_matches(matches, team_list, weights, team_division, division_names):
+    """
+    Encode matches as index arrays and sparse incidence matrices for the solver.
+
+    Matches with the same teams and scoreline (common after resimulation) are
+    merged by summing their weights, which leaves the likelihood unchanged.
+    Zero-weight matches are dropped.
+    """
+    team_index = {team: i for i, team in enumerate(team_list)}
+    home = np.array([team_index[m['home_team']] for m in matches], dtype=np.int64)
+    away = np.array([team_index[m['away_team']] for m in matches], dtype=np.int64)
+    home_goals = np.array([m['home_goals'] for m in matches], dtype=np.int64)
+    away_goals = np.array([m['away_goals'] for m in matches], dtype=np.int64)
+
+    keep = weights > 0
+    keys = np.stack([home[keep], away[keep], home_goals[keep], away_goals[keep]], axis=1)
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    merged_weights = np.bincount(inverse.ravel(), weights=weights[keep], minlength=len(unique_keys))
+    home, away, home_goals, away_goals = unique_keys.T
+
+    n_rows, n_teams = len(unique_keys), len(team_list)
+    rows = np.arange(n_rows)
+    ones = np.ones(n_rows)
+    return {
+        'n_teams': n_teams,
+        'n_divisions': len(division_names),
+        'division_names': division_names,
+        'team_division': team_division,
+        'team_counts': np.bincount(team_division, minlength=len(division_names)),
+        'home': home,
+        'away': away,
+        'home_goals': home_goals,
+        'away_goals': away_goals,
+        'weights': merged_weights,
+        'log_factorials': gammaln(home_goals + 1) + gammaln(away_goals + 1),
+        # Sparse match-team incidence: each match touches two teams
+        'home_incidence': sparse.csr_matrix((ones, (rows, home)), shape=(n_rows, n_teams)),
+        'away_incidence': sparse.csr_matrix((ones, (rows, away)), shape=(n_rows, n_teams)),
+        # Sparse team-division membership for the per-division constraints and offsets
+        'membership': sparse.csr_matrix((np.ones(n_teams), (np.arange(n_teams), team_division)),
+                                        shape=(n_teams, len(division_names))),
+        'low_scores': {
+            (0, 0): (home_goals == 0) & (away_goals == 0),
+            (0, 1): (home_goals == 0) & (away_goals == 1),
+            (1, 0): (home_goals == 1) & (away_goals == 0),
+            (1, 1): (home_goals == 1) & (away_goals == 1),
+        },
+    }
+
+
+def split_parameters(params, data):
+    """Split a parameter vector into home advantage, rho, attack, defense and offsets."""
+    n, k = data['n_teams'], data['n_divisions']
+    attack_offset = np.concatenate([[1.0], params[2 + 2 * n:2 + 2 * n + k - 1]])
+    defense_offset = np.concatenate([[1.0], params[2 + 2 * n + k - 1:]])
+    return params[0], params[1], params[2:2 + n], params[2 + n:2 + 2 * n], attack_offset, defense_offset
+
+
+def dc_objective_and_gradient(params, data):
+    """
+    Negative weighted Dixon-Coles log-likelihood with per-division constraints, and its gradient.
+
+    Expected goals use each team's strength times its division's offset:
+    lambda_home = attack[h] * attack_offset[div h] * defense[a] * defense_offset[div a] * home_advantage.
+    Attack and defense are pinned to sum to the number of teams within each
+    division by the same quadratic penalty the dense models use for the league.
+    """
+    home_advantage, rho, attack, defense, attack_offset, defense_offset = split_parameters(params, data)
+    team_division = data['team_division']
+    home, away = data['home'], data['away']
+    x, y, w = data['home_goals'], data['away_goals'], data['weights']
+
+    attack_abs = attack * attack_offset[team_division]
+    defense_abs = defense * defense_offset[team_division]
+    lambda_home = home_advantage * attack_abs[home] * defense_abs[away]
+    lambda_away = attack_abs[away] * defense_abs[home]
+
+    # Dixon-Coles adjustment and its derivatives for low-scoring results
+    tau = np.ones_like(lambda_home)
+    dtau_home = np.zeros_like(lambda_home)
+    dtau_away = np.zeros_like(lambda_home)
+    dtau_rho = np.zeros_like(lambda_home)
+    low = data['low_scores']
+    tau[low[0, 0]] = 1 - rho
+    dtau_rho[low[0, 0]] = -1
+    tau[low[0, 1]] = 1 + rho * lambda_home[low[0, 1]]
+    dtau_home[low[0, 1]] = rho
+    dtau_rho[low[0, 1]] = lambda_home[low[0, 1]]
+    tau[low[1, 0]] = 1 + rho * lambda_away[low[1, 0]]
+    dtau_away[low[1, 0]] = rho
+    dtau_rho[low[1, 0]] = lambda_away[low[1, 0]]
+    tau[low[1, 1]] = 1 - rho * lambda_home[low[1, 1]] * lambda_away[low[1, 1]]
+    dtau_home[low[1, 1]] = -rho * lambda_away[low[1, 1]]
+    dtau_away[low[1, 1]] = -rho * lambda_home[low[1, 1]]
+    dtau_rho[low[1, 1]] = -lambda_home[low[1, 1]] * lambda_away[low[1, 1]]
+
+    # Safeguard against log(0): non-positive probabilities count as 1e-10 with no gradient
+    valid = tau > 0
+    safe_tau = np.where(valid, tau, 1.0)
+    log_p = (np.log(safe_tau) + x * np.log(lambda_home) - lambda_home
+             + y * np.log(lambda_away) - lambda_away - data['log_factorials'])
+    log_p = np.where(valid, log_p, np.log(1e-10))
+    log_likelihood = np.dot(w, log_p)
+
+    # d(log-likelihood)/d(log lambda) for each match
+    w_valid = np.where(valid, w, 0.0)
+    g_home = w_valid * (x - lambda_home + lambda_home * dtau_home / safe_tau)
+    g_away = w_valid * (y - lambda_away + lambda_away * dtau_away / safe_tau)
+
+    # Scatter onto teams through the sparse incidence matrices
+    home_t, away_t = data['home_incidence'].T, data['away_incidence'].T
+    attack_contrib = home_t @ g_home + away_t @ g_away
+    defense_contrib = away_t @ g_home + home_t @ g_away
+
+    # Per-division constraint penalty
+    membership = data['membership']
+    attack_gap = membership.T @ attack - data['team_counts']
+    defense_gap = membership.T @ defense - data['team_counts']
+    penalty = np.dot(attack_gap, attack_gap) + np.dot(defense_gap, defense_gap)
+
+    grad = np.empty_like(params)
+    n, k = data['n_teams'], data['n_divisions']
+    grad[0] = -g_home.sum() / home_advantage
+    grad[1] = -np.dot(w_valid, dtau_rho / safe_tau)
+    grad[2:2 + n] = -attack_contrib / attack + 2 * attack_gap[team_division]
+    grad[2 + n:2 + 2 * n] = -defense_contrib / defense + 2 * defense_gap[team_division]
+    grad[2 + 2 * n:2 + 2 * n + k - 1] = -(membership.T @ attack_contrib)[1:] / attack_offset[1:]
+    grad[2 + 2 * n + k - 1:] = -(membership.T @ defense_contrib)[1:] / defense_offset[1:]
+
+    return -log_likelihood + penalty, grad
+
+
+def fit_multi_division(matches, team_list, metadata, epsilon=0.0065, season_penalty=0.75,
+                       division_weights=None, reference_division=None, instrumentation=None):
+    """
+    Fit Dixon-Coles parameters across several divisions at once.
+
+    Each division gets its own sum-to-N constraint on attack and defense plus
+    an attack and defense offset relative to the reference division, which is
+    identified through teams that were promoted or relegated. The optimiser is
+    given an analytic gradient computed through sparse match-team incidence
+    matrices, so cost grows with the number of matches rather than matches
+    times parameters.
+
+    A division's offsets only enter the likelihood on their own, rather than as
+    the product attack_offset * defense_offset, through matches against teams of
+    another division. If a division shares no matches with the others (no
+    promoted or relegated teams in the window), only that product is
+    identified: it sets the division's scoring level, while the split between
+    attack and defense is arbitrary and follows the starting values.
+
+    Args:
+        matches (list): Preprocessed (and possibly resimulated) match dicts
+        team_list (list): Sorted team names
+        metadata (dict): reference_date and current_season from _preprocess_matches
+        epsilon (float): Time decay rate
+        season_penalty (float): Weight multiplier per season ago
+        division_weights (dict): Optional extra likelihood weight per division name
+        reference_division (str): Division with offsets fixed at 1
+        instrumentation (FitInstrumentation): Optional timing/convergence recorder
+
+    Returns:
+        tuple: (params, division_offsets) - params laid out like
+               _optimize_dc_parameters output ([home_advantage, rho, attack...,
+               defense...]) with division offsets already applied, and a dict of
+               division name to (attack_offset, defense_offset)
+    """
+    if instrumentation is None:
+        instrumentation = FitInstrumentation()
+
+    with instrumentation.stage('encode_sparse') as stage:
+        weights = match_weights(matches, metadata, epsilon, season_penalty, division_weights)
+        team_division, division_names = assign_team_divisions(matches, team_list, reference_division)
+        data = encode_matches(matches, team_list, weights, team_division, division_names)
+        stage.update({'n_rows': len(data['weights']), 'n_divisions': len(division_names)})
+
+    n, k = len(team_list), len(division_names)
+    initial_params = np.concatenate([[1.2, 0.1], np.ones(2 * n), np.ones(2 * (k - 1))])
+    bounds = [(0.5, 2.0), (-0.3, 0.3)]  # Home advantage, rho
+    bounds.extend([(0.1, 3.0)] * (2 * n))  # Attack, defense
+    bounds.extend([(0.1, 5.0)] * (2 * (k - 1)))  # Division offsets
+
+    objective = instrumentation.wrap_objective(lambda params: dc_objective_and_gradient(params, data))
+    with instrumentation.stage('optimise', n_matches=len(matches), n_teams=n, n_divisions=k) as stage:
+        result = minimize(
+            objective,
+            initial_params,
+            jac=True,
+            method='L-BFGS-B',
+            bounds=bounds,
+            callback=instrumentation.iteration_callback()
+        )
+        stage.update(instrumentation.optimisation_fields(result))
+
+    home_advantage, rho, attack, defense, attack_offset, defense_offset = split_parameters(result.x, data)
+    params = np.concatenate([
+        [home_advantage, rho],
+        attack * attack_offset[team_division],
+        defense * defense_offset[team_division],
+    ])
+    division_offsets = {name: (attack_offset[i], defense_offset[i]) for i, name in enumerate(division_names)}
+    return params, division_offsets
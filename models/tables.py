@@ -0,0 +1,117 @@
+import numpy as np
+
+# Tables a PairingTables holds, by attribute name
+TABLES = ('lambda_home', 'lambda_away', 'home_win', 'draw', 'away_win')
+
+# Pairings scored per batch when building the 1X2 tables, to bound memory
+OUTCOME_BATCH_SIZE = 4096
+
+
+class PairingTables:
+    """
+    Expected goals and 1X2 probabilities for every home/away pairing of a fitted model.
+
+    For home team i and away team j, lambda_home[i, j] is
+    attack[i] * defense[j] * home_advantage and lambda_away[i, j] is
+    attack[j] * defense[i], as in predict_match. home_win, draw and away_win
+    come from the Dixon-Coles score matrices of models.evaluation. Rows and
+    columns follow `teams` and `index` maps a team name to its row, so a
+    pairing is a single array read and a team's home or away fixtures are one
+    row or column. The diagonal (a team against itself) is NaN.
+
+    Parameters:
+    teams: Team names, in row order
+    attack: Attack strength per team
+    defense: Defense strength per team
+    home_advantage: Home advantage multiplier
+    rho: Dixon-Coles rho used for the 1X2 tables
+    max_goals: Highest goal count per team in the score matrices
+    outcomes: Also build the 1X2 tables (only the lambdas when False)
+    """
+
+    def __init__(self, teams, attack, defense, home_advantage, rho=0.0, max_goals=10, outcomes=True):
+        self.teams = list(teams)
+        self.index = {team: i for i, team in enumerate(self.teams)}
+        self.home_advantage = home_advantage
+        self.rho = rho
+        attack = np.asarray(attack, dtype=float)
+        defense = np.asarray(defense, dtype=float)
+
+        self.lambda_home = np.outer(attack, defense) * home_advantage
+        self.lambda_away = np.outer(defense, attack)
+        np.fill_diagonal(self.lambda_home, np.nan)
+        np.fill_diagonal(self.lambda_away, np.nan)
+
+        self.home_win = self.draw = self.away_win = None
+        if outcomes:
+            self._build_outcomes(max_goals)
+
+    @classmethod
+    def from_model(cls, model, max_goals=10, outcomes=True):
+        """Build the tables from a fitted model's team_attack, team_defense, home_advantage and rho."""
+        teams = sorted(model.team_attack)
+        return cls(teams, [model.team_attack[team] for team in teams], [model.team_defense[team] for team in teams],
+                   model.home_advantage, rho=getattr(model, 'rho', 0.0), max_goals=max_goals, outcomes=outcomes)
+
+    def _build_outcomes(self, max_goals):
+        from models.evaluation import outcome_probabilities, score_matrices
+
+        n_teams = len(self.teams)
+        home, away = np.nonzero(~np.eye(n_teams, dtype=bool))
+        probabilities = np.empty((len(home), 3))
+        for start in range(0, len(home), OUTCOME_BATCH_SIZE):
+            batch = slice(start, start + OUTCOME_BATCH_SIZE)
+            matrices = score_matrices(self.lambda_home[home[batch], away[batch]],
+                                      self.lambda_away[home[batch], away[batch]],
+                                      rho=self.rho, max_goals=max_goals)
+            probabilities[batch] = outcome_probabilities(matrices)
+
+        tables = np.full((3, n_teams, n_teams), np.nan)
+        tables[:, home, away] = probabilities.T
+        self.home_win, self.draw, self.away_win = tables
+
+    def team_index(self, team):
+        """Row of a team in the tables."""
+        try:
+            return self.index[team]
+        except KeyError:
+            raise ValueError(f"Team '{team}' not found in the model. Available teams: {self.teams}") from None
+
+    def lambdas(self, home_team, away_team):
+        """
+        Expected goals for a pairing.
+
+        Returns:
+            tuple: (lambda_home, lambda_away)
+        """
+        i, j = self.team_index(home_team), self.team_index(away_team)
+        return self.lambda_home[i, j], self.lambda_away[i, j]
+
+    def outcome(self, home_team, away_team):
+        """
+        Home win, draw and away win probabilities for a pairing.
+
+        Returns:
+            tuple: (home_win, draw, away_win)
+        """
+        if self.home_win is None:
+            raise ValueError("The 1X2 tables were not built (outcomes=False)")
+        i, j = self.team_index(home_team), self.team_index(away_team)
+        return self.home_win[i, j], self.draw[i, j], self.away_win[i, j]
+
+    def to_frame(self, table='home_win'):
+        """
+        One table as a DataFrame with home teams as rows and away teams as columns.
+
+        Args:
+            table (str): 'lambda_home', 'lambda_away', 'home_win', 'draw' or 'away_win'
+        """
+        import pandas as pd
+
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}', expected one of {', '.join(TABLES)}")
+        values = getattr(self, table)
+        if values is None:
+            raise ValueError(f"The '{table}' table was not built (outcomes=False)")
+        return pd.DataFrame(values, index=pd.Index(self.teams, name='home_team'),
+                            columns=pd.Index(self.teams, name='away_team'))
@@ -1,9 +1,10 @@
 import numpy as np
-import pandas as pd
-from scipy.stats import poisson
-from scipy.optimize import minimize
-from sklearn.model_selection import train_test_split
-from datetime import datetime, date
+from datetime import datetime
+
+from models.instrumentation import FitInstrumentation
+from models.preprocessing import PreparedDataset, preprocess_matches
+from models.resimulation import expand_simulations, simulate_total_goals
+from models.tables import PairingTables
 
 
 class xGTotalTeamModel:
@@ -14,6 +15,8 @@ class xGTotalTeamModel:
         self.team_defense = {}
         self.home_advantage = 0.0
         self.rho = 0.0  # Dixon-Coles parameter to account for low scoring games
+        self.division_offsets = {}  # (attack, defense) offset per division when fitted with multi_division
+        self.tables = None  # PairingTables of every pairing when fitted with build_tables
         self.n_simulations = n_simulations
 
 
@@ -30,6 +33,8 @@ class xGTotalTeamModel:
     @staticmethod
     def dc_probability(home_goals, away_goals, lambda_home, lambda_away, rho):
         """Calculate Dixon-Coles adjusted probability for a match outcome."""
+        from scipy.stats import poisson
+
         # Base Poisson probabilities
         p_home = poisson.pmf(home_goals, lambda_home)
         p_away = poisson.pmf(away_goals, lambda_away)
@@ -50,6 +55,8 @@ class xGTotalTeamModel:
     @staticmethod
     def dc_log_likelihood(params, matches, teams, metadata, epsilon=0.01, season_penalty=0.75):
         """Optimized log-likelihood function with season penalty."""
+        import pandas as pd
+
         # Extract parameters
         home_advantage = params[0]
         rho = params[1]
@@ -124,138 +131,115 @@ class xGTotalTeamModel:
         
         return -log_likelihood + constraint_penalty
     
-    def _preprocess_matches(self, matches, days_ago=365):
-        """Preprocess matches to optimize calculations."""   
-        # Convert matches to DataFrame for date processing
-        matches_df = pd.DataFrame(matches)
-        matches_df["match_date"] = pd.to_datetime(matches_df["match_date"])
-        
-        # Filter by date
-        current_date = pd.Timestamp.now()
-        cutoff_date = current_date - pd.Timedelta(days=days_ago)
-        filtered_df = matches_df[matches_df["match_date"] >= cutoff_date]
-        
-        # Convert filtered DataFrame back to list of dictionaries
-        matches = filtered_df.to_dict('records')
-        
-        # Get reference date and current season
-        dates = [m.get('match_date') for m in matches if m.get('match_date') is not None]
-        seasons = [m.get('season', 0) for m in matches]
-        
-        reference_date = None
-        if dates:
-            reference_date = max(dates)
-            
-        current_season = max(seasons) if seasons else None
-        
-        # Precompute days from reference for each match
-        for match in matches:
-            if reference_date and 'match_date' in match:
-                match_date = match['match_date']
-                if isinstance(match_date, str):
-                    match_date = pd.Timestamp(match_date)
-                
-                if isinstance(match_date, (pd.Timestamp, datetime, date)):
-                    # Convert datetime to pandas Timestamp if it's not already
-                    if not isinstance(match_date, pd.Timestamp):
-                        match_date = pd.Timestamp(match_date)
-                    
-                    # Calculate and store days from reference
-                    match['days_from_ref'] = max(0, (reference_date - match_date).days)
+    def _preprocess_matches(self, matches, days_ago=None, as_of=None):
+        """
+        Keep the matches in the `days_ago` window (defaults to 365 days) ending
+        at as_of (defaults to now) and add days_from_ref to each (see
+        models.preprocessing). A PreparedDataset is used as it is, so days_ago
+        and as_of can't be given with one.
+        """
+        if isinstance(matches, PreparedDataset):
+            if days_ago is not None or as_of is not None:
+                raise ValueError("days_ago and as_of can't be combined with a PreparedDataset; "
+                                 "set them when building the dataset")
+            return {'filtered_matches': matches.match_records(), **matches.metadata}
+        
+        if days_ago is None:
+            days_ago = 365
+        prepared = preprocess_matches(matches, as_of=datetime.now() if as_of is None else as_of, days_ago=days_ago)
         
         # Return both filtered matches and metadata
         return {
-            'filtered_matches': matches,
-            'reference_date': reference_date,
-            'current_season': current_season
+            'filtered_matches': prepared['matches'].to_dict('records'),
+            'reference_date': prepared['reference_date'],
+            'current_season': prepared['current_season']
         }
         
 
     def _resimulate_matches_with_xg(self, matches):
-        # Start with original matches
-        expanded_matches = matches.copy()
-        
-        print(f"Resimulating {len(matches)} matches ({self.n_simulations} simulations each)")
-        
-        # For each match in the original dataset
-        for match in matches:
-            # Extract xG values
-            home_xg = match.get('home_xg', 0)
-            away_xg = match.get('away_xg', 0)
-            
-            if home_xg == 0 or away_xg == 0:
-                continue  # Skip matches without xG data
-            
-            # Create n_simulations of this match
-            for i in range(self.n_simulations):
-                # Generate simulated goals using Poisson distribution
-                home_goals_sim = np.random.poisson(home_xg)
-                away_goals_sim = np.random.poisson(away_xg)
-                
-                # Create a copy of the original match
-                sim_match = match.copy()
-                
-                # Replace actual goals with simulated goals
-                sim_match['home_goals'] = home_goals_sim
-                sim_match['away_goals'] = away_goals_sim
-                
-                # Add simulation metadata
-                sim_match['is_simulation'] = True
-                sim_match['simulation_id'] = i
-                sim_match['weight'] = 1.0 / self.n_simulations
-                
-                # Add to expanded dataset
-                expanded_matches.append(sim_match)
-        
-        # Set weight for original matches
-        for match in expanded_matches:
-            if not match.get('is_simulation', False):
-                match['weight'] = 0
-        
-        print(f"Expanded from {len(matches)} to {len(expanded_matches)} matches")
-        return expanded_matches
+        """
+        Add n_simulations copies of each match with Poisson goals around its
+        xG totals; only the simulations are fitted (originals get weight 0).
+        """
+        home_goals, away_goals, simulated = simulate_total_goals(
+            [match.get('home_xg', 0) for match in matches],
+            [match.get('away_xg', 0) for match in matches],
+            self.n_simulations
+        )
+        return expand_simulations(matches, home_goals, away_goals, simulated, original_weight=0)
     
 
 
-    def fit_models(self, actual_matches, epsilon=0.0065, season_penalty=0.75):
+    def fit_models(self, actual_matches, epsilon=0.0065, season_penalty=0.75, instrumentation=None,
+                   multi_division=False, as_of=None, build_tables=False):
+        if instrumentation is None:
+            instrumentation = FitInstrumentation()
+        instrumentation.start_fit(type(self).__name__, epsilon=epsilon, season_penalty=season_penalty)
+        
         # First preprocess matches to filter by date
-        preprocessing_result = self._preprocess_matches(actual_matches)
+        with instrumentation.stage('preprocess', n_input_matches=len(actual_matches)) as stage:
+            preprocessing_result = self._preprocess_matches(actual_matches, as_of=as_of)
+            stage['n_matches'] = len(preprocessing_result['filtered_matches'])
         
         # Extract filtered matches and metadata
         filtered_matches = preprocessing_result.pop('filtered_matches')
         matches_metadata = preprocessing_result
         
         # Then resimulate the filtered matches
-        resimulated_matches = self._resimulate_matches_with_xg(filtered_matches)
+        with instrumentation.stage('resimulate', n_simulations=self.n_simulations) as stage:
+            resimulated_matches = self._resimulate_matches_with_xg(filtered_matches)
+            stage['expanded_matches'] = len(resimulated_matches)
         
         # Get unique teams
-        teams = self._get_unique_teams(resimulated_matches)
-        team_list = sorted(list(teams))
+        with instrumentation.stage('encode') as stage:
+            if isinstance(actual_matches, PreparedDataset):
+                team_list = actual_matches.teams
+            else:
+                teams = self._get_unique_teams(resimulated_matches)
+                team_list = sorted(list(teams))
+            stage['n_teams'] = len(team_list)
         
         # Fit model with resimulated data and season penalty
-        params = self._optimize_dc_parameters(
-            resimulated_matches, team_list, matches_metadata, epsilon, season_penalty
-        )
+        # Offsets only exist for multi-division fits; clear any from an earlier fit
+        self.division_offsets = {}
+        if multi_division:
+            # Per-division constraints and league offsets, fitted with the sparse solver
+            from models.sparse_dc import fit_multi_division
+
+            params, self.division_offsets = fit_multi_division(
+                resimulated_matches, team_list, matches_metadata, epsilon, season_penalty,
+                instrumentation=instrumentation
+            )
+        else:
+            params = self._optimize_dc_parameters(
+                resimulated_matches, team_list, matches_metadata, epsilon, season_penalty,
+                instrumentation=instrumentation
+            )
         
         # Extract parameters 
         self.home_advantage = params[0]
         self.rho = params[1]
-        for i, team in enumerate(team_list):
-            self.team_attack[team] = params[2+i]
-            self.team_defense[team] = params[2+len(team_list)+i]
+        # New dicts, so teams only in an earlier fit don't linger
+        self.team_attack = {team: params[2+i] for i, team in enumerate(team_list)}
+        self.team_defense = {team: params[2+len(team_list)+i] for i, team in enumerate(team_list)}
+        
+        # Dense expectation and 1X2 tables of every pairing
+        self.tables = None
+        if build_tables:
+            with instrumentation.stage('tables', n_teams=len(team_list)):
+                self.tables = PairingTables.from_model(self)
         
         return self
     
 
 
-    def _optimize_dc_parameters(self, matches, team_list, metadata, epsilon=0.0065, season_penalty=0.75):
+    def _optimize_dc_parameters(self, matches, team_list, metadata, epsilon=0.0065, season_penalty=0.75,
+                                instrumentation=None):
         """Optimize Dixon-Coles model parameters."""
-        # Add debugging
-        print(f"Optimizing for {len(matches)} matches with {len(team_list)} teams")
-        
-        # Check first few matches
-        for i, match in enumerate(matches[:3]):
-            print(f"Match {i}: {match}")
+        from scipy.optimize import minimize
+
+        if instrumentation is None:
+            instrumentation = FitInstrumentation()
 
         # Initial parameter guesses
         initial_params = [1.2, 0.1]  # Home advantage, rho
@@ -267,21 +251,24 @@ class xGTotalTeamModel:
         bounds.extend([(0.1, 3.0)] * len(team_list))  # Attack
         bounds.extend([(0.1, 3.0)] * len(team_list))  # Defense
         
-        # Minimize negative log-likelihood
-        result = minimize(
+        # Count likelihood evaluations when instrumented
+        objective = instrumentation.wrap_objective(
             lambda params: xGTotalTeamModel.dc_log_likelihood(
                 params, matches, team_list, metadata, 
                 epsilon=epsilon, season_penalty=season_penalty
-            ),
-            initial_params,
-            method='L-BFGS-B',
-            bounds=bounds
+            )
         )
         
-        # Print optimization results
-        print(f"Optimization success: {result.success}")
-        print(f"Final function value: {result.fun}")
-        print(f"Number of iterations: {result.nit}")
+        # Minimize negative log-likelihood
+        with instrumentation.stage('optimise', n_matches=len(matches), n_teams=len(team_list)) as stage:
+            result = minimize(
+                objective,
+                initial_params,
+                method='L-BFGS-B',
+                bounds=bounds,
+                callback=instrumentation.iteration_callback()
+            )
+            stage.update(instrumentation.optimisation_fields(result))
 
         return result.x
     
@@ -0,0 +1,44 @@
+"""CSV uploads by data.manual_upload_to_db."""
+import pandas as pd
+import pytest
+
+from data.db import close_connections, connect
+from data.manual_upload_to_db import upload_csv_to_db
+
+MATCH_URL = 'https://fbref.com/en/matches/4a3e1ba2/West-Ham-United-Leicester-City-February-27-2025-Premier-League'
+OTHER_URL = 'https://fbref.com/en/matches/b2a5bb48/Nottingham-Forest-Arsenal-February-26-2025-Premier-League'
+
+
+def shot(match_url, minute, player, outcome, xg):
+    return {'Minute': minute, 'Team': 'West Ham', 'Player': player, 'Event Type': 'Shot', 'Outcome': outcome,
+            'xG': xg, 'PSxG': 0.0, 'match_url': match_url, 'match_date': '2025-02-27',
+            'home_team': 'West Ham', 'away_team': 'Leicester City', 'division': 'Premier League'}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # The repeated 64' shot straddles the boundary between the first two rows and the rest
+    path = tmp_path / 'shots.csv'
+    pd.DataFrame([
+        shot(MATCH_URL, 9, 'Jarrod Bowen', 'Saved', 0.12),
+        shot(MATCH_URL, 64, 'Tomas Soucek', 'Off Target', 0.07),
+        shot(MATCH_URL, 64, 'Tomas Soucek', 'Off Target', 0.07),
+        shot(MATCH_URL, 86, 'Tomas Soucek', 'Goal', 0.07),
+        shot(OTHER_URL, 12, 'Chris Wood', 'Saved', 0.2),
+    ]).to_csv(path, index=False)
+    return path
+
+
+def stored_rows(db_path):
+    try:
+        return connect(db_path).execute("SELECT COUNT(*) FROM prem_data").fetchone()[0]
+    finally:
+        close_connections(db_path)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3])
+def test_upload_keeps_repeated_events_across_chunks(tmp_path, csv_path, chunk_size):
+    whole, chunked = str(tmp_path / 'whole.db'), str(tmp_path / 'chunked.db')
+    assert upload_csv_to_db(str(csv_path), whole, chunk_size=10)
+    assert upload_csv_to_db(str(csv_path), chunked, chunk_size=chunk_size)
+    assert stored_rows(chunked) == stored_rows(whole) == 5
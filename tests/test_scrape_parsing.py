@@ -0,0 +1,91 @@
+"""Parsing of saved fbref pages (tests/fixtures) by data.scrape_matches."""
+import os
+from datetime import datetime
+
+import pytest
+
+from data.scrape_matches import MATCH_PAGE_READERS, MatchPageError, parse_fixtures_html, parse_match_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MATCH_URL = 'https://fbref.com/en/matches/4a3e1ba2/West-Ham-United-Leicester-City-February-27-2025-Premier-League'
+
+COLUMNS = ['Minute', 'Team', 'Player', 'Event Type', 'Outcome', 'xG', 'PSxG',
+           'match_url', 'match_date', 'home_team', 'away_team', 'division', 'season']
+
+# (Minute, Team, Player, Event Type, Outcome, xG, PSxG) in the order parse_match_page returns them
+EVENTS = [
+    (9, 'West Ham', 'Jarrod Bowen', 'Shot', 'Saved', 0.12, 0.30),
+    (23, 'Leicester City', 'Jamie Vardy', 'Shot', 'Blocked', 0.05, 0.0),
+    (41, 'West Ham', 'Jarrod Bowen (pen)', 'Penalty', 'Goal', 0.79, 0.93),
+    (64, 'West Ham', 'Tomas Soucek', 'Shot', 'Off Target', 0.07, 0.0),
+    (64, 'West Ham', 'Tomas Soucek', 'Shot', 'Off Target', 0.07, 0.0),
+    (77, 'Leicester City', 'Wout Faes', 'Second Yellow Card', 'Red Card', 0.0, 0.0),
+    (86, 'West Ham', 'Tomas Soucek', 'Shot', 'Goal', 0.07, 0.41),
+    (90, 'Leicester City', 'Bilal El Khannouss', 'Shot', 'Saved', 0.31, 0.25),
+]
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture(params=sorted(MATCH_PAGE_READERS))
+def reader(request):
+    if request.param == 'lxml':
+        pytest.importorskip('lxml')
+    return request.param
+
+
+def test_parse_fixtures_html():
+    fixtures = parse_fixtures_html(read_fixture('schedule_2024-2025.html'), season='2024-2025')
+    assert fixtures == [
+        ('2025-02-26', 'https://fbref.com/en/matches/b2a5bb48/Nottingham-Forest-Arsenal-February-26-2025-Premier-League'),
+        ('2025-02-27', MATCH_URL),
+        ('2025-03-08', None),
+    ]
+
+
+def test_parse_fixtures_html_reads_commented_tables():
+    page = read_fixture('schedule_2024-2025.html')
+    commented = page.replace('<table', '<!--\n<table').replace('</table>', '</table>\n-->')
+    assert parse_fixtures_html(commented, season='2024-2025') == parse_fixtures_html(page, season='2024-2025')
+
+
+def test_parse_fixtures_html_without_table():
+    assert parse_fixtures_html(read_fixture('match_report.html').replace('stats_table', 'other')) is None
+
+
+def test_parse_match_page(reader):
+    df = parse_match_page(read_fixture('match_report.html'), MATCH_URL, reader=reader)
+
+    assert list(df.columns) == COLUMNS
+    events = list(df[COLUMNS[:7]].itertuples(index=False, name=None))
+    assert [event[:5] for event in events] == [event[:5] for event in EVENTS]
+    assert [event[5:] for event in events] == pytest.approx([event[5:] for event in EVENTS])
+    assert (df['match_url'] == MATCH_URL).all()
+    assert (df['match_date'] == '2025-02-27').all()
+    assert (df['home_team'] == 'West Ham').all()
+    assert (df['away_team'] == 'Leicester City').all()
+    assert (df['division'] == 'Premier League').all()
+    assert (df['season'] == 2024).all()
+
+
+def test_parse_match_page_skips_matches_before_cutoff(reader):
+    page = read_fixture('match_report.html')
+    assert parse_match_page(page, MATCH_URL, cutoff_date=datetime(2025, 3, 1), reader=reader) is None
+    assert len(parse_match_page(page, MATCH_URL, cutoff_date=datetime(2025, 2, 1), reader=reader)) == len(EVENTS)
+
+
+def test_parse_match_page_without_shots_table(reader):
+    page = read_fixture('match_report.html').replace('id="shots_all"', 'id="shots_other"')
+    assert parse_match_page(page, MATCH_URL, reader=reader) is None
+
+
+@pytest.mark.parametrize('page', [
+    read_fixture('match_report.html')[:-2000],
+    read_fixture('schedule_2024-2025.html'),
+], ids=['truncated', 'schedule'])
+def test_parse_match_page_rejects_pages_that_are_not_match_reports(reader, page):
+    with pytest.raises(MatchPageError):
+        parse_match_page(page, MATCH_URL, reader=reader)